@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Benchmark Price Monitor Pro - pomiar skalowania bez dostępu do sieci
+(lokalny zamiennik CoinGecko i exchangerate-api z opóźnieniem, błędami i 429)
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import parse_qs, urlparse
+
+import price_monitor
+from price_monitor import PriceMonitorPro, console
+
+FOREX_RATES = {
+    'USD': 1.0, 'EUR': 0.92, 'GBP': 0.79, 'JPY': 151.2, 'CHF': 0.88, 'PLN': 3.98, 'CAD': 1.36, 'AUD': 1.52,
+    'NZD': 1.66, 'SEK': 10.6, 'NOK': 10.8, 'DKK': 6.87, 'CZK': 23.1, 'HUF': 362.0, 'CNY': 7.24, 'HKD': 7.82,
+    'SGD': 1.35, 'MXN': 16.9, 'ZAR': 18.6, 'TRY': 32.4
+}
+
+class StandInServer(ThreadingHTTPServer):
+    """Lokalny zamiennik API cen - wstrzykiwane opóźnienie, błędy 5xx i odpowiedzi 429"""
+    daemon_threads = True
+
+    def __init__(self, latency_ms: float = 0, error_rate: float = 0, rate_limit_rate: float = 0,
+                 retry_after: float = 1, volatility: float = 0.02, seed: int = 0):
+        super().__init__(('127.0.0.1', 0), StandInHandler)
+        self.latency = latency_ms / 1000
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.volatility = volatility
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'errors': 0, 'rate_limited': 0}
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def api_sources(self) -> Dict[str, str]:
+        """Adresy w formacie api_sources monitora"""
+        return {
+            'crypto': f"{self.base_url}/api/v3/simple/price",
+            'forex': f"{self.base_url}/v4/latest/"
+        }
+
+    def snapshot(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.stats)
+
+    def draw(self) -> str:
+        """Losuje wynik zapytania: ok, error albo rate_limited"""
+        with self.lock:
+            self.stats['requests'] += 1
+            roll = self.random.random()
+            if roll < self.rate_limit_rate:
+                self.stats['rate_limited'] += 1
+                return 'rate_limited'
+            if roll < self.rate_limit_rate + self.error_rate:
+                self.stats['errors'] += 1
+                return 'error'
+            return 'ok'
+
+    def quote(self, crypto_id: str) -> float:
+        """Cena id - stała baza z nazwy plus losowe wahanie"""
+        base = 1 + zlib.crc32(crypto_id.encode()) % 50000
+        with self.lock:
+            return base * (1 + self.random.gauss(0, self.volatility))
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def send_json(self, status: int, body: object = None, headers: Dict[str, str] = None) -> None:
+        payload = json.dumps(body).encode() if body is not None else b''
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self) -> None:
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+
+        outcome = server.draw()
+        if outcome == 'rate_limited':
+            self.send_json(429, {'error': 'rate limited'}, {'Retry-After': f"{server.retry_after:g}"})
+            return
+        if outcome == 'error':
+            self.send_json(503, {'error': 'injected'})
+            return
+
+        url = urlparse(self.path)
+        if url.path == '/api/v3/simple/price':
+            ids = parse_qs(url.query).get('ids', [''])[0].split(',')
+            self.send_json(200, {crypto_id: {'usd': server.quote(crypto_id)} for crypto_id in ids if crypto_id})
+        elif url.path.startswith('/v4/latest/'):
+            base = url.path.rsplit('/', 1)[1].upper()
+            if base not in FOREX_RATES:
+                self.send_json(404, {'error': 'unknown base'})
+                return
+            rates = {currency: rate / FOREX_RATES[base] for currency, rate in FOREX_RATES.items()}
+            self.send_json(200, {'base': base, 'rates': rates})
+        else:
+            self.send_json(404, {'error': 'not found'})
+
+def build_watchlist(size: int) -> List[Dict]:
+    """Lista aktywów benchmarku - ~90% syntetycznych kryptowalut, ~10% par forex"""
+    pairs = [f"{base}/{quote}" for base in FOREX_RATES for quote in FOREX_RATES if base != quote]
+    forex_count = min(max(1, size // 10), len(pairs), size)
+
+    assets = [{'symbol': pair, 'type': 'forex'} for pair in pairs[:forex_count]]
+    for i in range(size - forex_count):
+        symbol = f"BX{i:05d}"
+        price_monitor.CRYPTO_IDS[symbol] = f"bench-coin-{i:05d}"
+        assets.append({'symbol': symbol, 'type': 'crypto'})
+    return assets
+
+@contextlib.contextmanager
+def quiet():
+    """Wycisza wyjście monitora na czas pomiaru"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+def run_size(size: int, args: argparse.Namespace, server: StandInServer) -> Dict:
+    """Mierzy cykle pobierania, ocenę alertów i zapis dla listy o podanym rozmiarze"""
+    workdir = tempfile.mkdtemp(prefix=f"price-monitor-bench-{size}-")
+    config_file = os.path.join(workdir, 'monitor_config.json')
+    with open(config_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'sound_enabled': False,
+            'alert_sinks': [],
+            'fetch_engine': args.engine,
+            'crypto_chunk_delay_seconds': 0,
+            'persist_interval_seconds': 3600,
+            'history_dir': os.path.join(workdir, 'price_history'),
+            'rate_limits': {
+                'crypto': {'requests_per_second': 0, 'burst': 1, 'max_concurrency': 8},
+                'forex': {'requests_per_second': 0, 'burst': 1, 'max_concurrency': 8}
+            }
+        }, f, indent=2)
+
+    with quiet():
+        monitor = PriceMonitorPro(config_file, os.path.join(workdir, 'price_data.json'))
+        monitor.api_sources = server.api_sources()
+        for asset in build_watchlist(size):
+            monitor.add_asset(asset['symbol'], asset['type'])
+
+    alerts = []
+    monitor.dispatcher.sinks = [alerts.append]
+    rng = random.Random(args.seed)
+
+    cycles = []
+    for _ in range(args.cycles):
+        before = server.snapshot()
+        started = time.perf_counter()
+        with quiet():
+            monitor.fetch_all_prices()
+        cycle_ms = (time.perf_counter() - started) * 1000
+        after = server.snapshot()
+
+        assets = [asset for asset in monitor.monitored_assets if asset.last_price]
+        symbols = [asset.symbol for asset in assets]
+        prices = [asset.last_price * (1 + rng.gauss(0, args.volatility)) for asset in assets]
+        started = time.perf_counter()
+        monitor.evaluate_alerts(symbols, prices)
+        alert_eval_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        monitor.mark_dirty()
+        monitor.save_data()
+        persist_ms = (time.perf_counter() - started) * 1000
+
+        cycles.append({
+            'cycle_ms': round(cycle_ms, 3),
+            'requests': after['requests'] - before['requests'],
+            'errors_injected': after['errors'] - before['errors'],
+            'rate_limited': after['rate_limited'] - before['rate_limited'],
+            'priced_assets': len(assets),
+            'alert_eval_ms': round(alert_eval_ms, 3),
+            'persist_ms': round(persist_ms, 3)
+        })
+
+    monitor.dispatcher.drain(5)
+    with quiet():
+        monitor.close()
+
+    def median(key: str) -> float:
+        return round(statistics.median(cycle[key] for cycle in cycles), 3)
+
+    return {
+        'size': size,
+        'engine': args.engine,
+        'summary': {
+            'cycle_ms_median': median('cycle_ms'),
+            'requests_per_cycle': median('requests'),
+            'alert_eval_ms_median': median('alert_eval_ms'),
+            'persist_ms_median': median('persist_ms'),
+            'data_file_bytes': os.path.getsize(monitor.data_file),
+            'alerts_delivered': len(alerts)
+        },
+        'cycles': cycles
+    }
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark Price Monitor Pro (bez sieci)")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 10000], help="rozmiary list aktywów")
+    parser.add_argument('--cycles', type=int, default=3, help="liczba cykli na rozmiar")
+    parser.add_argument('--engine', choices=['sequential', 'async'], default='sequential', help="silnik pobierania cen")
+    parser.add_argument('--latency-ms', type=float, default=20, help="opóźnienie odpowiedzi zamiennika")
+    parser.add_argument('--error-rate', type=float, default=0, help="odsetek odpowiedzi 503")
+    parser.add_argument('--rate-limit-rate', type=float, default=0, help="odsetek odpowiedzi 429")
+    parser.add_argument('--retry-after', type=float, default=1, help="Retry-After w odpowiedziach 429 (s)")
+    parser.add_argument('--volatility', type=float, default=0.02, help="odchylenie zmian cen między cyklami")
+    parser.add_argument('--seed', type=int, default=0, help="ziarno losowania")
+    parser.add_argument('--label', default="", help="etykieta wersji w wynikach")
+    parser.add_argument('--output', default="benchmark_results.json", help="plik wyników JSON")
+    args = parser.parse_args(argv)
+
+    console.plain = True
+    server = StandInServer(args.latency_ms, args.error_rate, args.rate_limit_rate, args.retry_after,
+                           args.volatility, args.seed)
+    threading.Thread(target=server.serve_forever, name="stand-in", daemon=True).start()
+
+    results = []
+    try:
+        for size in args.sizes:
+            result = run_size(size, args, server)
+            summary = result['summary']
+            print(f"{size:>6} aktywów: cykl {summary['cycle_ms_median']:.1f} ms, "
+                  f"zapytań {summary['requests_per_cycle']:g}, alerty {summary['alert_eval_ms_median']:.2f} ms, "
+                  f"zapis {summary['persist_ms_median']:.1f} ms", flush=True)
+            results.append(result)
+    finally:
+        server.shutdown()
+
+    report = {
+        'label': args.label,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': sys.platform,
+        'settings': {key: value for key, value in vars(args).items() if key not in ('output', 'label')},
+        'results': results
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"✓ Wyniki zapisane: {args.output}")
+
+if __name__ == "__main__":
+    main()
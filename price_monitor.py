@@ -3,35 +3,2653 @@
 Price Monitor Pro - Monitor Kursów z Alertami Audio-Wizualnymi
 """
 
-import requests
+import time
+
+# Punkt odniesienia pomiaru zimnego startu (tryb run/daemon)
+STARTUP_T0 = time.perf_counter()
+
+import argparse
+import atexit
+import bisect
+import csv
+import functools
+import heapq
+import importlib
 import json
+import math
+import mmap
+import multiprocessing
 import os
-import time
-import winsound
+import re
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import zlib
+from collections import OrderedDict, deque
 from datetime import datetime
-from typing import Dict, List, Optional
-from colorama import Fore, Back, Style, init
-from rich.table import Table
-from rich.console import Console
-from rich.panel import Panel
-from rich.align import Align
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import quote, unquote
 
-init(autoreset=True)
-console = Console()
+class LazyModule:
+    """Moduł importowany dopiero przy pierwszym użyciu (szybszy start, brak zależności od platformy)"""
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
 
-class PriceMonitorPro:
+    def __getattr__(self, attr: str):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+requests = LazyModule('requests')
+asyncio = LazyModule('asyncio')
+np = LazyModule('numpy')
+winsound = LazyModule('winsound')
+fcntl = LazyModule('fcntl')
+msvcrt = LazyModule('msvcrt')
+
+MARKUP_PATTERN = re.compile(r"\[/?[a-z][a-z0-9 _#.=-]*\]")
+
+class LazyConsole:
+    """Konsola rich tworzona przy pierwszym użyciu; w trybie bez interfejsu zwykły tekst bez znaczników"""
     def __init__(self):
-        self.config_file = "monitor_config.json"
-        self.data_file = "price_data.json"
+        self._console = None
+        self.plain = False
+
+    def _rich(self):
+        if self._console is None:
+            from rich.console import Console
+            self._console = Console()
+        return self._console
+
+    def print(self, *objects, **kwargs) -> None:
+        if self.plain:
+            print(' '.join(MARKUP_PATTERN.sub('', str(obj)) for obj in objects), flush=True)
+            return
+        self._rich().print(*objects, **kwargs)
+
+    def __getattr__(self, attr: str):
+        return getattr(self._rich(), attr)
+
+console = LazyConsole()
+
+def beep(frequency: int, duration_ms: int) -> None:
+    """Sygnał dźwiękowy - winsound na Windows, dzwonek terminala na pozostałych systemach"""
+    if sys.platform == 'win32':
+        winsound.Beep(frequency, duration_ms)
+    else:
+        sys.stdout.write('\a')
+        sys.stdout.flush()
+        time.sleep(duration_ms / 1000)
+
+# Id przypięte na stałe - mają pierwszeństwo przed katalogiem przy kolizjach symboli
+CRYPTO_IDS = {
+    'BTC': 'bitcoin', 'ETH': 'ethereum', 'XRP': 'ripple',
+    'ADA': 'cardano', 'SOL': 'solana', 'DOGE': 'dogecoin',
+    'USDT': 'tether', 'USDC': 'usd-coin', 'BNB': 'binancecoin', 'XLM': 'stellar',
+}
+
+# Limit długości parametru ids= w jednym zapytaniu (bezpieczny margines dla długości URL)
+CRYPTO_IDS_MAX_CHARS = 2000
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Minimalny odstęp między alertami tego samego typu dla aktywa
+ALERT_COOLDOWN_SECONDS = 30
+
+# Rekord segmentu historii: (timestamp epoch, cena) - 16 bajtów, little-endian
+HISTORY_RECORD = struct.Struct('<dd')
+
+# Rekord świecy poziomu historii: (początek przedziału epoch, open, high, low, close) - 40 bajtów
+CANDLE_RECORD = struct.Struct('<ddddd')
+
+# Limit jednocześnie otwartych plików segmentów (duże listy aktywów vs limit deskryptorów)
+MAX_OPEN_SEGMENTS = 256
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Zamienia nagłówek Retry-After (sekundy lub data HTTP) na liczbę sekund"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class AssetRecord:
+    """Monitorowane aktywo - rekord ze __slots__ zamiast słownika"""
+    __slots__ = ('id', 'symbol', 'type', 'alert_up', 'alert_down', 'date_added', 'enabled',
+                 'last_price', 'last_alert_up', 'last_alert_down', 'window_rules', 'poll_interval')
+
+    def __init__(self, id: int, symbol: str, type: str, alert_up: float, alert_down: float,
+                 date_added: str, enabled: bool = True, last_price: Optional[float] = None,
+                 last_alert_up: Optional[str] = None, last_alert_down: Optional[str] = None,
+                 window_rules: Optional[List[Dict]] = None, poll_interval: Optional[float] = None):
+        self.id = id
+        self.symbol = symbol
+        self.type = type
+        self.alert_up = alert_up
+        self.alert_down = alert_down
+        self.date_added = date_added
+        self.enabled = enabled
+        self.last_price = last_price
+        self.last_alert_up = last_alert_up
+        self.last_alert_down = last_alert_down
+        self.window_rules = window_rules or []
+        # None - domyślny check_interval_seconds z konfiguracji
+        self.poll_interval = poll_interval
+
+    @staticmethod
+    def migrate(data: Dict) -> Dict:
+        """Migracja wpisu sprzed schematu 1 (alert_change -> alert_up/alert_down)"""
+        if 'alert_change' in data and 'alert_up' not in data:
+            data = dict(data)
+            data['alert_up'] = data.pop('alert_change')
+            data['alert_down'] = data['alert_up']
+            data['last_alert_up'] = data.pop('last_alert', None)
+            data['last_alert_down'] = None
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'AssetRecord':
+        """Tworzy rekord z wpisu monitored_assets"""
+        return cls(**{name: data[name] for name in cls.__slots__ if name in data})
+
+    def to_dict(self) -> Dict:
+        """Zwraca wpis w formacie monitored_assets"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+class AssetRegistry:
+    """Rejestr aktywów - wyszukiwanie O(1) po id i symbolu, rosnące id bez kolizji"""
+    def __init__(self, assets: Optional[List[Dict]] = None, next_id: Optional[int] = None, migrate: bool = False):
+        self.by_id = {}
+        self.by_symbol = {}
+        for data in assets or []:
+            try:
+                record = AssetRecord.from_dict(AssetRecord.migrate(data) if migrate else data)
+            except (TypeError, KeyError, AttributeError):
+                # Wpis bez wymaganych pól (np. edytowany ręcznie) - pozostałe aktywa ładowane normalnie
+                console.print(f"[yellow]⚠ Pominięto uszkodzony wpis aktywa: {data!r}[/yellow]")
+                continue
+            self._index(record)
+        self.next_id = max(next_id or 1, max(self.by_id, default=0) + 1)
+
+    def _index(self, record: AssetRecord) -> None:
+        self.by_id[record.id] = record
+        self.by_symbol[record.symbol.upper()] = record
+
+    def __iter__(self):
+        return iter(list(self.by_id.values()))
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def get(self, asset_id: int) -> Optional[AssetRecord]:
+        """Zwraca aktywo o podanym id"""
+        return self.by_id.get(asset_id)
+
+    def find(self, symbol: str) -> Optional[AssetRecord]:
+        """Zwraca aktywo o podanym symbolu"""
+        return self.by_symbol.get(symbol.upper())
+
+    def add(self, symbol: str, asset_type: str, alert_up: float, alert_down: float,
+            window_rules: Optional[List[Dict]] = None, poll_interval: Optional[float] = None) -> AssetRecord:
+        """Dodaje aktywo z kolejnym wolnym id"""
+        record = AssetRecord(
+            id=self.next_id,
+            symbol=symbol.upper(),
+            type=asset_type.lower(),
+            alert_up=alert_up,
+            alert_down=alert_down,
+            date_added=datetime.now().strftime(TIMESTAMP_FORMAT),
+            window_rules=window_rules,
+            poll_interval=poll_interval
+        )
+        self.next_id += 1
+        self._index(record)
+        return record
+
+    def remove(self, asset_id: int) -> Optional[AssetRecord]:
+        """Usuwa aktywo - id nie jest ponownie używane"""
+        record = self.by_id.pop(asset_id, None)
+        if record is not None:
+            self.by_symbol.pop(record.symbol.upper(), None)
+        return record
+
+    def to_json(self) -> List[Dict]:
+        """Zwraca listę w formacie monitored_assets"""
+        return [record.to_dict() for record in self.by_id.values()]
+
+class CoinCatalog:
+    """Katalog kryptowalut dostawcy - cache na dysku z TTL, indeksy symbol → id, id → symbol i wyszukiwanie po prefiksie"""
+    def __init__(self, path: str, ttl: float, fetch: Callable[[], List[Dict]], overrides: Optional[Dict[str, str]] = None):
+        self.path = path
+        self.ttl = ttl
+        self.fetch = fetch
+        self.overrides = {symbol.upper(): coin_id for symbol, coin_id in (overrides or {}).items()}
+        self.fetched_at = None
+        self.by_symbol = {}
+        self.by_id = {}
+        self.candidates = {}
+        self.names = {}
+        self.symbols = []
+        self.lock = threading.Lock()
+        self.refresh_thread = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.fetched_at is not None
+
+    @property
+    def fresh(self) -> bool:
+        return self.loaded and time.time() - self.fetched_at < self.ttl
+
+    def pinned(self, symbol: str) -> Optional[str]:
+        """Id przypięte w CRYPTO_IDS lub crypto_symbol_overrides (bez katalogu)"""
+        symbol = symbol.upper()
+        return self.overrides.get(symbol) or CRYPTO_IDS.get(symbol)
+
+    def prepare(self, symbols: Iterable[str]) -> None:
+        """Zaczyna ładowanie katalogu w tle (start, dodanie aktywa) gdy któryś symbol nie jest przypięty - bez czekania"""
+        if any(not self.pinned(symbol) for symbol in symbols):
+            self.refresh_in_background()
+
+    def freeze(self, ids: Dict[str, str]) -> None:
+        """Stały katalog z podanymi id - bez pobierania i pliku cache (procesy robocze trybu wieloprocesowego)"""
+        self.overrides.update({symbol.upper(): coin_id for symbol, coin_id in ids.items()})
+        self.ttl = math.inf
+        self.build([], time.time())
+
+    def refresh_in_background(self) -> None:
+        """Odświeża katalog w wątku w tle - do tego czasu wyszukiwania korzystają z bieżących indeksów"""
+        with self.lock:
+            if self.fresh or (self.refresh_thread is not None and self.refresh_thread.is_alive()):
+                return
+            self.refresh_thread = threading.Thread(target=self.ensure, name="coin-catalog", daemon=True)
+            self.refresh_thread.start()
+
+    def ensure(self) -> None:
+        """Ładuje katalog (cache lub dostawca) przy pierwszym użyciu i po upływie TTL - blokuje"""
+        thread = self.refresh_thread
+        if thread is not None and thread is not threading.current_thread() and thread.is_alive():
+            # Ładowanie w tle już trwa - bez drugiego pobrania
+            thread.join()
+        if self.fresh:
+            return
+
+        cached = None
+        if not self.loaded and os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    cached = json.load(f)
+            except (OSError, ValueError):
+                cached = None
+            if cached and time.time() - cached.get('fetched_at', 0) < self.ttl:
+                self.build(cached['coins'], cached['fetched_at'])
+                return
+
+        try:
+            coins = [[coin['id'], coin['symbol'], coin.get('name', '')] for coin in self.fetch()]
+            self.build(coins, time.time())
+            self.save(coins)
+            return
+        except Exception as e:
+            console.print(f"[yellow]⚠ Nie udało się pobrać listy kryptowalut: {str(e)}[/yellow]")
+
+        if cached:
+            self.build(cached['coins'], cached.get('fetched_at', 0))
+        elif not self.loaded:
+            self.build([], 0)
+        # Kolejna próba odświeżenia dopiero po 10 minutach
+        self.fetched_at = time.time() - self.ttl + 600
+
+    def build(self, coins: List[List[str]], fetched_at: float) -> None:
+        """Buduje indeksy - kolizje symboli rozstrzygane deterministycznie"""
+        candidates = {}
+        names = {}
+        for coin_id, symbol, name in coins:
+            candidates.setdefault(symbol.upper(), []).append(coin_id)
+            names[coin_id] = name
+        for symbol, coin_id in list(CRYPTO_IDS.items()) + list(self.overrides.items()):
+            candidates.setdefault(symbol, [])
+            if coin_id not in candidates[symbol]:
+                candidates[symbol].append(coin_id)
+
+        by_symbol = {}
+        for symbol, ids in candidates.items():
+            # Przypięte (CRYPTO_IDS, crypto_symbol_overrides), potem najkrótsze id, potem alfabetycznie
+            ids.sort(key=lambda coin_id: (len(coin_id), coin_id))
+            pinned = self.overrides.get(symbol) or CRYPTO_IDS.get(symbol)
+            if pinned:
+                ids.remove(pinned)
+                ids.insert(0, pinned)
+            by_symbol[symbol] = ids[0]
+
+        self.candidates = candidates
+        self.names = names
+        self.by_symbol = by_symbol
+        self.by_id = {coin_id: symbol for symbol, ids in candidates.items() for coin_id in ids}
+        self.symbols = sorted(candidates)
+        self.fetched_at = fetched_at
+
+    def save(self, coins: List[List[str]]) -> None:
+        """Zapisuje katalog do pliku cache (atomowa podmiana)"""
+        with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'fetched_at': self.fetched_at, 'coins': coins}, f, ensure_ascii=False)
+        os.replace(self.path + '.tmp', self.path)
+
+    def id_for(self, symbol: str) -> Optional[str]:
+        """Id dostawcy dla symbolu - O(1) z bieżącego indeksu, nieaktualny katalog odświeżany w tle (bez pobierania w ścieżce cen)"""
+        pinned = self.pinned(symbol)
+        if pinned:
+            return pinned
+        if not self.fresh:
+            self.refresh_in_background()
+        return self.by_symbol.get(symbol.upper())
+
+    def symbol_for(self, coin_id: str) -> Optional[str]:
+        """Symbol dla id dostawcy"""
+        self.ensure()
+        return self.by_id.get(coin_id)
+
+    def alternatives(self, symbol: str) -> List[str]:
+        """Wszystkie id dzielące symbol (pierwsze - używane)"""
+        self.ensure()
+        return list(self.candidates.get(symbol.upper(), []))
+
+    def search(self, prefix: str, limit: int = 10) -> List[Tuple[str, str, str]]:
+        """Symbole zaczynające się od prefiksu: (symbol, id, nazwa)"""
+        self.ensure()
+        prefix = prefix.upper()
+        matches = []
+        for symbol in self.symbols[bisect.bisect_left(self.symbols, prefix):]:
+            if not symbol.startswith(prefix) or len(matches) >= limit:
+                break
+            coin_id = self.by_symbol[symbol]
+            matches.append((symbol, coin_id, self.names.get(coin_id, '')))
+        return matches
+
+class TokenBucket:
+    """Limiter zapytań typu token bucket - stan przetrwa między cyklami"""
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.capacity = max(1.0, burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _take(self) -> float:
+        """Pobiera token - zwraca 0 albo czas do następnego wolnego tokenu"""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self) -> None:
+        """Czeka na wolny token (rate <= 0 oznacza brak limitu)"""
+        while True:
+            delay = self._take()
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    def wait(self) -> None:
+        """Czeka na wolny token w kodzie synchronicznym (silnik sekwencyjny)"""
+        while True:
+            delay = self._take()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+class ProviderGate:
+    """Limity jednego dostawcy: token bucket, limit współbieżności i wspólny backoff po 429"""
+    def __init__(self, limits: Dict):
+        self.bucket = TokenBucket(limits.get('requests_per_second', 0), limits.get('burst', 1))
+        self.max_concurrency = max(1, int(limits.get('max_concurrency', 1)))
+        self.blocked_until = 0.0
+        self.semaphore = None
+
+    def backoff(self, seconds: float) -> None:
+        """Wstrzymuje wszystkie zapytania do dostawcy na podany czas"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    async def wait_backoff(self) -> None:
+        """Czeka aż minie wspólny backoff dostawcy"""
+        while True:
+            delay = self.blocked_until - time.monotonic()
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+class CircuitOpenError(Exception):
+    """Zapytanie odrzucone bez wysyłania - obwód dostawcy jest otwarty"""
+
+class CircuitBreaker:
+    """Wyłącznik obwodu dostawcy: closed -> open po serii błędów, half_open przepuszcza jedną próbę"""
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30, max_reset_timeout: float = 600):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max(reset_timeout, max_reset_timeout)
+        self.timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_until = 0.0
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Czy zapytanie może zostać wysłane (w half_open tylko jedna próba naraz)"""
+        with self.lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open':
+                if time.monotonic() < self.opened_until:
+                    return False
+                self.state = 'half_open'
+                self.probing = False
+            if self.probing:
+                return False
+            self.probing = True
+            return True
+
+    def retry_in(self) -> float:
+        """Sekundy do próby ponownego połączenia (0 gdy obwód nie jest otwarty)"""
+        if self.state != 'open':
+            return 0.0
+        return max(0.0, self.opened_until - time.monotonic())
+
+    def record_success(self) -> bool:
+        """Zamyka obwód - zwraca True gdy dostawca właśnie wrócił"""
+        with self.lock:
+            recovered = self.state != 'closed'
+            self.state = 'closed'
+            self.failures = 0
+            self.timeout = self.reset_timeout
+            self.probing = False
+            return recovered
+
+    def record_failure(self) -> bool:
+        """Liczy błąd - zwraca True gdy obwód właśnie się otworzył"""
+        with self.lock:
+            if self.state == 'open':
+                return False
+            self.failures += 1
+            if self.state == 'half_open':
+                # Nieudana próba - dłuższa przerwa (wykładniczo, z górnym limitem)
+                self.timeout = min(self.timeout * 2, self.max_reset_timeout)
+            elif self.failures < self.failure_threshold:
+                return False
+            opened = self.state == 'closed'
+            self.state = 'open'
+            self.probing = False
+            self.opened_until = time.monotonic() + self.timeout
+            return opened
+
+class AsyncFetchEngine:
+    """Współbieżne pobieranie cen (asyncio) - alternatywa dla pętli sekwencyjnej"""
+    def __init__(self, monitor: 'PriceMonitorPro'):
+        self.monitor = monitor
+        limits = monitor.config.get('rate_limits', {})
+        self.gates = {provider: ProviderGate(limits.get(provider, {})) for provider in ('crypto', 'forex')}
+
+    def fetch_prices(self, assets: List[AssetRecord]) -> Dict[str, float]:
+        """Pobiera ceny aktywów - czas cyklu ograniczony najwolniejszym zapytaniem"""
+        return asyncio.run(self._fetch_prices(assets))
+
+    async def _fetch_prices(self, assets: List[AssetRecord]) -> Dict[str, float]:
+        # Prymitywy asyncio są związane z pętlą - tworzone na każdy cykl
+        for gate in self.gates.values():
+            gate.semaphore = asyncio.Semaphore(gate.max_concurrency)
+
+        monitor = self.monitor
+        crypto_symbols = [asset.symbol for asset in assets if asset.type.lower() == 'crypto']
+        forex_symbols = [asset.symbol for asset in assets if asset.type.lower() == 'forex']
+
+        ids_by_symbol = monitor.resolve_crypto_ids(crypto_symbols)
+        chunks = monitor.chunk_crypto_ids(list(dict.fromkeys(ids_by_symbol.values())))
+        bases = monitor.forex_bases_to_fetch(forex_symbols)
+        # Tabele do przeliczenia kryptowalut na inne waluty kwotowania - równolegle z resztą zapytań
+        monitor.forex_bases_to_fetch(monitor.conversion_pairs(list(ids_by_symbol)),
+                                     monitor.config.get('quote_conversion_ttl_seconds', 3600), bases)
+        vs_currency = monitor.crypto_base_currency().lower()
+
+        crypto_tasks = [
+            self._request('crypto', monitor.api_sources['crypto'], {'ids': ','.join(chunk), 'vs_currencies': vs_currency})
+            for chunk in chunks
+        ]
+        forex_tasks = [self._request('forex', f"{monitor.api_sources['forex']}{base}") for base in bases]
+        results = await asyncio.gather(*crypto_tasks, *forex_tasks)
+
+        quotes = {}
+        for data in results[:len(crypto_tasks)]:
+            if data:
+                quotes.update(data)
+
+        tables = {}
+        for base, data in zip(bases, results[len(crypto_tasks):]):
+            if data and 'rates' in data:
+                tables[base] = monitor.store_forex_table(base, data)
+
+        prices = monitor.crypto_quotes_to_prices(ids_by_symbol, quotes, tables)
+        if forex_symbols:
+            prices.update(monitor.get_forex_prices(forex_symbols, tables))
+        return prices
+
+    async def _request(self, provider: str, url: str, params: Optional[Dict] = None) -> Optional[Dict]:
+        """Jedno zapytanie z limitami dostawcy i ponowieniem po 429"""
+        gate = self.gates[provider]
+        loop = asyncio.get_running_loop()
+
+        for attempt in range(3):
+            await gate.wait_backoff()
+            async with gate.semaphore:
+                await gate.bucket.acquire()
+                await gate.wait_backoff()
+                try:
+                    return await loop.run_in_executor(
+                        None, functools.partial(self.monitor.http_get_json, provider, url, params)
+                    )
+                except requests.exceptions.HTTPError as e:
+                    if e.response.status_code != 429 or self.monitor.breaker(provider).state == 'open':
+                        return None
+                    wait = parse_retry_after(e.response.headers.get('Retry-After')) or (attempt + 1) * 2
+                except Exception:
+                    return None
+
+            console.print(f"[yellow]⏳ API limit ({provider}), wstrzymuję zapytania na {wait:.0f}s...[/yellow]")
+            self.monitor.metrics.inc('http_retries', provider=provider)
+            self.monitor.metrics.inc('backoff_seconds', wait, provider=provider)
+            gate.backoff(wait)
+
+        return None
+
+# Wersja schematu price_data.json - migracje starszych plików uruchamiane tylko gdy zapisana wersja jest niższa
+# 1: alert_up/alert_down zamiast alert_change
+DATA_SCHEMA_VERSION = 1
+
+# Klucze na początku wiersza w układzie indent=2 (zapis DataPersister i dawnego json.dump):
+# sekcje pliku - wcięcie 2, wpisy sekcji-słownika (np. symbole historii) - wcięcie 4
+SECTION_INDENT = b'\n  "'
+ENTRY_INDENT = b'\n    "'
+JSON_KEY = re.compile(rb'("(?:[^"\\\n]|\\.)*"): ')
+OBJECT_START = re.compile(rb'\s*\{')
+
+CLOSING = {ord('{'): ord('}'), ord('['): ord(']')}
+
+def complete_value(raw: bytes, start: int, end: int) -> bool:
+    """Czy zakres bajtów to cała wartość JSON - obiekt/tablica po ogranicznikach, wartość prosta parsowana"""
+    if end <= start:
+        return False
+    closing = CLOSING.get(raw[start])
+    if closing is not None:
+        return end - start >= 2 and raw[end - 1] == closing
+    try:
+        json.loads(raw[start:end])
+    except ValueError:
+        return False
+    return True
+
+def split_entries(raw: bytes, indent: bytes, start: int, end: int) -> Dict[str, Tuple[int, int]]:
+    """Zakresy bajtów wartości kolejnych kluczy obiektu JSON sformatowanego z wcięciami - bez parsowania wartości
+
+    start wskazuje '{' obiektu; inny układ (wpisy niepokrywające obiektu, wartości urwane) - ValueError
+    """
+    close = raw.rfind(b'}', start, end)
+    if raw[start:start + 1] != b'{' or close == -1:
+        raise ValueError("Niepełny obiekt JSON")
+    # bytes.find zamiast wyrażenia z ^ i re.M - wielokrotnie szybsze przeszukiwanie wielomegabajtowej historii
+    keys = []
+    pos = raw.find(indent, start, close)
+    while pos != -1:
+        match = JSON_KEY.match(raw, pos + len(indent) - 1, close)
+        if match:
+            keys.append((pos, match))
+        pos = raw.find(indent, pos + len(indent), close)
+    spans = {}
+    previous = start + 1
+    for i, (line_start, match) in enumerate(keys):
+        # Między wpisami tylko przecinek - wpis w innym miejscu to klucz zagnieżdżony (inne wcięcia pliku)
+        if raw[previous:line_start].strip() != (b',' if i else b''):
+            raise ValueError("Nieobsługiwany układ JSON")
+        value_end = keys[i + 1][0] if i + 1 < len(keys) else close
+        while raw[value_end - 1] in b' \r\n\t,':
+            value_end -= 1
+        if not complete_value(raw, match.end(), value_end):
+            raise ValueError("Nieobsługiwany układ JSON")
+        spans[json.loads(match.group(1))] = (match.end(), value_end)
+        previous = value_end
+    if raw[previous:close].strip():
+        raise ValueError("Nieobsługiwany układ JSON")
+    return spans
+
+class LazySection(dict):
+    """Sekcja-słownik dekodowana per klucz przy pierwszym dostępie (np. historia jednego symbolu)"""
+    def __init__(self, raw: bytes, spans: Dict[str, Tuple[int, int]]):
+        super().__init__(dict.fromkeys(spans))
+        self.raw = raw
+        self.pending = dict(spans)
+
+    def _load(self, key):
+        span = self.pending.pop(key, None)
+        if span is not None:
+            dict.__setitem__(self, key, json.loads(self.raw[span[0]:span[1]]))
+
+    def source(self, key) -> Optional[str]:
+        """Oryginalny tekst wpisu z pliku (dopóki nie został zdekodowany) - zapis bez ponownej serializacji"""
+        span = self.pending.get(key)
+        return self.raw[span[0]:span[1]].decode('utf-8') if span is not None else None
+
+    def __getitem__(self, key):
+        self._load(key)
+        return dict.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        self._load(key)
+        return dict.get(self, key, default)
+
+    def setdefault(self, key, default=None):
+        self._load(key)
+        return dict.setdefault(self, key, default)
+
+    def pop(self, key, *default):
+        self._load(key)
+        return dict.pop(self, key, *default)
+
+    def __setitem__(self, key, value):
+        self.pending.pop(key, None)
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        self.pending.pop(key, None)
+        dict.__delitem__(self, key)
+
+    def values(self):
+        for key in list(self.pending):
+            self._load(key)
+        return dict.values(self)
+
+    def items(self):
+        for key in list(self.pending):
+            self._load(key)
+        return dict.items(self)
+
+class DataFile:
+    """Indeks sekcji price_data.json - historia dekodowana per symbol przy dostępie, pozostałe sekcje sprawdzane przy otwarciu"""
+    KEYED = ('price_history', 'price_history_tiers')
+
+    def __init__(self, path: str):
+        self.raw = self.map(path)
+        self.decoded = {}
+        try:
+            match = OBJECT_START.match(self.raw)
+            if match and self.raw[-4096:].rstrip().endswith(b'}'):
+                for name, (start, end) in split_entries(self.raw, SECTION_INDENT, match.end() - 1, len(self.raw)).items():
+                    self.decoded[name] = self.section(name, start, end)
+        except ValueError:
+            self.decoded = {}
+        if not self.decoded and self.raw[:].strip():
+            # Inny układ pliku (np. zapis bez wcięć, plik poprawiany ręcznie) albo plik uszkodzony
+            # - zwykłe parsowanie całości (JSONDecodeError)
+            self.decoded = json.loads(self.raw[:])
+            self.raw = b''
+
+    @staticmethod
+    def map(path: str):
+        """Plik zmapowany w pamięci (mmap) - strony wczytywane przez system dopiero przy dostępie do wpisu"""
+        with open(path, 'rb') as f:
+            if os.name == 'nt' or os.fstat(f.fileno()).st_size == 0:
+                # Windows nie pozwala podmienić (os.replace) pliku z aktywnym mapowaniem; pustego pliku nie da się zmapować
+                return f.read()
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def section(self, name: str, start: int, end: int):
+        """Wartość sekcji - historia jako indeks wpisów (bez dekodowania), pozostałe parsowane od razu (ValueError)"""
+        if name in self.KEYED and self.raw[start:start + 1] == b'{':
+            return LazySection(self.raw, split_entries(self.raw, ENTRY_INDENT, start, end))
+        return json.loads(self.raw[start:end])
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.decoded
+
+    def get(self, name: str, default=None):
+        """Sekcja pliku (sekcje historii - dekodowane leniwie per symbol)"""
+        return self.decoded.get(name, default)
+
+class DataPersister:
+    """Zapis price_data.json w tle - śledzenie zmian, łączenie zapisów i atomowa podmiana pliku"""
+    def __init__(self, path: Optional[str], interval: float):
+        self.path = path
+        self.interval = interval
+        self.sections = {}
+        self.fragments = {}
+        self.sources = {}
+        self.dirty = set()
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.hooks = []
+        self.stamp = None
+
+    def register(self, name: str, getter: Callable[[], object]) -> None:
+        """Rejestruje sekcję pliku serializowaną w całości (zapis przy pierwszej zmianie)"""
+        self.sections[name] = (None, getter)
+
+    def register_keyed(self, name: str, keys: Callable[[], List[str]], getter: Callable[[str], object]) -> None:
+        """Rejestruje sekcję-słownik serializowaną osobno dla każdego klucza (np. symbolu)"""
+        self.sections[name] = (keys, getter)
+
+    def seed(self, name: str, source: Callable[[str], Optional[str]]) -> None:
+        """Źródło niezmienionych wpisów sekcji-słownika w postaci tekstu z pliku (bez dekodowania i serializacji)"""
+        self.sources[name] = source
+
+    def on_flush(self, hook: Callable[[], None]) -> None:
+        """Wywoływane przed każdym zapisem (także bez zmian) - np. wczytanie zmian innego procesu"""
+        self.hooks.append(hook)
+
+    def remember_file(self) -> None:
+        """Zapamiętuje stan pliku (czas modyfikacji, rozmiar) jako znany temu procesowi"""
+        try:
+            st = os.stat(self.path)
+            self.stamp = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            self.stamp = None
+
+    def file_changed(self) -> bool:
+        """Czy plik został zmieniony przez inny proces od ostatniego odczytu lub zapisu"""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return False
+        return (st.st_mtime_ns, st.st_size) != self.stamp
+
+    def unregister(self, name: str) -> None:
+        """Usuwa sekcję z pliku"""
+        self.sections.pop(name, None)
+        self.mark_dirty(name)
+
+    def mark_dirty(self, name: str, key: Optional[str] = None) -> None:
+        """Oznacza sekcję (lub jeden jej klucz) do ponownego zapisu"""
+        if self.path is None:
+            return
+        with self.lock:
+            self.dirty.add((name, key))
+
+    def start(self) -> None:
+        """Uruchamia wątek zapisujący co persist_interval_seconds"""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="data-persister", daemon=True)
+            self.thread.start()
+
+    def stop(self) -> None:
+        """Zatrzymuje wątek i zapisuje zaległe zmiany"""
+        self.stopped.set()
+        self.wake.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.flush()
+
+    def _run(self) -> None:
+        while not self.stopped.is_set():
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                console.print(f"[red]Błąd zapisu danych: {str(e)}[/red]")
+
+    @staticmethod
+    def _dump(value: object, level: int) -> str:
+        return json.dumps(value, ensure_ascii=False, indent=2).replace('\n', '\n' + '  ' * level)
+
+    def flush(self) -> bool:
+        """Zapisuje plik jeśli coś się zmieniło - serializuje tylko zmienione fragmenty"""
+        if self.path is None:
+            # Bez pliku (proces roboczy trybu wieloprocesowego) - stan tylko w pamięci
+            return False
+        with self.flush_lock:
+            for hook in self.hooks:
+                hook()
+            with self.lock:
+                dirty, self.dirty = self.dirty, set()
+            if not dirty:
+                return False
+
+            try:
+                # Fragmenty trafiają do pliku kolejno - bez sklejania wielomegabajtowego tekstu w pamięci
+                chunks = []
+                for name, (keys, getter) in self.sections.items():
+                    chunks.append(',\n  ' if chunks else '{\n  ')
+                    chunks.append(f'{json.dumps(name)}: ')
+                    if keys is None:
+                        if (name, None) in dirty or (name, None) not in self.fragments:
+                            self.fragments[(name, None)] = self._dump(getter(), 1)
+                        chunks.append(self.fragments[(name, None)])
+                        continue
+
+                    whole = (name, None) in dirty
+                    source = self.sources.get(name)
+                    separator = '{\n    '
+                    for key in keys():
+                        if whole or (name, key) in dirty:
+                            self.fragments[(name, key)] = self._dump(getter(key), 2)
+                        elif (name, key) not in self.fragments:
+                            text = source(key) if source else None
+                            self.fragments[(name, key)] = text if text is not None else self._dump(getter(key), 2)
+                        chunks.append(f'{separator}{json.dumps(key, ensure_ascii=False)}: ')
+                        chunks.append(self.fragments[(name, key)])
+                        separator = ',\n    '
+                    chunks.append('\n  }' if separator != '{\n    ' else '{}')
+                chunks.append('\n}' if chunks else '{}')
+
+                tmp_path = self.path + '.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.writelines(chunks)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+                self.remember_file()
+            except Exception:
+                with self.lock:
+                    self.dirty |= dirty
+                raise
+
+            return True
+
+# Granice koszyków histogramów czasu (sekundy)
+METRIC_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+class Metrics:
+    """Histogramy czasu, liczniki i wskaźniki - eksport w formacie Prometheus i JSON; wyłączone nic nie kosztują"""
+    def __init__(self, enabled: bool = False, prefix: str = "price_monitor"):
+        self.enabled = enabled
+        self.prefix = prefix
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def series(name: str, labels: Dict[str, str]) -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+        return name, tuple(sorted(labels.items()))
+
+    def observe(self, name: str, seconds: float, **labels: str) -> None:
+        """Dodaje pomiar czasu do histogramu"""
+        if not self.enabled:
+            return
+        key = self.series(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {'buckets': [0] * (len(METRIC_BUCKETS) + 1), 'sum': 0.0, 'count': 0}
+            histogram['buckets'][bisect.bisect_left(METRIC_BUCKETS, seconds)] += 1
+            histogram['sum'] += seconds
+            histogram['count'] += 1
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        """Zwiększa licznik"""
+        if not self.enabled:
+            return
+        key = self.series(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def gauge(self, name: str, getter: Callable[[], float]) -> None:
+        """Rejestruje wskaźnik odczytywany przy eksporcie"""
+        self.gauges[name] = getter
+
+    def wrap(self, name: str, func: Callable, labels: Optional[Callable[..., Dict[str, str]]] = None) -> Callable:
+        """Zwraca funkcję mierzącą czas wywołań func (histogram name)"""
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.observe(name, time.perf_counter() - started, **(labels(*args, **kwargs) if labels else {}))
+        return timed
+
+    @staticmethod
+    def _labels(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+        parts = [f'{key}="{value}"' for key, value in labels]
+        if extra:
+            parts.append(extra)
+        return '{' + ','.join(parts) + '}' if parts else ''
+
+    def read_gauges(self) -> Dict[str, float]:
+        values = {}
+        for name, getter in self.gauges.items():
+            try:
+                values[name] = getter()
+            except Exception:
+                continue
+        return values
+
+    def render_prometheus(self) -> str:
+        """Eksport w formacie tekstowym Prometheus"""
+        with self.lock:
+            histograms = {key: dict(value, buckets=list(value['buckets'])) for key, value in self.histograms.items()}
+            counters = dict(self.counters)
+
+        lines = []
+        typed = set()
+        for (name, labels), histogram in sorted(histograms.items()):
+            metric = f"{self.prefix}_{name}_seconds"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} histogram")
+                typed.add(metric)
+            cumulative = 0
+            for bound, count in zip(METRIC_BUCKETS + ('+Inf',), histogram['buckets']):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{metric}_bucket{self._labels(labels, le)} {cumulative}")
+            lines.append(f"{metric}_sum{self._labels(labels)} {histogram['sum']:.6f}")
+            lines.append(f"{metric}_count{self._labels(labels)} {histogram['count']}")
+
+        for (name, labels), value in sorted(counters.items()):
+            metric = f"{self.prefix}_{name}_total"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{self._labels(labels)} {value:g}")
+
+        for name, value in sorted(self.read_gauges().items()):
+            lines.append(f"# TYPE {self.prefix}_{name} gauge")
+            lines.append(f"{self.prefix}_{name} {value:g}")
+        return '\n'.join(lines) + '\n'
+
+    def to_json(self) -> Dict:
+        """Migawka metryk jako słownik (zrzut JSON)"""
+        def key(name: str, labels: Tuple[Tuple[str, str], ...]) -> str:
+            return name + self._labels(labels)
+
+        with self.lock:
+            histograms = {
+                key(name, labels): {
+                    'count': h['count'],
+                    'sum_seconds': round(h['sum'], 6),
+                    'mean_ms': round(h['sum'] / h['count'] * 1000, 3) if h['count'] else 0,
+                    'buckets': dict(zip([str(bound) for bound in METRIC_BUCKETS] + ['+Inf'], h['buckets']))
+                }
+                for (name, labels), h in self.histograms.items()
+            }
+            counters = {key(name, labels): value for (name, labels), value in self.counters.items()}
+        return {
+            'timestamp': datetime.now().strftime(TIMESTAMP_FORMAT),
+            'histograms': histograms,
+            'counters': counters,
+            'gauges': self.read_gauges()
+        }
+
+    def dump_json(self, path: str) -> None:
+        """Zapisuje migawkę do pliku (atomowa podmiana)"""
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.to_json(), f, ensure_ascii=False, indent=2)
+        os.replace(path + '.tmp', path)
+
+    def serve(self, port: int, host: str = '127.0.0.1'):
+        """Uruchamia lokalny endpoint /metrics w wątku w tle - zwraca serwer"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-endpoint", daemon=True).start()
+        return server
+
+def timestamp_to_epoch(timestamp: str) -> float:
+    """Zamienia znacznik czasu z plików danych na epoch"""
+    return datetime.strptime(timestamp, TIMESTAMP_FORMAT).timestamp()
+
+def epoch_to_timestamp(epoch: float) -> str:
+    """Zamienia epoch na znacznik czasu w formacie plików danych"""
+    return datetime.fromtimestamp(epoch).strftime(TIMESTAMP_FORMAT)
+
+def format_age(seconds: float) -> str:
+    """Wiek odczytu w czytelnej postaci (s, min, h)"""
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds // 60:.0f} min"
+    return f"{seconds / 3600:.1f} h"
+
+# Znaki walut w wyświetlanych cenach - pozostałe waluty jako kod po kwocie (np. 280000.0000 PLN)
+CURRENCY_SIGNS = {'USD': '$', 'EUR': '€', 'GBP': '£', 'JPY': '¥'}
+
+def quote_currency(symbol: str, default: str = 'USD') -> str:
+    """Waluta kwotowania - część po '/' (BTC/PLN, EUR/USD), dla samego symbolu kryptowaluty waluta bazowa"""
+    return symbol.split('/', 1)[1].upper() if '/' in symbol else default.upper()
+
+def format_price(price: float, currency: str = 'USD', digits: int = 4) -> str:
+    """Cena ze znakiem lub kodem waluty"""
+    sign = CURRENCY_SIGNS.get(currency)
+    return f"{sign}{price:.{digits}f}" if sign else f"{price:.{digits}f} {currency}"
+
+DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+def parse_duration(text: str) -> float:
+    """Czas w sekundach z zapisu 90s, 15m, 4h, 7d, 2w (sama liczba - sekundy)"""
+    text = text.strip().lower()
+    unit = DURATION_UNITS.get(text[-1:]) if text else None
+    value = float(text[:-1] if unit else text)
+    if value <= 0:
+        raise ValueError(text)
+    return value * (unit or 1)
+
+def parse_time(text: str) -> float:
+    """Chwila jako epoch - znacznik czasu w formacie plików danych, data RRRR-MM-DD albo epoch"""
+    text = text.strip()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    if len(text) == 10:
+        return datetime.strptime(text, "%Y-%m-%d").timestamp()
+    return timestamp_to_epoch(text)
+
+def aggregate_candles(records: List[Tuple[float, ...]], resolution: int) -> List[Tuple[float, float, float, float, float]]:
+    """Łączy punkty/świece (epoch, o, h, l, c) w świece OHLC o podanej rozdzielczości"""
+    candles = []
+    for epoch, open_, high, low, close in records:
+        bucket = epoch - epoch % resolution
+        if candles and candles[-1][0] == bucket:
+            _, o, h, l, _ = candles[-1]
+            candles[-1] = (bucket, o, max(h, high), min(l, low), close)
+        else:
+            candles.append((bucket, open_, high, low, close))
+    return candles
+
+@functools.lru_cache(maxsize=None)
+def record_dtype(fields: Tuple[str, ...]):
+    """Typ NumPy rekordu segmentu (tworzony leniwie - bez importu numpy przy starcie)"""
+    return np.dtype([(name, '<f8') for name in fields])
+
+HISTORY_FIELDS = ('epoch', 'price')
+CANDLE_FIELDS = ('epoch', 'open', 'high', 'low', 'close')
+
+def merge_series(parts: List[Tuple]) -> Tuple:
+    """Skleja części (epoch, open, high, low, close) z poziomów historii w jedną serię"""
+    parts = [part for part in parts if len(part[0])] or parts[-1:]
+    if len(parts) == 1:
+        return tuple(parts[0])
+    return tuple(np.concatenate([part[i] for part in parts]) for i in range(5))
+
+def aggregate_ohlc(series: Tuple, resolution: float) -> Dict[str, 'np.ndarray']:
+    """Świece OHLC, średnia i liczba punktów w przedziałach o dowolnej długości (NumPy reduceat)"""
+    epochs, opens, highs, lows, closes = series
+    if not len(epochs):
+        return {name: np.empty(0) for name in ('epoch', 'open', 'high', 'low', 'close', 'average', 'count')}
+    if len(epochs) > 1 and (np.diff(epochs) < 0).any():
+        order = np.argsort(epochs, kind='stable')
+        epochs, opens, highs, lows, closes = (a[order] for a in series)
+
+    # Przedziały wyrównane jak w kompakcji (epoch - epoch % resolution); epoch > 0, więc obcięcie = podłoga
+    keys = (epochs / resolution).astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    counts = np.diff(np.r_[starts, len(epochs)])
+    return {
+        'epoch': keys[starts] * float(resolution),
+        'open': opens[starts],
+        'high': np.maximum.reduceat(highs, starts),
+        'low': np.minimum.reduceat(lows, starts),
+        'close': closes[starts + counts - 1],
+        'average': np.add.reduceat(closes, starts) / counts,
+        'count': counts
+    }
+
+class JsonHistoryBackend:
+    """Historia cen zapisywana w price_data.json (dotychczasowy format)"""
+    def __init__(self, data: Dict, resolutions: List[int], on_change: Optional[Callable[[str, str], None]] = None):
+        self.price_history = data.get('price_history') or {}
+        self.tiers = data.get('price_history_tiers') or {}
+        self.resolutions = resolutions
+        self.on_change = on_change or (lambda section, symbol: None)
+        self.lock = threading.RLock()
+        # (symbol, poziom) -> (liczba przetworzonych wpisów, tablica rekordów) - dopisywane przyrostowo
+        self.arrays = {}
+
+    def append(self, symbol: str, epoch: float, price: float) -> None:
+        """Dopisuje punkt historii"""
+        with self.lock:
+            self.price_history.setdefault(symbol, []).append({
+                'price': price,
+                'timestamp': epoch_to_timestamp(epoch)
+            })
+        self.on_change('price_history', symbol)
+
+    def clear(self, symbol: str) -> None:
+        """Czyści historię symbolu (wszystkie poziomy)"""
+        with self.lock:
+            self.price_history[symbol] = []
+            self.tiers.pop(symbol, None)
+            for key in [key for key in self.arrays if key[0] == symbol]:
+                del self.arrays[key]
+        self.on_change('price_history', symbol)
+        self.on_change('price_history_tiers', symbol)
+
+    def count(self, symbol: str) -> int:
+        """Zwraca liczbę surowych punktów historii symbolu"""
+        return len(self.price_history.get(symbol, []))
+
+    def raw(self, symbol: str, start: Optional[float] = None, end: Optional[float] = None) -> List[Tuple[float, float]]:
+        """Zwraca surowe punkty (epoch, cena) z zakresu czasu"""
+        with self.lock:
+            records = [(timestamp_to_epoch(r['timestamp']), r['price']) for r in self.price_history.get(symbol, [])]
+        return [(t, p) for t, p in records if (start is None or t >= start) and (end is None or t <= end)]
+
+    def candles(self, symbol: str, resolution: int, start: Optional[float] = None,
+                end: Optional[float] = None) -> List[Tuple[float, float, float, float, float]]:
+        """Zwraca świece OHLC poziomu o podanej rozdzielczości"""
+        with self.lock:
+            records = [tuple(c) for c in self.tiers.get(symbol, {}).get(str(resolution), [])]
+        return [c for c in records if (start is None or c[0] >= start) and (end is None or c[0] <= end)]
+
+    def append_candles(self, symbol: str, resolution: int, candles: List[Tuple[float, ...]]) -> None:
+        """Dopisuje świece do poziomu historii"""
+        with self.lock:
+            self.tiers.setdefault(symbol, {}).setdefault(str(resolution), []).extend(list(c) for c in candles)
+        self.on_change('price_history_tiers', symbol)
+
+    def drop_before(self, symbol: str, resolution: int, cutoff: float) -> None:
+        """Usuwa punkty poziomu starsze niż cutoff"""
+        with self.lock:
+            if resolution == 0:
+                records = self.price_history.get(symbol, [])
+                self.price_history[symbol] = [r for r in records if timestamp_to_epoch(r['timestamp']) >= cutoff]
+            else:
+                tier = self.tiers.get(symbol, {}).get(str(resolution))
+                if tier is None:
+                    return
+                self.tiers[symbol][str(resolution)] = [c for c in tier if c[0] >= cutoff]
+            self.arrays.pop((symbol, resolution), None)
+        self.on_change('price_history_tiers' if resolution else 'price_history', symbol)
+
+    def last(self, symbol: str, count: int) -> List[Tuple[float, float]]:
+        """Zwraca ostatnie punkty historii (sięga do starszych poziomów gdy brakuje surowych)"""
+        if count <= 0:
+            return []
+        with self.lock:
+            records = self.price_history.get(symbol, [])[-count:]
+            points = [(timestamp_to_epoch(r['timestamp']), r['price']) for r in records]
+        for resolution in self.resolutions:
+            if len(points) >= count:
+                break
+            older = self.candles(symbol, resolution)[-(count - len(points)):]
+            points = [(c[0], c[4]) for c in older] + points
+        return points
+
+    def points(self, symbol: str, start: Optional[float] = None, end: Optional[float] = None) -> List[Tuple[float, float]]:
+        """Zwraca punkty (epoch, cena) z zakresu czasu - przez wszystkie poziomy"""
+        points = []
+        for resolution in reversed(self.resolutions):
+            points.extend((c[0], c[4]) for c in self.candles(symbol, resolution, start, end))
+        points.extend(self.raw(symbol, start, end))
+        return points
+
+    def _array(self, symbol: str, resolution: int, start: Optional[float], end: Optional[float]) -> Tuple:
+        """Rekordy poziomu jako tablice NumPy pól - znaczniki czasu parsowane raz, zakres przez searchsorted"""
+        with self.lock:
+            if resolution:
+                records = self.tiers.get(symbol, {}).get(str(resolution), [])
+                dtype = record_dtype(CANDLE_FIELDS)
+            else:
+                records = self.price_history.get(symbol, [])
+                dtype = record_dtype(HISTORY_FIELDS)
+
+            count, array = self.arrays.get((symbol, resolution), (0, None))
+            if array is None or count > len(records):
+                count, array = 0, np.empty(0, dtype)
+            if count < len(records):
+                tail = records[count:]
+                if resolution:
+                    rows = [tuple(c) for c in tail]
+                else:
+                    rows = [(timestamp_to_epoch(r['timestamp']), r['price']) for r in tail]
+                array = np.concatenate([array, np.array(rows, dtype=dtype)])
+                self.arrays[(symbol, resolution)] = (len(records), array)
+
+        epochs = array['epoch']
+        lo = int(np.searchsorted(epochs, start, 'left')) if start is not None else 0
+        hi = int(np.searchsorted(epochs, end, 'right')) if end is not None else len(array)
+        return tuple(np.array(array[name][lo:hi]) for name in array.dtype.names)
+
+    def series(self, symbol: str, start: Optional[float] = None, end: Optional[float] = None) -> Tuple:
+        """Tablice (epoch, open, high, low, close) z zakresu czasu - przez wszystkie poziomy"""
+        parts = [self._array(symbol, resolution, start, end) for resolution in reversed(self.resolutions)]
+        epochs, prices = self._array(symbol, 0, start, end)
+        parts.append((epochs,) + (prices,) * 4)
+        return merge_series(parts)
+
+    def symbols(self) -> List[str]:
+        """Zwraca symbole z zapisaną historią"""
+        return list(dict.fromkeys([*self.price_history, *self.tiers]))
+
+    def register_sections(self, persister: DataPersister) -> None:
+        """Rejestruje historię jako sekcje price_data.json zapisywane per symbol"""
+        def history_keys() -> List[str]:
+            with self.lock:
+                return list(self.price_history)
+
+        def history_records(symbol: str) -> List[Dict]:
+            with self.lock:
+                return list(self.price_history.get(symbol, []))
+
+        def tier_keys() -> List[str]:
+            with self.lock:
+                return list(self.tiers)
+
+        def tier_candles(symbol: str) -> Dict:
+            with self.lock:
+                return {res: list(candles) for res, candles in self.tiers.get(symbol, {}).items()}
+
+        persister.register_keyed('price_history', history_keys, history_records)
+        persister.register_keyed('price_history_tiers', tier_keys, tier_candles)
+
+    def close(self) -> None:
+        """Zamyka backend"""
+        pass
+
+class SegmentHistoryBackend:
+    """Historia cen w plikach segmentów - rekordy stałej szerokości per symbol, dopisywane na końcu"""
+    # Plik-znacznik katalogu z nazwami kodowanymi procentowo (wcześniej '/' zapisywany jako '_')
+    NAMES_MARKER = '.percent-encoded'
+
+    def __init__(self, directory: str, resolutions: List[int]):
+        self.directory = directory
+        self.resolutions = resolutions
+        self.handles = OrderedDict()
+        self.lock = threading.RLock()
+        if os.path.isdir(directory) and not os.path.exists(os.path.join(directory, self.NAMES_MARKER)):
+            self._migrate_names()
+
+    def _migrate_names(self) -> None:
+        """Jednorazowa zmiana nazw plików z dawnego zapisu EUR_USD na kodowanie procentowe (EUR%2FUSD)"""
+        for name in os.listdir(self.directory):
+            if not name.endswith('.bin'):
+                continue
+            stem, at, resolution = name[:-4].partition('@')
+            encoded = quote(stem.replace('_', '/'), safe='') + at + resolution + '.bin'
+            if encoded != name:
+                os.replace(os.path.join(self.directory, name), os.path.join(self.directory, encoded))
+        self._make_directory()
+
+    def _make_directory(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        marker = os.path.join(self.directory, self.NAMES_MARKER)
+        if not os.path.exists(marker):
+            open(marker, 'w').close()
+
+    def path(self, symbol: str, resolution: int = 0) -> str:
+        """Ścieżka pliku segmentu symbolu (resolution > 0 - plik świec danego poziomu); symbol kodowany procentowo"""
+        suffix = f"@{resolution}" if resolution else ""
+        return os.path.join(self.directory, quote(symbol, safe='') + suffix + '.bin')
+
+    def _append(self, symbol: str, resolution: int, payload: bytes) -> None:
+        key = (symbol, resolution)
+        handle = self.handles.get(key)
+        if handle is None:
+            self._make_directory()
+            handle = self.handles[key] = open(self.path(symbol, resolution), 'ab')
+            if len(self.handles) > MAX_OPEN_SEGMENTS:
+                self.handles.popitem(last=False)[1].close()
+        else:
+            self.handles.move_to_end(key)
+        handle.write(payload)
+        handle.flush()
+
+    def _close_handles(self, symbol: str) -> None:
+        for key in [key for key in self.handles if key[0] == symbol]:
+            self.handles.pop(key).close()
+
+    def append(self, symbol: str, epoch: float, price: float) -> None:
+        """Dopisuje rekord - O(1), bez przepisywania pliku"""
+        with self.lock:
+            self._append(symbol, 0, HISTORY_RECORD.pack(epoch, price))
+
+    def append_candles(self, symbol: str, resolution: int, candles: List[Tuple[float, ...]]) -> None:
+        """Dopisuje świece do pliku poziomu"""
+        with self.lock:
+            self._append(symbol, resolution, b''.join(CANDLE_RECORD.pack(*c) for c in candles))
+
+    def clear(self, symbol: str) -> None:
+        """Czyści historię symbolu (wszystkie poziomy)"""
+        with self.lock:
+            self._close_handles(symbol)
+            self._make_directory()
+            open(self.path(symbol), 'wb').close()
+            for resolution in self.resolutions:
+                if os.path.exists(self.path(symbol, resolution)):
+                    os.remove(self.path(symbol, resolution))
+
+    def count(self, symbol: str) -> int:
+        """Zwraca liczbę surowych rekordów w segmencie"""
+        try:
+            return os.path.getsize(self.path(symbol)) // HISTORY_RECORD.size
+        except OSError:
+            return 0
+
+    def _scan(self, path: str, record: struct.Struct, start: Optional[float] = None,
+              end: Optional[float] = None, last_count: Optional[int] = None) -> List[Tuple[float, ...]]:
+        """Skan zakresu przez mmap - wyszukiwanie binarne po znacznikach czasu"""
+        with self.lock:
+            try:
+                total = os.path.getsize(path) // record.size
+            except OSError:
+                return []
+            if total == 0:
+                return []
+
+            with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                size = record.size
+
+                def bound(value: float, inclusive: bool) -> int:
+                    lo, hi = 0, total
+                    while lo < hi:
+                        mid = (lo + hi) // 2
+                        epoch = record.unpack_from(mm, mid * size)[0]
+                        if epoch < value or (inclusive and epoch == value):
+                            lo = mid + 1
+                        else:
+                            hi = mid
+                    return lo
+
+                if last_count is not None:
+                    lo, hi = max(0, total - last_count), total
+                else:
+                    lo = bound(start, False) if start is not None else 0
+                    hi = bound(end, True) if end is not None else total
+
+                return [record.unpack_from(mm, i * size) for i in range(lo, hi)]
+
+    def raw(self, symbol: str, start: Optional[float] = None, end: Optional[float] = None) -> List[Tuple[float, float]]:
+        """Zwraca surowe punkty (epoch, cena) z zakresu czasu"""
+        return self._scan(self.path(symbol), HISTORY_RECORD, start, end)
+
+    def candles(self, symbol: str, resolution: int, start: Optional[float] = None,
+                end: Optional[float] = None) -> List[Tuple[float, float, float, float, float]]:
+        """Zwraca świece OHLC poziomu o podanej rozdzielczości"""
+        return self._scan(self.path(symbol, resolution), CANDLE_RECORD, start, end)
+
+    def drop_before(self, symbol: str, resolution: int, cutoff: float) -> None:
+        """Usuwa rekordy poziomu starsze niż cutoff (przepisuje ogon pliku atomowo)"""
+        record = CANDLE_RECORD if resolution else HISTORY_RECORD
+        path = self.path(symbol, resolution)
+        with self.lock:
+            if not os.path.exists(path):
+                return
+            keep = self._scan(path, record, start=cutoff)
+            self._close_handles(symbol)
+            with open(path + '.tmp', 'wb') as f:
+                f.write(b''.join(record.pack(*r) for r in keep))
+            os.replace(path + '.tmp', path)
+
+    def last(self, symbol: str, count: int) -> List[Tuple[float, float]]:
+        """Zwraca ostatnie punkty historii (sięga do starszych poziomów gdy brakuje surowych)"""
+        if count <= 0:
+            return []
+        points = self._scan(self.path(symbol), HISTORY_RECORD, last_count=count)
+        for resolution in self.resolutions:
+            if len(points) >= count:
+                break
+            older = self._scan(self.path(symbol, resolution), CANDLE_RECORD, last_count=count - len(points))
+            points = [(c[0], c[4]) for c in older] + points
+        return points
+
+    def points(self, symbol: str, start: Optional[float] = None, end: Optional[float] = None) -> List[Tuple[float, float]]:
+        """Zwraca punkty (epoch, cena) z zakresu czasu - przez wszystkie poziomy"""
+        points = []
+        for resolution in reversed(self.resolutions):
+            points.extend((c[0], c[4]) for c in self.candles(symbol, resolution, start, end))
+        points.extend(self.raw(symbol, start, end))
+        return points
+
+    def _array(self, path: str, fields: Tuple[str, ...], start: Optional[float], end: Optional[float]) -> Tuple:
+        """Zakres pliku segmentu jako tablice NumPy pól (memmap + searchsorted, kopiowany jest tylko wynik)"""
+        dtype = record_dtype(fields)
+        with self.lock:
+            try:
+                total = os.path.getsize(path) // dtype.itemsize
+            except OSError:
+                total = 0
+            if total == 0:
+                return tuple(np.empty(0) for _ in fields)
+
+            data = np.memmap(path, dtype=dtype, mode='r', shape=(total,))
+            epochs = data['epoch']
+            lo = int(np.searchsorted(epochs, start, 'left')) if start is not None else 0
+            hi = int(np.searchsorted(epochs, end, 'right')) if end is not None else total
+            # Ciągłe kopie pól - szybsze obliczenia niż widoki z krokiem rekordu
+            result = tuple(np.array(data[name][lo:hi]) for name in fields)
+            # Zwolnienie mapowania od razu - drop_before podmienia plik (Windows)
+            del epochs, data
+            return result
+
+    def series(self, symbol: str, start: Optional[float] = None, end: Optional[float] = None) -> Tuple:
+        """Tablice (epoch, open, high, low, close) z zakresu czasu - przez wszystkie poziomy"""
+        parts = [self._array(self.path(symbol, resolution), CANDLE_FIELDS, start, end)
+                 for resolution in reversed(self.resolutions)]
+        epochs, prices = self._array(self.path(symbol), HISTORY_FIELDS, start, end)
+        parts.append((epochs,) + (prices,) * 4)
+        return merge_series(parts)
+
+    def symbols(self) -> List[str]:
+        """Zwraca symbole z zapisanymi segmentami"""
+        if not os.path.isdir(self.directory):
+            return []
+        names = (name[:-4].split('@')[0] for name in os.listdir(self.directory) if name.endswith('.bin'))
+        return [unquote(name) for name in dict.fromkeys(names)]
+
+    def register_sections(self, persister: DataPersister) -> None:
+        """Historia nie trafia do price_data.json"""
+        pass
+
+    def close(self) -> None:
+        """Zamyka otwarte pliki segmentów"""
+        with self.lock:
+            for handle in self.handles.values():
+                handle.close()
+            self.handles.clear()
+
+class Alert(NamedTuple):
+    """Wyzwolony alert cenowy"""
+    symbol: str
+    old_price: float
+    current_price: float
+    change_percent: float
+    alert_type: str
+    rule: Optional[str] = None
+    repeats: int = 1
+    # Id subskrypcji poziomu, która wyzwoliła alert
+    subscription: Optional[int] = None
+
+class AlertBook:
+    """Stan alertów w równoległych tablicach NumPy - wektorowa ocena progów i cooldownu"""
+    def __init__(self, assets: List[AssetRecord]):
+        self.index = {}
+        self.assets = []
+        # Tablice tworzone przy pierwszej ocenie - start bez importu NumPy
+        self.last_price = None
+
+        for asset in assets:
+            self.add(asset)
+
+    def _ensure_arrays(self) -> None:
+        if self.last_price is not None:
+            return
+
+        capacity = max(16, len(self.assets))
+        self.last_price = np.full(capacity, np.nan)
+        self.alert_up = np.zeros(capacity)
+        self.alert_down = np.zeros(capacity)
+        self.last_alert_up = np.full(capacity, np.nan)
+        self.last_alert_down = np.full(capacity, np.nan)
+        for row, asset in enumerate(self.assets):
+            self._fill(row, asset)
+
+    def _grow(self) -> None:
+        capacity = len(self.last_price) * 2
+        for name, fill in (('last_price', np.nan), ('alert_up', 0.0), ('alert_down', 0.0),
+                           ('last_alert_up', np.nan), ('last_alert_down', np.nan)):
+            old = getattr(self, name)
+            grown = np.full(capacity, fill)
+            grown[:len(old)] = old
+            setattr(self, name, grown)
+
+    def add(self, asset: AssetRecord) -> None:
+        """Dodaje aktywo (lub odświeża jego wiersz) - znaczniki czasu parsowane jednorazowo"""
+        row = self.index.get(asset.symbol)
+        if row is None:
+            if self.last_price is not None and len(self.assets) == len(self.last_price):
+                self._grow()
+            row = self.index[asset.symbol] = len(self.assets)
+            self.assets.append(asset)
+        else:
+            self.assets[row] = asset
+
+        if self.last_price is not None:
+            self._fill(row, asset)
+
+    def _fill(self, row: int, asset: AssetRecord) -> None:
+        self.last_price[row] = asset.last_price if asset.last_price is not None else np.nan
+        self.alert_up[row] = asset.alert_up
+        self.alert_down[row] = asset.alert_down
+        self.last_alert_up[row] = timestamp_to_epoch(asset.last_alert_up) if asset.last_alert_up else np.nan
+        self.last_alert_down[row] = timestamp_to_epoch(asset.last_alert_down) if asset.last_alert_down else np.nan
+
+    def remove(self, symbol: str) -> None:
+        """Usuwa aktywo - ostatni wiersz przenoszony na zwolnione miejsce"""
+        row = self.index.pop(symbol, None)
+        if row is None:
+            return
+
+        last = len(self.assets) - 1
+        if row != last:
+            moved = self.assets[last]
+            self.assets[row] = moved
+            self.index[moved.symbol] = row
+            if self.last_price is not None:
+                for array in (self.last_price, self.alert_up, self.alert_down, self.last_alert_up, self.last_alert_down):
+                    array[row] = array[last]
+        self.assets.pop()
+
+    def evaluate(self, symbols: List[str], prices: List[float], now: Optional[float] = None) -> List[Alert]:
+        """Ocenia zmiany cen dla wielu symboli naraz i zwraca tylko wyzwolone alerty"""
+        now = time.time() if now is None else now
+        self._ensure_arrays()
+        rows = np.fromiter((self.index[symbol] for symbol in symbols), dtype=np.intp, count=len(symbols))
+        current = np.asarray(prices, dtype=float)
+
+        old = self.last_price[rows]
+        known = ~np.isnan(old) & (old != 0)
+        change = np.zeros(len(rows))
+        np.divide((current - old) * 100, old, out=change, where=known)
+
+        # Alert tylko gdy nie było alertu tego typu w ostatnich ALERT_COOLDOWN_SECONDS sekundach
+        last_up = self.last_alert_up[rows]
+        last_down = self.last_alert_down[rows]
+        cooled_up = np.isnan(last_up) | (now - last_up > ALERT_COOLDOWN_SECONDS)
+        cooled_down = np.isnan(last_down) | (now - last_down > ALERT_COOLDOWN_SECONDS)
+
+        above = known & (change >= self.alert_up[rows])
+        below = known & ~above & (change <= -self.alert_down[rows])
+        up = above & cooled_up
+        down = below & cooled_down
+
+        self.last_price[rows] = current
+        self.last_alert_up[rows[up]] = now
+        self.last_alert_down[rows[down]] = now
+
+        alerts = []
+        for i in np.flatnonzero(up | down):
+            alerts.append(Alert(symbols[i], float(old[i]), float(current[i]), float(change[i]), "up" if up[i] else "down"))
+        return alerts
+
+def cooldown_alerts(epochs, candidates, cooldown: float = ALERT_COOLDOWN_SECONDS):
+    """Wybiera z kandydatów alerty przepuszczone przez cooldown (jak AlertBook) - skoki przez searchsorted"""
+    times = epochs[candidates]
+    if len(times) < 2 or np.diff(times).min() > cooldown:
+        return candidates
+
+    chosen = []
+    i = 0
+    while i < len(times):
+        chosen.append(i)
+        i = int(np.searchsorted(times, times[i] + cooldown, side='right'))
+    return candidates[chosen]
+
+def backtest_thresholds(epochs, prices, up_grid: List[float], down_grid: List[float],
+                        cooldown: float = ALERT_COOLDOWN_SECONDS) -> Dict[str, List[Dict]]:
+    """Symulacja alertów AlertBook dla siatki progów w jednym przebiegu (czas symulowany, bez dźwięku)"""
+    epochs = np.asarray(epochs, dtype=float)
+    prices = np.asarray(prices, dtype=float)
+    # Zmiana liczona względem poprzedniego ticku - jak w check_price_change
+    change = np.zeros(len(prices))
+    if len(prices) > 1:
+        previous = prices[:-1]
+        np.divide((prices[1:] - previous) * 100, previous, out=change[1:], where=previous != 0)
+    days = max((epochs[-1] - epochs[0]) / 86400, 1 / 1440) if len(epochs) > 1 else 1 / 1440
+
+    def sweep(grid: List[float], direction: int) -> List[Dict]:
+        results = []
+        for threshold in grid:
+            hits = change >= threshold if direction > 0 else change <= -threshold
+            hits[0] = False
+            alerts = cooldown_alerts(epochs, np.flatnonzero(hits), cooldown)
+            times = epochs[alerts]
+            results.append({
+                'threshold': threshold,
+                'alerts': len(alerts),
+                'per_day': round(float(len(alerts) / days), 3),
+                'median_gap_minutes': round(float(np.median(np.diff(times))) / 60, 1) if len(times) > 1 else None,
+                'first': epoch_to_timestamp(times[0]) if len(times) else None,
+                'last': epoch_to_timestamp(times[-1]) if len(times) else None
+            })
+        return results
+
+    return {'points': len(prices), 'days': round(float(days), 3), 'up': sweep(up_grid, 1), 'down': sweep(down_grid, -1)}
+
+def csv_epoch(stamp: str) -> float:
+    """Czas wiersza CSV (epoch lub RRRR-MM-DD GG:MM:SS) - NaN gdy nieczytelny"""
+    try:
+        return float(stamp)
+    except ValueError:
+        pass
+    try:
+        return timestamp_to_epoch(stamp.strip())
+    except ValueError:
+        return math.nan
+
+def load_price_csv(path: str) -> Dict[str, Tuple[List[float], List[float]]]:
+    """Wczytuje CSV z kolumnami symbol,timestamp,price (timestamp: epoch lub RRRR-MM-DD GG:MM:SS) - ValueError przy błędnym pliku"""
+    columns = {}
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        header = [name.strip().lower() for name in next(reader, [])]
+        missing = [name for name in ('symbol', 'timestamp', 'price') if name not in header]
+        if missing:
+            raise ValueError(f"brak kolumn {', '.join(missing)} w nagłówku {path}")
+        symbol_col, stamp_col, price_col = (header.index(name) for name in ('symbol', 'timestamp', 'price'))
+        for row in reader:
+            if len(row) != len(header):
+                continue
+            stamps, prices = columns.setdefault(row[symbol_col].upper(), ([], []))
+            stamps.append(row[stamp_col])
+            prices.append(row[price_col])
+
+    series = {}
+    for symbol, (stamps, prices) in columns.items():
+        # Konwersja całych kolumn w NumPy zamiast wiersz po wierszu
+        try:
+            epochs = np.array(stamps, dtype=float)
+        except ValueError:
+            epochs = np.array([csv_epoch(stamp) for stamp in stamps], dtype=float)
+        try:
+            values = np.array(prices, dtype=float)
+        except ValueError:
+            raise ValueError(f"błędna cena {symbol} w {path}") from None
+        # Wiersze z nieczytelnym czasem lub ceną (NaN) są pomijane
+        valid = np.isfinite(epochs) & np.isfinite(values)
+        series[symbol] = (epochs[valid], values[valid])
+    return series
+
+WINDOW_RULE_KINDS = ('change', 'drawdown', 'rally')
+
+def parse_window_rules(text: str) -> List[Dict]:
+    """Parsuje reguły okna w formacie rodzaj:sekundy:próg, np. change:900:5,drawdown:3600:4"""
+    rules = []
+    for part in filter(None, (chunk.strip() for chunk in text.split(','))):
+        kind, window, threshold = part.split(':')
+        if kind not in WINDOW_RULE_KINDS or float(window) <= 0 or float(threshold) <= 0:
+            raise ValueError(part)
+        rules.append({'kind': kind, 'window_seconds': int(window), 'threshold': float(threshold)})
+    return rules
+
+def describe_window_rule(rule: Dict) -> str:
+    """Zwraca czytelny opis reguły okna"""
+    window = rule['window_seconds']
+    span = f"{window // 60} min" if window >= 60 and window % 60 == 0 else f"{window}s"
+    labels = {'change': 'Zmiana w oknie', 'drawdown': 'Spadek od szczytu', 'rally': 'Wzrost od dołka'}
+    return f"{labels[rule['kind']]} {span} ≥ {rule['threshold']}%"
+
+class RollingWindow:
+    """Okno czasowe cen z monotonicznymi kolejkami - max/min/najstarszy w O(1) zamortyzowanym"""
+    __slots__ = ('seconds', 'points', 'highs', 'lows')
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.points = deque()
+        self.highs = deque()
+        self.lows = deque()
+
+    def push(self, epoch: float, price: float) -> None:
+        """Dodaje punkt i usuwa punkty starsze niż okno"""
+        self.points.append((epoch, price))
+        while self.highs and self.highs[-1][1] <= price:
+            self.highs.pop()
+        self.highs.append((epoch, price))
+        while self.lows and self.lows[-1][1] >= price:
+            self.lows.pop()
+        self.lows.append((epoch, price))
+
+        cutoff = epoch - self.seconds
+        for queue in (self.points, self.highs, self.lows):
+            while queue[0][0] < cutoff:
+                queue.popleft()
+
+    @property
+    def oldest(self) -> float:
+        """Najstarsza cena w oknie"""
+        return self.points[0][1]
+
+    @property
+    def high(self) -> float:
+        """Najwyższa cena w oknie"""
+        return self.highs[0][1]
+
+    @property
+    def low(self) -> float:
+        """Najniższa cena w oknie"""
+        return self.lows[0][1]
+
+class WindowRuleEngine:
+    """Reguły kroczącego okna per aktywo - zmiana w N sekund, spadek od szczytu, wzrost od dołka"""
+    def __init__(self):
+        self.rules = {}
+        self.windows = {}
+        self.last_alerts = {}
+
+    def set_rules(self, symbol: str, rules: List[Dict]) -> None:
+        """Ustawia reguły aktywa (pusta lista usuwa stan okien)"""
+        if not rules:
+            self.remove(symbol)
+            return
+        self.rules[symbol] = rules
+        self.windows[symbol] = {rule['window_seconds']: RollingWindow(rule['window_seconds']) for rule in rules}
+
+    def remove(self, symbol: str) -> None:
+        """Usuwa reguły i stan okien aktywa"""
+        self.rules.pop(symbol, None)
+        self.windows.pop(symbol, None)
+        for key in [key for key in self.last_alerts if key[0] == symbol]:
+            del self.last_alerts[key]
+
+    def seed(self, symbol: str, points: List[Tuple[float, float]]) -> None:
+        """Wypełnia okna punktami z historii (jednorazowo przy starcie, bez oceny reguł)"""
+        for window in self.windows.get(symbol, {}).values():
+            for epoch, price in points:
+                window.push(epoch, price)
+
+    def on_tick(self, symbol: str, epoch: float, price: float) -> List[Alert]:
+        """Aktualizuje okna aktywa nowym tickiem i zwraca wyzwolone alerty"""
+        windows = self.windows.get(symbol)
+        if windows is None:
+            return []
+
+        for window in windows.values():
+            window.push(epoch, price)
+
+        alerts = []
+        for i, rule in enumerate(self.rules[symbol]):
+            window = windows[rule['window_seconds']]
+            threshold = rule['threshold']
+
+            if rule['kind'] == 'change':
+                reference = window.oldest
+                change = (price - reference) / reference * 100 if reference else 0.0
+                hit = change >= threshold or change <= -threshold
+            elif rule['kind'] == 'drawdown':
+                reference = window.high
+                change = (price - reference) / reference * 100 if reference else 0.0
+                hit = -change >= threshold
+            else:
+                reference = window.low
+                change = (price - reference) / reference * 100 if reference else 0.0
+                hit = change >= threshold
+
+            if not hit:
+                continue
+
+            last_alert = self.last_alerts.get((symbol, i))
+            if last_alert is not None and epoch - last_alert <= ALERT_COOLDOWN_SECONDS:
+                continue
+
+            self.last_alerts[(symbol, i)] = epoch
+            alerts.append(Alert(symbol, reference, price, change, "up" if change > 0 else "down",
+                                describe_window_rule(rule)))
+        return alerts
+
+class Subscription:
+    """Subskrypcja poziomu ceny - alert przy przecięciu poziomu w górę lub w dół"""
+    __slots__ = ('id', 'symbol', 'level', 'direction', 'owner', 'once', 'percent', 'reference')
+
+    def __init__(self, id: int, symbol: str, level: float, direction: str, owner: str = "", once: bool = False,
+                 percent: Optional[float] = None, reference: Optional[float] = None):
+        self.id = id
+        self.symbol = symbol
+        self.level = level
+        self.direction = direction
+        self.owner = owner
+        self.once = once
+        # Reguła procentowa - poziom wyliczony z ceny odniesienia w chwili subskrypcji
+        self.percent = percent
+        self.reference = reference
+
+    def describe(self) -> str:
+        """Opis reguły w alercie (np. 'poziom 70000 ↑ (+5% od 66666.67) - jan')"""
+        arrow = "↑" if self.direction == "up" else "↓"
+        text = f"poziom {self.level:g} {arrow}"
+        if self.percent is not None:
+            text += f" ({self.percent:+g}% od {self.reference:g})"
+        if self.owner:
+            text += f" - {self.owner}"
+        return text
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+class IdCounter:
+    """Licznik id wspólny dla procesów (monitor i polecenia CLI) - plik z kolejnym numerem zmieniany pod blokadą"""
+    def __init__(self, path: str):
+        self.path = path
+
+    def take(self, floor: int) -> int:
+        """Rezerwuje kolejne id (nie mniejsze niż floor) - żaden inny proces nie dostanie tego samego"""
+        with open(self.path, 'a+b') as f:
+            if os.name == 'nt':
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                stored = f.read().strip()
+                value = max(int(stored) if stored.isdigit() else 1, floor)
+                f.seek(0)
+                f.truncate()
+                f.write(str(value + 1).encode())
+                f.flush()
+                os.fsync(f.fileno())
+            finally:
+                if os.name == 'nt':
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+                else:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        return value
+
+class SubscriptionIndex:
+    """Subskrypcje poziomów per symbol w posortowanych listach (osobno w górę i w dół) - tick odwiedza tylko przecięte"""
+    def __init__(self, subscriptions: Optional[List[Dict]] = None, next_id: Optional[int] = None,
+                 counter: Optional[IdCounter] = None):
+        # symbol -> {'up': ([poziomy], [subskrypcje]), 'down': (...)} - listy równoległe dla bisect
+        self.books = {}
+        self.by_id = {}
+        # Bez licznika (proces bez pliku danych) id nadawane tylko w pamięci
+        self.counter = counter
+        for data in subscriptions or []:
+            self._insert(Subscription(**data))
+        self.next_id = max(next_id or 1, max(self.by_id, default=0) + 1)
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def _insert(self, sub: Subscription) -> None:
+        book = self.books.setdefault(sub.symbol, {'up': ([], []), 'down': ([], [])})
+        levels, subs = book[sub.direction]
+        # Przy równych poziomach kolejność dodania (insort_right)
+        i = bisect.bisect_right(levels, sub.level)
+        levels.insert(i, sub.level)
+        subs.insert(i, sub)
+        self.by_id[sub.id] = sub
+
+    def add(self, symbol: str, level: float, direction: str, owner: str = "", once: bool = False,
+            percent: Optional[float] = None, reference: Optional[float] = None) -> Subscription:
+        """Dodaje subskrypcję z kolejnym wolnym id (zarezerwowanym w liczniku wspólnym dla procesów)"""
+        if direction not in ('up', 'down'):
+            raise ValueError(f"Nieznany kierunek: {direction}")
+        sub_id = self.next_id if self.counter is None else self.counter.take(self.next_id)
+        sub = Subscription(sub_id, symbol.upper(), float(level), direction, owner, once, percent, reference)
+        self.next_id = sub_id + 1
+        self._insert(sub)
+        return sub
+
+    def remove(self, sub_id: int) -> Optional[Subscription]:
+        """Usuwa subskrypcję - O(log n) wyszukanie poziomu i przesunięcie listy"""
+        sub = self.by_id.pop(sub_id, None)
+        if sub is None:
+            return None
+        levels, subs = self.books[sub.symbol][sub.direction]
+        i = bisect.bisect_left(levels, sub.level)
+        while subs[i] is not sub:
+            i += 1
+        del levels[i]
+        del subs[i]
+        if not any(self.books[sub.symbol][direction][0] for direction in ('up', 'down')):
+            del self.books[sub.symbol]
+        return sub
+
+    def remove_symbol(self, symbol: str) -> List[Subscription]:
+        """Usuwa wszystkie subskrypcje symbolu"""
+        book = self.books.pop(symbol, None)
+        if book is None:
+            return []
+        removed = book['up'][1] + book['down'][1]
+        for sub in removed:
+            del self.by_id[sub.id]
+        return removed
+
+    def for_symbol(self, symbol: str) -> List[Subscription]:
+        book = self.books.get(symbol)
+        if book is None:
+            return []
+        return book['up'][1] + book['down'][1]
+
+    def crossed(self, symbol: str, old_price: float, new_price: float) -> List[Subscription]:
+        """Subskrypcje przecięte ruchem old -> new: w górę poziomy z (old, new], w dół z [new, old) - O(log n + wyzwolone)"""
+        book = self.books.get(symbol)
+        if book is None or old_price is None or new_price == old_price:
+            return []
+        if new_price > old_price:
+            levels, subs = book['up']
+            hits = subs[bisect.bisect_right(levels, old_price):bisect.bisect_right(levels, new_price)]
+        else:
+            levels, subs = book['down']
+            # Od najbliższego poziomu - kolejność przecięcia przy spadku
+            hits = subs[bisect.bisect_left(levels, new_price):bisect.bisect_left(levels, old_price)][::-1]
+        for sub in [sub for sub in hits if sub.once]:
+            self.remove(sub.id)
+        return hits
+
+    def merge(self, stored: List[Dict], next_id: Optional[int], known: Iterable[int]) -> bool:
+        """Łączy z sekcją zapisaną przez inny proces - known to id z pliku przy ostatnim odczycie lub zapisie"""
+        known = set(known)
+        stored_ids = {data['id'] for data in stored}
+        changed = False
+        for sub_id in known - stored_ids:
+            changed |= self.remove(sub_id) is not None
+        for data in stored:
+            if data['id'] in known:
+                continue
+            existing = self.by_id.get(data['id'])
+            if existing is not None:
+                if existing.to_dict() != data:
+                    # Id pokazane już użytkownikowi nie jest zmieniane - możliwe tylko po usunięciu pliku licznika
+                    console.print(f"[yellow]⚠[/yellow] Subskrypcja #{data['id']} z pliku koliduje z lokalną - pominięta")
+                continue
+            self._insert(Subscription(**data))
+            self.next_id = max(self.next_id, data['id'] + 1)
+            changed = True
+        self.next_id = max(self.next_id, next_id or 1)
+        return changed
+
+    def to_json(self) -> List[Dict]:
+        """Lista w formacie sekcji subscriptions pliku danych"""
+        return [sub.to_dict() for sub in self.by_id.values()]
+
+class PollScheduler:
+    """Kolejka priorytetowa terminów sprawdzenia aktywów na zegarze monotonicznym - bez dryfu"""
+    def __init__(self, merge_window: float = 1.0):
+        self.merge_window = merge_window
+        self.heap = []
+        # Aktualny termin i interwał każdego aktywa - wpisy kopca z innym terminem są nieaktualne
+        self.due = {}
+        self.intervals = {}
+
+    def __len__(self) -> int:
+        return len(self.due)
+
+    def schedule(self, asset_id: int, interval: float, start: Optional[float] = None) -> None:
+        """Dodaje aktywo (lub zmienia interwał) - pierwsze sprawdzenie w chwili start"""
+        due = time.monotonic() if start is None else start
+        self.intervals[asset_id] = max(interval, 0.001)
+        self.due[asset_id] = due
+        heapq.heappush(self.heap, (due, asset_id))
+
+    def remove(self, asset_id: int) -> None:
+        """Usuwa aktywo z harmonogramu"""
+        self.due.pop(asset_id, None)
+        self.intervals.pop(asset_id, None)
+
+    def sync(self, intervals: Dict[int, float], now: Optional[float] = None) -> None:
+        """Uzgadnia harmonogram z rejestrem - nowe aktywa od razu, usunięte znikają"""
+        for asset_id in [asset_id for asset_id in self.due if asset_id not in intervals]:
+            self.remove(asset_id)
+        for asset_id, interval in intervals.items():
+            if asset_id not in self.due:
+                self.schedule(asset_id, interval, now)
+            elif self.intervals[asset_id] != interval:
+                self.intervals[asset_id] = interval
+
+    def next_due(self) -> Optional[float]:
+        """Najbliższy termin (None gdy harmonogram jest pusty)"""
+        while self.heap and self.due.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now: float) -> List[int]:
+        """Zwraca aktywa do sprawdzenia - także te przypadające w oknie łączenia - i planuje kolejne terminy"""
+        batch = []
+        rescheduled = []
+        limit = now + self.merge_window
+        while self.heap and self.heap[0][0] <= limit:
+            due, asset_id = heapq.heappop(self.heap)
+            if self.due.get(asset_id) != due:
+                continue
+
+            # Następny termin liczony od poprzedniego terminu, nie od chwili pobrania - brak dryfu;
+            # po dłuższym przestoju pominięte terminy nie są nadrabiane seriami
+            interval = self.intervals[asset_id]
+            next_due = due + interval
+            if next_due <= now:
+                next_due += interval * math.ceil((now - next_due) / interval + 1e-9)
+            self.due[asset_id] = next_due
+            rescheduled.append((next_due, asset_id))
+            batch.append(asset_id)
+
+        # Kolejne terminy wracają na kopiec po zebraniu partii - aktywo najwyżej raz w partii
+        for entry in rescheduled:
+            heapq.heappush(self.heap, entry)
+        return batch
+
+class Tick(NamedTuple):
+    """Tick ceny ze strumienia (received - chwila odbioru, perf_counter)"""
+    symbol: str
+    price: float
+    epoch: float
+    received: float
+
+# Znaczniki czasu ticków powyżej tej wartości to milisekundy (sekundy odpowiadałyby roku ~5138)
+MAX_TICK_EPOCH = 1e11
+
+def tick_epoch(ts: object, now: float) -> float:
+    """Czas ticku w sekundach epoki - brak, nieskończony, ujemny lub w milisekundach: czas odbioru; przyszły: teraz"""
+    try:
+        epoch = float(ts)
+    except (TypeError, ValueError):
+        return now
+    if not math.isfinite(epoch) or epoch <= 0 or epoch > MAX_TICK_EPOCH:
+        return now
+    return min(epoch, now)
+
+def read_ndjson_ticks(lines: Iterable) -> Iterator[Tick]:
+    """Zamienia linie NDJSON ({"symbol": ..., "price": ..., "ts": ...}) na ticki - błędne linie są pomijane"""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+            price = float(data['price'])
+            epoch = tick_epoch(data.get('ts'), time.time())
+            symbol = str(data['symbol']).upper()
+        except (ValueError, KeyError, TypeError, AttributeError):
+            continue
+        if price > 0 and math.isfinite(price):
+            yield Tick(symbol, price, epoch, time.perf_counter())
+
+class TickBuffer:
+    """Bufor między czytelnikami strumienia a silnikiem alertów - ostatni tick na symbol, blokuje gdy pełny"""
+    def __init__(self, max_pending: int = 10000):
+        self.max_pending = max(1, max_pending)
+        self.pending = OrderedDict()
+        self.condition = threading.Condition()
+        self.closed = False
+        self.received = 0
+        self.coalesced = 0
+
+    def put(self, tick: Tick) -> None:
+        """Dodaje tick; gdy konsument nie nadąża - zastępuje poprzedni tick symbolu albo czeka (backpressure)"""
+        with self.condition:
+            while len(self.pending) >= self.max_pending and tick.symbol not in self.pending and not self.closed:
+                self.condition.wait(0.5)
+            self.received += 1
+            if tick.symbol in self.pending:
+                # Cena najnowsza, czas odbioru najstarszy - opóźnienie liczone od pierwszego zaległego ticku
+                tick = tick._replace(received=self.pending[tick.symbol].received)
+                self.coalesced += 1
+            self.pending[tick.symbol] = tick
+            self.condition.notify_all()
+
+    def feed(self, ticks: Iterable[Tick]) -> None:
+        """Przepisuje ticki z generatora do bufora"""
+        for tick in ticks:
+            if self.closed:
+                break
+            self.put(tick)
+
+    def batches(self) -> Iterator[List[Tick]]:
+        """Zwraca zaległe ticki partiami, gdy tylko się pojawią - kończy po zamknięciu i opróżnieniu"""
+        while True:
+            with self.condition:
+                while not self.pending and not self.closed:
+                    self.condition.wait(0.5)
+                if not self.pending:
+                    return
+                batch, self.pending = list(self.pending.values()), OrderedDict()
+                self.condition.notify_all()
+            yield batch
+
+    def close(self) -> None:
+        """Kończy strumień"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+def parse_stream_address(address: str) -> Tuple[str, object]:
+    """Adres strumienia: tcp://host:port, unix:///ścieżka lub - (stdin/stdout)"""
+    if address == '-':
+        return 'stdio', None
+    if address.startswith('tcp://'):
+        host, _, port = address[len('tcp://'):].rpartition(':')
+        return 'tcp', (host or '127.0.0.1', int(port))
+    if address.startswith('unix://'):
+        return 'unix', address[len('unix://'):]
+    raise ValueError(f"Nieznany adres strumienia: {address}")
+
+def start_tick_listener(address: str, buffer: TickBuffer):
+    """Uruchamia źródło ticków zasilające bufor - zwraca serwer (None dla stdin)"""
+    kind, target = parse_stream_address(address)
+    if kind == 'stdio':
+        def read_stdin() -> None:
+            buffer.feed(read_ndjson_ticks(sys.stdin))
+            buffer.close()
+
+        threading.Thread(target=read_stdin, name="tick-stdin", daemon=True).start()
+        return None
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            buffer.feed(read_ndjson_ticks(self.rfile))
+
+    if kind == 'unix':
+        if os.path.exists(target):
+            os.remove(target)
+        server = socketserver.ThreadingUnixStreamServer(target, Handler)
+    else:
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        server = socketserver.ThreadingTCPServer(target, Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="tick-listener", daemon=True).start()
+    return server
+
+def replay_ticks(address: str, ticks: Iterable[Tuple[str, float]], rate: float = 0) -> int:
+    """Producent testowy - wysyła ticki NDJSON pod adres strumienia (rate ticków/s, 0 - bez limitu)"""
+    kind, target = parse_stream_address(address)
+    if kind == 'stdio':
+        stream = sys.stdout
+        connection = None
+    else:
+        family = socket.AF_UNIX if kind == 'unix' else socket.AF_INET
+        connection = socket.socket(family, socket.SOCK_STREAM)
+        connection.connect(target)
+        stream = connection.makefile('w', encoding='utf-8')
+
+    sent = 0
+    started = time.monotonic()
+    try:
+        for symbol, price in ticks:
+            stream.write(json.dumps({'symbol': symbol, 'price': price, 'ts': time.time()}) + '\n')
+            sent += 1
+            if rate > 0:
+                stream.flush()
+                delay = started + sent / rate - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+        stream.flush()
+    finally:
+        if connection is not None:
+            stream.close()
+            connection.close()
+    return sent
+
+class AlertDispatcher:
+    """Ograniczona kolejka alertów obsługiwana przez wątek w tle - pętla pobierania nie czeka na dźwięk ani webhook"""
+    def __init__(self, sinks: List[Callable[[Alert], None]], max_size: int = 256,
+                 on_drop: Optional[Callable[[Alert], None]] = None):
+        self.sinks = sinks
+        self.max_size = max(1, max_size)
+        self.on_drop = on_drop or (lambda alert: None)
+        # Jeden oczekujący alert na symbol, regułę i kierunek - seria alertów łączona jest w jeden
+        self.pending = OrderedDict()
+        self.condition = threading.Condition()
+        self.busy = False
+        self.coalesced = 0
+        self.dropped = 0
+        self.thread = None
+        self.stopping = False
+
+    def submit(self, alert: Alert) -> None:
+        """Dodaje alert do kolejki - nigdy nie blokuje; przy pełnej kolejce odrzuca najstarszy (zgłaszany przez on_drop)"""
+        dropped = None
+        with self.condition:
+            key = (alert.symbol, alert.rule, alert.alert_type)
+            queued = self.pending.pop(key, None)
+            if queued is not None:
+                # Od pierwszej ceny serii do najnowszej
+                change = (alert.current_price - queued.old_price) / queued.old_price * 100 if queued.old_price else alert.change_percent
+                alert = alert._replace(old_price=queued.old_price, change_percent=change, repeats=queued.repeats + alert.repeats)
+                self.coalesced += 1
+            elif len(self.pending) >= self.max_size:
+                _, dropped = self.pending.popitem(last=False)
+                self.dropped += 1
+            self.pending[key] = alert
+
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="alert-dispatcher", daemon=True)
+                self.thread.start()
+            self.condition.notify()
+
+        if dropped is not None:
+            self.on_drop(dropped)
+
+    def _run(self) -> None:
+        while True:
+            with self.condition:
+                while not self.pending and not self.stopping:
+                    self.condition.wait()
+                if not self.pending:
+                    return
+                _, alert = self.pending.popitem(last=False)
+                self.busy = True
+
+            for sink in self.sinks:
+                try:
+                    sink(alert)
+                except Exception as e:
+                    console.print(f"[red]Błąd dostarczenia alertu: {str(e)}[/red]")
+
+            with self.condition:
+                self.busy = False
+                self.condition.notify_all()
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Czeka aż kolejka zostanie dostarczona - zwraca False po przekroczeniu czasu"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while self.pending or self.busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+    def stop(self, timeout: float = 5) -> None:
+        """Dostarcza zaległe alerty (maksymalnie timeout sekund) i zatrzymuje wątek"""
+        with self.condition:
+            self.stopping = True
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+
+DASHBOARD_SORTS = ('abs_change', 'change', 'symbol', 'price')
+
+class DashboardRow:
+    """Wiersz tabeli na żywo - komórki przeliczane tylko po zmianie ceny lub stanu"""
+    __slots__ = ('symbol', 'type', 'currency', 'price', 'open_price', 'change', 'state', 'alert', 'cells')
+
+    def __init__(self, symbol: str, asset_type: str, currency: str = 'USD'):
+        self.symbol = symbol
+        self.type = asset_type
+        self.currency = currency
+        self.price = None
+        self.open_price = None
+        self.change = 0.0
+        self.state = 'waiting'
+        self.alert = ""
+        self.cells = None
+
+    def render_cells(self) -> Tuple[str, ...]:
+        if self.cells is None:
+            color = "green" if self.change > 0 else "red" if self.change < 0 else "white"
+            price = format_price(self.price, self.currency) if self.price is not None else "N/A"
+            if self.state == 'stale':
+                price = f"[yellow]{price} ⌛[/yellow]"
+            self.cells = (self.symbol, self.type, price, f"[{color}]{self.change:+.2f}%[/{color}]", self.alert)
+        return self.cells
+
+class Dashboard:
+    """Tabela na żywo (rich.live): jeden model, zmieniane są tylko zmienione wiersze, odrysowanie z limitem klatek"""
+    def __init__(self, sort: str = 'abs_change', min_change: float = 0.0, max_rows: int = 40, fps: float = 4,
+                 currency: str = 'USD'):
+        if sort not in DASHBOARD_SORTS:
+            raise ValueError(f"Nieznane sortowanie: {sort}")
+        self.sort = sort
+        self.min_change = min_change
+        self.max_rows = max(1, max_rows)
+        self.fps = max(0.5, fps)
+        # Waluta bazowa kryptowalut - wiersze bez '/' w symbolu
+        self.currency = currency
+        self.rows = {}
+        self.alerts = deque(maxlen=5)
+        self.status = ""
+        self.lock = threading.Lock()
+        self.version = 0
+        self.rendered_version = -1
+        self.renderable = None
+        self.live = None
+        self.thread = None
+        self.stopping = threading.Event()
+
+    def update(self, symbol: str, asset_type: str, price: float, stale: bool = False) -> None:
+        """Nowa cena aktywa - bez zmiany ceny i stanu nie ma żadnej pracy przy odrysowaniu"""
+        state = 'stale' if stale else 'live'
+        with self.lock:
+            row = self.rows.get(symbol)
+            if row is None:
+                row = self.rows[symbol] = DashboardRow(symbol, asset_type, quote_currency(symbol, self.currency))
+            if row.price == price and row.state == state:
+                return
+            if row.open_price is None:
+                row.open_price = price
+            row.price = price
+            row.state = state
+            row.change = (price - row.open_price) / row.open_price * 100 if row.open_price else 0.0
+            row.cells = None
+            self.version += 1
+
+    def mark_alert(self, alert: Alert) -> None:
+        """Zaznacza alert w wierszu i na liście ostatnich alertów"""
+        icon = "📈" if alert.alert_type == "up" else "📉"
+        stamp = datetime.now().strftime('%H:%M:%S')
+        with self.lock:
+            row = self.rows.get(alert.symbol)
+            if row is not None:
+                row.alert = f"{icon} {stamp}"
+                row.cells = None
+            self.alerts.append(f"{icon} {alert.symbol} {alert.change_percent:+.2f}% ({stamp})")
+            self.version += 1
+
+    def set_status(self, text: str) -> None:
+        with self.lock:
+            if text != self.status:
+                self.status = text
+                self.version += 1
+
+    def visible_rows(self) -> Tuple[List[DashboardRow], int]:
+        """Filtr po zmianie % i top max_rows wg sortowania - O(n log k), renderowane jest najwyżej k wierszy"""
+        rows = self.rows.values()
+        if self.min_change:
+            rows = [row for row in rows if abs(row.change) >= self.min_change]
+        else:
+            rows = list(rows)
+
+        k = self.max_rows
+        if self.sort == 'abs_change':
+            top = heapq.nlargest(k, rows, key=lambda row: abs(row.change))
+        elif self.sort == 'change':
+            top = heapq.nlargest(k, rows, key=lambda row: row.change)
+        elif self.sort == 'price':
+            top = heapq.nlargest(k, rows, key=lambda row: row.price or 0.0)
+        else:
+            top = heapq.nsmallest(k, rows, key=lambda row: row.symbol)
+        return top, len(rows)
+
+    def render(self):
+        """Buduje tabelę tylko gdy model się zmienił (inaczej zwraca poprzednią)"""
+        from rich.console import Group
+        from rich.table import Table
+
+        with self.lock:
+            if self.version == self.rendered_version:
+                return self.renderable
+            top, matching = self.visible_rows()
+            cells = [row.render_cells() for row in top]
+            status = self.status
+            alerts = list(self.alerts)
+            total = len(self.rows)
+            self.rendered_version = self.version
+
+        table = Table(title="Monitorowane Instrumenty (na żywo)",
+                      caption=f"{len(cells)} z {matching} (wszystkich: {total}) - sortowanie: {self.sort}"
+                              + (f", zmiana ≥ {self.min_change:g}%" if self.min_change else ""))
+        table.add_column("Symbol", style="bold magenta")
+        table.add_column("Typ", style="green")
+        table.add_column("Cena", justify="right")
+        table.add_column("Zmiana od startu", justify="right")
+        table.add_column("Alert", style="bold")
+        for row in cells:
+            table.add_row(*row)
+
+        parts = [table]
+        if alerts:
+            parts.append("[bold]Ostatnie alerty:[/bold] " + "  ".join(alerts))
+        if status:
+            parts.append(f"[dim]{status}[/dim]")
+        self.renderable = Group(*parts)
+        return self.renderable
+
+    def start(self) -> None:
+        """Uruchamia odrysowanie w tle - co 1/fps sekundy i tylko po zmianie modelu"""
+        from rich.live import Live
+
+        self.live = Live(self.render(), console=console._rich(), auto_refresh=False, redirect_stdout=True,
+                         redirect_stderr=True)
+        self.live.start()
+        self.stopping.clear()
+
+        def run() -> None:
+            while not self.stopping.wait(1 / self.fps):
+                if self.version != self.rendered_version:
+                    self.live.update(self.render(), refresh=True)
+
+        self.thread = threading.Thread(target=run, name="dashboard", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Ostatnia klatka i zatrzymanie odrysowania"""
+        if self.live is None:
+            return
+        self.stopping.set()
+        self.thread.join()
+        self.live.update(self.render(), refresh=True)
+        self.live.stop()
+        self.live = None
+
+# Rodzaj alertu w tablicy cen: próg (rule nieużywane), reguła okna (rule - indeks reguły), subskrypcja (rule - id)
+ALERT_KIND_THRESHOLD, ALERT_KIND_WINDOW, ALERT_KIND_SUBSCRIPTION = 0, 1, 2
+# Alerty slotu w buforze cyklicznym - koordynator czyta wszystkie od ostatniego odczytu (alert_seq - licznik zapisanych)
+ALERT_RING_SIZE = 8
+PRICE_BOARD_ALERT = [
+    ('old_price', '<f8'), ('price', '<f8'), ('change_percent', '<f8'), ('updated', '<f8'),
+    ('alert_type', '<i1'), ('kind', '<i1'), ('rule', '<i8')
+]
+# Slot tablicy cen w pamięci współdzielonej - jeden na aktywo; version nieparzysty w trakcie zapisu
+PRICE_BOARD_FIELDS = [
+    ('version', '<u8'), ('price', '<f8'), ('updated', '<f8'), ('alert_seq', '<u8'),
+    ('alerts', PRICE_BOARD_ALERT, (ALERT_RING_SIZE,))
+]
+
+class PriceBoard:
+    """Tablica ostatnich cen i alertów w pamięci współdzielonej - stałe sloty, bez serializacji na tick"""
+    def __init__(self, size: int, name: Optional[str] = None):
+        from multiprocessing import shared_memory
+
+        self.dtype = np.dtype(PRICE_BOARD_FIELDS)
+        self.size = size
+        self.owner = name is None
+        # Nagłówek 8 bajtów: flaga zatrzymania procesów roboczych
+        nbytes = 8 + max(1, size) * self.dtype.itemsize
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=nbytes)
+        self.header = np.ndarray((8,), dtype=np.uint8, buffer=self.shm.buf)
+        self.slots = np.ndarray((size,), dtype=self.dtype, buffer=self.shm.buf, offset=8)
+        if self.owner:
+            self.header[:] = 0
+            self.slots[:] = 0
+            self.slots['price'] = np.nan
+
+    @property
+    def stopped(self) -> bool:
+        return bool(self.header[0])
+
+    def stop(self) -> None:
+        """Sygnał zatrzymania dla procesów roboczych (bez blokad - odporny na zabity proces)"""
+        self.header[0] = 1
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def recover(self, slots: List[int]) -> None:
+        """Przywraca parzystą wersję slotów po procesie zabitym w trakcie zapisu (wywołuje nowy właściciel slotów)"""
+        for slot in slots:
+            if self.slots['version'][slot] % 2:
+                self.slots['version'][slot] += 1
+
+    def publish(self, slot: int, price: float, updated: float, alerts: Iterable[Tuple[Alert, int, int]] = ()) -> None:
+        """Zapisuje cenę i alerty (alert, rodzaj, reguła) w slocie aktywa"""
+        record = self.slots[slot]
+        record['version'] += 1
+        record['price'] = price
+        record['updated'] = updated
+        for alert, kind, rule in alerts:
+            entry = record['alerts'][record['alert_seq'] % ALERT_RING_SIZE]
+            entry['old_price'] = alert.old_price
+            entry['price'] = alert.current_price
+            entry['change_percent'] = alert.change_percent
+            entry['updated'] = updated
+            entry['alert_type'] = 1 if alert.alert_type == "up" else -1
+            entry['kind'] = kind
+            entry['rule'] = rule
+            record['alert_seq'] += 1
+        record['version'] += 1
+
+    def snapshot(self, retries: int = 100):
+        """Spójna kopia slotów (seqlock): wersja, kopia, ponowny odczyt wersji - slot zmieniony w trakcie kopiowany ponownie"""
+        before = self.slots['version'].copy()
+        copy = self.slots.copy()
+        after = self.slots['version'].copy()
+        for slot in np.flatnonzero((before != after) | (before % 2 == 1)):
+            for _ in range(retries):
+                version = self.slots['version'][slot]
+                if version % 2 == 0:
+                    copy[slot] = self.slots[slot]
+                    if self.slots['version'][slot] == version and copy['version'][slot] == version:
+                        break
+                time.sleep(0)
+            else:
+                # Nadal w trakcie zapisu - wersja nieparzysta, slot pominięty do następnego odczytu
+                copy['version'][slot] = version | 1
+        return copy
+
+    def close(self) -> None:
+        """Odłącza tablicę (koordynator dodatkowo ją usuwa)"""
+        self.slots = None
+        self.header = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+def shard_worker(board_name: str, board_size: int, assets: List[Dict], slots: List[int],
+                 subscriptions: List[Dict], window_points: Dict[str, List[Tuple[float, float]]],
+                 crypto_ids: Dict[str, str], config: Dict, api_sources: Dict[str, str]) -> None:
+    """Proces roboczy: pobiera ceny swojej części listy i publikuje je w tablicy współdzielonej
+
+    Nie czyta ani nie zapisuje plików konfiguracji, danych i katalogu kryptowalut - konfigurację, aktywa,
+    subskrypcje, punkty okien i id kryptowalut przekazuje koordynator, który jako jedyny zapisuje stan.
+    """
+    console.plain = True
+    monitor = PriceMonitorPro(None, None, config)
+    monitor.api_sources = api_sources
+    monitor.catalog.freeze(crypto_ids)
+    monitor.monitored_assets = AssetRegistry(assets)
+    monitor.subscriptions = SubscriptionIndex(subscriptions)
+    monitor.index_assets()
+    for symbol, points in window_points.items():
+        monitor.window_rules.seed(symbol, points)
+    board = PriceBoard(board_size, board_name)
+    board.recover(slots)
+    slot_by_symbol = {asset['symbol']: slot for asset, slot in zip(assets, slots)}
+
+    scheduler = PollScheduler(monitor.config.get('schedule_merge_window_seconds', 1))
+    scheduler.sync({asset.id: monitor.poll_interval(asset) for asset in monitor.monitored_assets if asset.enabled})
+    parent = multiprocessing.parent_process()
+    try:
+        while not board.stopped:
+            due = scheduler.next_due()
+            if due is None:
+                break
+            # Krótkie drzemki - szybka reakcja na zatrzymanie i zakończenie koordynatora
+            while not board.stopped and time.monotonic() < due and parent.is_alive():
+                time.sleep(min(0.2, max(0.0, due - time.monotonic())))
+            if board.stopped or not parent.is_alive():
+                break
+
+            batch = [monitor.monitored_assets.get(asset_id) for asset_id in scheduler.pop_due(time.monotonic())]
+            prices = monitor.fetch_prices(batch)
+            prices = {symbol: price for symbol, price in prices.items() if price and symbol in slot_by_symbol}
+            now = time.time()
+            alerts = {}
+            for alert in monitor.evaluate_alerts(list(prices), list(prices.values()), now):
+                if alert.subscription is not None:
+                    kind, rule = ALERT_KIND_SUBSCRIPTION, alert.subscription
+                elif alert.rule:
+                    rules = [describe_window_rule(r) for r in monitor.monitored_assets.find(alert.symbol).window_rules]
+                    kind, rule = ALERT_KIND_WINDOW, rules.index(alert.rule) if alert.rule in rules else -1
+                else:
+                    kind, rule = ALERT_KIND_THRESHOLD, 0
+                alerts.setdefault(alert.symbol, []).append((alert, kind, rule))
+
+            for symbol, price in prices.items():
+                board.publish(slot_by_symbol[symbol], price, now, alerts.get(symbol, ()))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        board.close()
+        monitor.close()
+
+class PriceMonitorPro:
+    def __init__(self, config_file: Optional[str] = "monitor_config.json", data_file: Optional[str] = "price_data.json",
+                 overrides: Optional[Dict] = None):
+        self.config_file = config_file
+        # None - bez pliku danych (proces roboczy trybu wieloprocesowego): nic nie jest wczytywane ani zapisywane
+        self.data_file = data_file
         self.config = self.load_config()
-        self.monitored_assets = []
-        self.price_history = {}
-        self.load_data()
+        # Nadpisania tylko w pamięci (np. procesy robocze trybu wieloprocesowego)
+        self.config.update(overrides or {})
+        self.monitored_assets = AssetRegistry()
+        # Id subskrypcji nadawane przez licznik obok pliku danych - bez kolizji z poleceniami CLI przy działającym monitorze
+        self.subscriptions = SubscriptionIndex(counter=IdCounter(f"{data_file}.subscription-ids") if data_file else None)
+        # Id subskrypcji w pliku przy ostatnim odczycie/zapisie - łączenie ze zmianami z CLI (subscribe/unsubscribe)
+        self.stored_subscription_ids = set()
+        self.subscriptions_lock = threading.Lock()
+        self.history = None
+        self.forex_tables = {}
+        self.async_engine = None
+        self.metrics = Metrics()
+        self.metrics_server = None
+        self.metrics_stop = None
+        self.stream_stats = {'applied': 0, 'alerts': 0, 'latency_sum': 0.0, 'latency_max': 0.0}
+        # Ostatni czas ticku zapisanego w historii per symbol (tryb strumieniowy)
+        self.tick_epochs = {}
+        self.dashboard = None
+        self.closed = False
+        self.persister = DataPersister(self.data_file, self.config.get('persist_interval_seconds', 5))
+        self.persister.register('schema_version', lambda: DATA_SCHEMA_VERSION)
+        self.persister.register('monitored_assets', lambda: self.monitored_assets.to_json())
+        self.persister.register('next_asset_id', lambda: self.monitored_assets.next_id)
+        self.persister.register('subscriptions', self.subscriptions_json)
+        self.persister.register('next_subscription_id', lambda: self.subscriptions.next_id)
+        self.persister.on_flush(self.sync_subscriptions)
+        if self.data_file is not None:
+            self.load_data()
+            self.persister.start()
+        else:
+            self.history = JsonHistoryBackend({}, self.history_resolutions())
+            self.index_assets()
+        self.dispatcher = AlertDispatcher(self.create_alert_sinks(), self.config.get('alert_queue_size', 256),
+                                          self.alert_dropped)
         
         self.api_sources = {
             'crypto': 'https://api.coingecko.com/api/v3/simple/price',
             'forex': 'https://api.exchangerate-api.com/v4/latest/'
         }
+        self.sessions = {}
+        self.http_cache = {}
+        self.http_stats = {provider: {'not_modified': 0} for provider in self.api_sources}
+        self.breakers = {}
+        self.rate_buckets = {}
+        self.probe_requests = {}
+        self.recovered = threading.Event()
+        # Ostatnie poprawne ceny (symbol -> (cena, epoch)) - podawane jako nieaktualne podczas awarii dostawcy
+        self.price_cache = {}
+        self.stale_symbols = set()
+        self.catalog = CoinCatalog(self.config.get('coin_catalog_file', 'coin_catalog.json'),
+                                   self.config.get('coin_catalog_ttl_seconds', 86400), self.fetch_coin_list,
+                                   self.config.get('crypto_symbol_overrides'))
+        # Katalog ładowany w tle od startu - do tego czasu tylko przypięte id, ścieżka cen tylko czyta indeks
+        self.catalog.prepare(asset.symbol.split('/', 1)[0] for asset in self.monitored_assets
+                             if asset.type.lower() == 'crypto')
+        if self.config.get('metrics_enabled'):
+            self.start_metrics()
     
     def load_config(self) -> Dict:
         """Ładuje konfigurację"""
@@ -40,15 +2658,62 @@ class PriceMonitorPro:
             "check_interval_seconds": 60,
             "sound_enabled": True,
             "sound_volume": 1000,
-            "sound_frequency": 1000
+            "sound_frequency": 1000,
+            "crypto_batch_size": 250,
+            "crypto_chunk_delay_seconds": 1,
+            "forex_cache_ttl_seconds": 3600,
+            "crypto_base_currency": "USD",
+            "quote_conversion_ttl_seconds": 3600,
+            "fetch_engine": "sequential",
+            "rate_limits": {
+                "crypto": {"requests_per_second": 0.5, "burst": 3, "max_concurrency": 2},
+                "forex": {"requests_per_second": 2, "burst": 5, "max_concurrency": 4}
+            },
+            "startup_budget_ms": 250,
+            "http_pool_size": 10,
+            "history_backend": "segment",
+            "history_dir": "price_history",
+            "history_retention": [
+                {"resolution_seconds": 0, "max_age_seconds": 86400},
+                {"resolution_seconds": 60, "max_age_seconds": 2592000},
+                {"resolution_seconds": 3600, "max_age_seconds": None}
+            ],
+            "compaction_interval_seconds": 600,
+            "persist_interval_seconds": 5,
+            "alert_sinks": ["console", "sound"],
+            "alert_queue_size": 256,
+            "alert_webhook_url": "",
+            "alert_log_file": "alerts.log",
+            "schedule_merge_window_seconds": 1,
+            "metrics_enabled": False,
+            "metrics_port": 9108,
+            "metrics_json_file": "metrics.json",
+            "metrics_dump_interval_seconds": 60,
+            "shard_render_interval_seconds": 1,
+            "stream_max_pending": 10000,
+            "stream_stats_interval_seconds": 10,
+            "coin_catalog_file": "coin_catalog.json",
+            "coin_catalog_ttl_seconds": 86400,
+            "crypto_symbol_overrides": {},
+            "circuit_breaker": {"failure_threshold": 3, "reset_timeout_seconds": 30, "max_reset_timeout_seconds": 600},
+            "stale_price_max_age_seconds": 3600,
+            "dashboard_fps": 4,
+            "dashboard_max_rows": 40,
+            "dashboard_sort": "abs_change",
+            "dashboard_min_change_percent": 0
         }
         
+        if self.config_file is None:
+            # Bez pliku konfiguracji (proces roboczy) - pełna konfiguracja przychodzi w nadpisaniach
+            return default_config
+
         if os.path.exists(self.config_file):
             with open(self.config_file, 'r', encoding='utf-8') as f:
                 loaded = json.load(f)
-                # Merge z defaults - dodaj brakujące klucze
+                # Merge z defaults - dodaj brakujące klucze (zapis tylko gdy czegoś brakowało)
                 config = {**default_config, **loaded}
-                self.save_config(config)
+                if config.keys() != loaded.keys():
+                    self.save_config(config)
                 return config
         
         self.save_config(default_config)
@@ -60,34 +2725,170 @@ class PriceMonitorPro:
             json.dump(config, f, ensure_ascii=False, indent=2)
     
     def load_data(self) -> None:
-        """Ładuje dane monitorowanych aktywów"""
+        """Ładuje dane monitorowanych aktywów - historia w JSON dekodowana per symbol dopiero przy dostępie"""
+        version = DATA_SCHEMA_VERSION
         if os.path.exists(self.data_file):
+            self.persister.remember_file()
             try:
-                data = json.load(open(self.data_file, 'r', encoding='utf-8'))
-                self.monitored_assets = data.get('monitored_assets', [])
-                self.price_history = data.get('price_history', {})
-                
-                # Migracja danych
-                for asset in self.monitored_assets:
-                    if 'alert_change' in asset and 'alert_up' not in asset:
-                        asset['alert_up'] = asset.pop('alert_change')
-                        asset['alert_down'] = asset['alert_up']
-                        asset['last_alert_up'] = asset.pop('last_alert', None)
-                        asset['last_alert_down'] = None
-                
-                self.save_data()
-            except json.JSONDecodeError:
+                data = DataFile(self.data_file)
+                version = data.get('schema_version', 0)
+                # Migracje tylko dla plików ze starszym schematem
+                migrate = version < DATA_SCHEMA_VERSION
+                self.monitored_assets = AssetRegistry(data.get('monitored_assets', []), data.get('next_asset_id'), migrate)
+                self.subscriptions = SubscriptionIndex(data.get('subscriptions', []), data.get('next_subscription_id'),
+                                                       self.subscriptions.counter)
+                self.stored_subscription_ids = set(self.subscriptions.by_id)
+                self.history = self.create_history_backend(data)
+                for name in DataFile.KEYED:
+                    section = data.get(name)
+                    if isinstance(section, LazySection):
+                        self.persister.seed(name, section.source)
+            except (ValueError, TypeError, KeyError, AttributeError):
+                # Plik uszkodzony lub ucięty (JSONDecodeError, niepełna struktura sekcji, wpisy bez wymaganych pól)
+                # - start z pustymi danymi
                 pass
-    
+
+        if version < DATA_SCHEMA_VERSION:
+            self.persister.mark_dirty('schema_version')
+            self.mark_dirty()
+
+        if self.history is None:
+            self.history = self.create_history_backend({})
+        self.history.register_sections(self.persister)
+        self.index_assets()
+
+    def index_assets(self) -> None:
+        """Buduje stan alertów i reguł okna dla bieżącego rejestru aktywów"""
+        self.alert_book = AlertBook(self.monitored_assets)
+        self.window_rules = WindowRuleEngine()
+        now = time.time()
+        for asset in self.monitored_assets:
+            if asset.window_rules:
+                self.window_rules.set_rules(asset.symbol, asset.window_rules)
+                longest = max(rule['window_seconds'] for rule in asset.window_rules)
+                self.window_rules.seed(asset.symbol, self.history.points(asset.symbol, start=now - longest))
+
+    def history_resolutions(self) -> List[int]:
+        """Rozdzielczości poziomów świec z polityki retencji (bez surowych ticków)"""
+        return sorted(tier['resolution_seconds'] for tier in self.config.get('history_retention', [])
+                      if tier.get('resolution_seconds'))
+
+    def create_history_backend(self, data: Dict):
+        """Tworzy backend historii cen wg konfiguracji (z jednorazową migracją z JSON)"""
+        if self.config.get('history_backend') == 'json':
+            return JsonHistoryBackend(data, self.history_resolutions(), self.persister.mark_dirty)
+
+        backend = SegmentHistoryBackend(self.config.get('history_dir', 'price_history'), self.history_resolutions())
+        price_history = data.get('price_history') or {}
+        for symbol, records in price_history.items():
+            if backend.count(symbol):
+                continue
+            for record in records:
+                backend.append(symbol, timestamp_to_epoch(record['timestamp']), record['price'])
+        if price_history:
+            # Przepisanie price_data.json już bez price_history
+            self.mark_dirty()
+            console.print(f"[green]✓[/green] Przeniesiono historię cen do {backend.directory}/")
+        return backend
+
+    def mark_dirty(self) -> None:
+        """Oznacza listę aktywów do zapisu w tle"""
+        self.persister.mark_dirty('monitored_assets')
+        self.persister.mark_dirty('next_asset_id')
+
+    def mark_subscriptions_dirty(self) -> None:
+        """Oznacza subskrypcje poziomów do zapisu w tle"""
+        self.persister.mark_dirty('subscriptions')
+        self.persister.mark_dirty('next_subscription_id')
+
+    def subscriptions_json(self) -> List[Dict]:
+        """Sekcja subscriptions do zapisu - zapamiętuje zapisane id"""
+        with self.subscriptions_lock:
+            self.stored_subscription_ids = set(self.subscriptions.by_id)
+            return self.subscriptions.to_json()
+
+    def sync_subscriptions(self) -> None:
+        """Przejmuje subskrypcje dodane lub usunięte w pliku przez inny proces (np. subscribe przy działającym monitorze)"""
+        if not self.persister.file_changed():
+            return
+        try:
+            data = DataFile(self.data_file)
+            stored = data.get('subscriptions', [])
+            next_id = data.get('next_subscription_id')
+        except (OSError, ValueError):
+            return
+        self.persister.remember_file()
+        with self.subscriptions_lock:
+            changed = self.subscriptions.merge(stored, next_id, self.stored_subscription_ids)
+            self.stored_subscription_ids = {entry['id'] for entry in stored}
+        if changed or next_id != self.subscriptions.next_id:
+            self.mark_subscriptions_dirty()
+
     def save_data(self) -> None:
-        """Zapisuje dane"""
-        data = {
-            'monitored_assets': self.monitored_assets,
-            'price_history': self.price_history
-        }
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        """Zapisuje dane od razu (zaległe zmiany)"""
+        self.persister.flush()
+
+    def close(self) -> None:
+        """Dostarcza zaległe alerty, zapisuje zaległe zmiany i zamyka pliki (tylko za pierwszym razem)"""
+        if self.closed:
+            return
+        self.closed = True
+        self.dispatcher.stop()
+        self.persister.stop()
+        self.stop_metrics()
+        self.history.close()
     
+    def start_metrics(self) -> None:
+        """Włącza metryki: pomiar gorących ścieżek, endpoint Prometheus i okresowy zrzut JSON"""
+        if self.metrics.enabled:
+            return
+        self.metrics.enabled = True
+
+        # Pomiar przez podmianę metod instancji - przy wyłączonych metrykach kod nie jest owinięty
+        for name in ('get_price', 'check_price_change', 'evaluate_alerts', 'play_alert_sound', 'save_data',
+                     'fetch_prices', 'fetch_all_prices'):
+            setattr(self, name, self.metrics.wrap(name, getattr(self, name)))
+        self.http_get_json = self.metrics.wrap('http_request', self.http_get_json,
+                                               lambda provider, *args, **kwargs: {'provider': provider})
+        self.persister.flush = self.metrics.wrap('persist_flush', self.persister.flush)
+
+        self.metrics.gauge('monitored_assets', lambda: len(self.monitored_assets))
+        self.metrics.gauge('history_points', lambda: sum(self.history.count(asset.symbol) for asset in self.monitored_assets))
+        self.metrics.gauge('alert_queue_pending', lambda: len(self.dispatcher.pending))
+        self.metrics.gauge('alert_queue_dropped', lambda: self.dispatcher.dropped)
+
+        port = self.config.get('metrics_port')
+        if port:
+            try:
+                self.metrics_server = self.metrics.serve(int(port))
+                console.print(f"[green]✓[/green] Metryki: http://127.0.0.1:{self.metrics_server.server_port}/metrics")
+            except OSError as e:
+                console.print(f"[red]Błąd endpointu metryk: {str(e)}[/red]")
+
+        path = self.config.get('metrics_json_file')
+        if path:
+            self.metrics_stop = threading.Event()
+
+            def dump() -> None:
+                while not self.metrics_stop.wait(self.config.get('metrics_dump_interval_seconds', 60)):
+                    try:
+                        self.metrics.dump_json(path)
+                    except Exception as e:
+                        console.print(f"[red]Błąd zrzutu metryk: {str(e)}[/red]")
+
+            threading.Thread(target=dump, name="metrics-dump", daemon=True).start()
+
+    def stop_metrics(self) -> None:
+        """Zatrzymuje endpoint i zapisuje ostatni zrzut JSON"""
+        if self.metrics_server is not None:
+            self.metrics_server.shutdown()
+            self.metrics_server.server_close()
+            self.metrics_server = None
+        if self.metrics_stop is not None:
+            self.metrics_stop.set()
+            self.metrics_stop = None
+            self.metrics.dump_json(self.config['metrics_json_file'])
+
     def play_alert_sound(self, alert_type: str = "up") -> None:
         """Odgrywa dźwięk alarmu"""
         if not self.config['sound_enabled']:
@@ -99,19 +2900,21 @@ class PriceMonitorPro:
             
             if alert_type == "up":
                 console.print("[bold yellow]🔊 Dźwięk alert wzrostu...[/bold yellow]")
-                winsound.Beep(freq_up, 500)
+                beep(freq_up, 500)
                 time.sleep(0.1)
-                winsound.Beep(freq_up, 500)
+                beep(freq_up, 500)
             else:
                 console.print("[bold yellow]🔊 Dźwięk alert spadku...[/bold yellow]")
-                winsound.Beep(freq_down, 500)
+                beep(freq_down, 500)
                 time.sleep(0.1)
-                winsound.Beep(freq_down, 500)
+                beep(freq_down, 500)
         except Exception as e:
             console.print(f"[red]Błąd dźwięku: {str(e)}[/red]")
     
-    def show_alert_popup(self, symbol: str, old_price: float, current_price: float, change_percent: float, alert_type: str) -> None:
+    def show_alert_popup(self, symbol: str, old_price: float, current_price: float, change_percent: float, alert_type: str,
+                         rule: Optional[str] = None, repeats: int = 1) -> None:
         """Wyświetla wizualny alert na ekranie"""
+        currency = self.currency(symbol)
         if alert_type == "up":
             title = f"📈 ALERT WZROSTU: {symbol}"
             color = "green"
@@ -125,9 +2928,20 @@ class PriceMonitorPro:
 {emoji} {symbol}
 ━━━━━━━━━━━━━━━━━━━━━
 Zmiana: [bold]{change_percent:+.2f}%[/bold]
-${old_price:.4f} → ${current_price:.4f}
+{format_price(old_price, currency)} → {format_price(current_price, currency)}
 Czas: {datetime.now().strftime('%H:%M:%S')}
 """
+        if rule:
+            alert_text += f"Reguła: {rule}\n"
+        if repeats > 1:
+            alert_text += f"Połączono alertów: {repeats}\n"
+
+        if console.plain:
+            console.print(f"{title}{alert_text}")
+            return
+
+        from rich.align import Align
+        from rich.panel import Panel
         
         panel = Panel(
             alert_text,
@@ -139,90 +2953,453 @@ Czas: {datetime.now().strftime('%H:%M:%S')}
         
         console.print(Align.center(panel))
     
-    def add_asset(self, symbol: str, asset_type: str, alert_up: Optional[float] = None, alert_down: Optional[float] = None) -> None:
+    def create_alert_sinks(self) -> List[Callable[[Alert], None]]:
+        """Tworzy odbiorców alertów wg alert_sinks z konfiguracji"""
+        available = {
+            'console': self.show_alert,
+            'sound': lambda alert: self.play_alert_sound(alert.alert_type),
+            'webhook': self.send_alert_webhook,
+            'file': self.write_alert_log
+        }
+        sinks = []
+        for name in self.config.get('alert_sinks', ['console', 'sound']):
+            if name in available:
+                sinks.append(available[name])
+            else:
+                console.print(f"[yellow]⚠ Nieznany odbiorca alertów: {name}[/yellow]")
+        return sinks
+
+    def show_alert(self, alert: Alert) -> None:
+        """Alert na ekranie - w trybie dashboard widoczny w tabeli zamiast panelu"""
+        if self.dashboard is not None:
+            return
+        self.show_alert_popup(alert.symbol, alert.old_price, alert.current_price, alert.change_percent,
+                              alert.alert_type, alert.rule, alert.repeats)
+
+    def alert_payload(self, alert: Alert) -> Dict:
+        """Alert jako słownik (webhook, plik logu)"""
+        return {
+            'timestamp': datetime.now().strftime(TIMESTAMP_FORMAT),
+            'symbol': alert.symbol,
+            'alert_type': alert.alert_type,
+            'old_price': alert.old_price,
+            'current_price': alert.current_price,
+            'currency': self.currency(alert.symbol),
+            'change_percent': round(alert.change_percent, 4),
+            'rule': alert.rule,
+            'repeats': alert.repeats
+        }
+
+    def send_alert_webhook(self, alert: Alert) -> None:
+        """Wysyła alert jako JSON (POST) na alert_webhook_url"""
+        url = self.config.get('alert_webhook_url')
+        if not url:
+            return
+        response = self.session('webhook').post(url, json=self.alert_payload(alert), timeout=10)
+        response.raise_for_status()
+
+    def write_alert_log(self, alert: Alert) -> None:
+        """Dopisuje alert jako linię JSON do alert_log_file"""
+        with open(self.config.get('alert_log_file', 'alerts.log'), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(self.alert_payload(alert), ensure_ascii=False) + '\n')
+
+    def add_asset(self, symbol: str, asset_type: str, alert_up: Optional[float] = None, alert_down: Optional[float] = None,
+                  window_rules: Optional[List[Dict]] = None, poll_interval: Optional[float] = None) -> None:
         """Dodaje aktywo do monitorowania"""
-        for asset in self.monitored_assets:
-            if asset['symbol'].upper() == symbol.upper():
-                console.print(f"[red]✗[/red] Aktywo {symbol} już monitorujesz")
-                return
+        if self.monitored_assets.find(symbol):
+            console.print(f"[red]✗[/red] Aktywo {symbol} już monitorujesz")
+            return
         
+        if asset_type.lower() == 'crypto':
+            self.catalog.prepare([symbol.split('/', 1)[0]])
+
         default_threshold = self.config['alert_threshold_percent']
+        new_asset = self.monitored_assets.add(symbol, asset_type, alert_up or default_threshold, alert_down or default_threshold,
+                                              window_rules, poll_interval)
         
-        new_asset = {
-            'id': len(self.monitored_assets) + 1,
-            'symbol': symbol.upper(),
-            'type': asset_type.lower(),
-            'alert_up': alert_up or default_threshold,
-            'alert_down': alert_down or default_threshold,
-            'date_added': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            'enabled': True,
-            'last_price': None,
-            'last_alert_up': None,
-            'last_alert_down': None
-        }
-        
-        self.monitored_assets.append(new_asset)
-        self.price_history[symbol.upper()] = []
-        self.save_data()
-        console.print(f"[green]✓[/green] Dodano do monitorowania: [bold]{symbol.upper()}[/bold]")
+        self.alert_book.add(new_asset)
+        self.window_rules.set_rules(new_asset.symbol, new_asset.window_rules)
+        self.history.clear(new_asset.symbol)
+        self.mark_dirty()
+        console.print(f"[green]✓[/green] Dodano do monitorowania: [bold]{new_asset.symbol}[/bold]")
     
     def remove_asset(self, asset_id: int) -> None:
         """Usuwa aktywo z monitorowania"""
-        for i, asset in enumerate(self.monitored_assets):
-            if asset['id'] == asset_id:
-                removed = self.monitored_assets.pop(i)
-                self.save_data()
-                console.print(f"[green]✓[/green] Usunięto: [bold]{removed['symbol']}[/bold]")
-                return
-        console.print(f"[red]✗[/red] Aktywo o ID {asset_id} nie znalezione")
-    
+        removed = self.monitored_assets.remove(asset_id)
+        if removed is None:
+            console.print(f"[red]✗[/red] Aktywo o ID {asset_id} nie znalezione")
+            return
+
+        self.alert_book.remove(removed.symbol)
+        self.window_rules.remove(removed.symbol)
+        with self.subscriptions_lock:
+            removed_subscriptions = self.subscriptions.remove_symbol(removed.symbol)
+        if removed_subscriptions:
+            self.mark_subscriptions_dirty()
+        self.mark_dirty()
+        console.print(f"[green]✓[/green] Usunięto: [bold]{removed.symbol}[/bold]")
+
+    def subscribe(self, symbol: str, level: Optional[float] = None, percent: Optional[float] = None,
+                  direction: Optional[str] = None, owner: str = "", once: bool = False) -> Optional[Subscription]:
+        """Dodaje subskrypcję poziomu ceny (bezwzględnego lub % od bieżącej ceny) dla monitorowanego aktywa"""
+        asset = self.monitored_assets.find(symbol)
+        if asset is None:
+            console.print(f"[red]✗[/red] Aktywo {symbol} nie jest monitorowane")
+            return None
+
+        reference = None
+        if percent is not None:
+            if not asset.last_price:
+                console.print(f"[red]✗[/red] Brak ceny {asset.symbol} - reguła procentowa wymaga ceny odniesienia")
+                return None
+            reference = asset.last_price
+            level = reference * (1 + percent / 100)
+            direction = direction or ("up" if percent > 0 else "down")
+        elif level is None:
+            console.print("[red]✗[/red] Podaj poziom ceny lub procent")
+            return None
+        elif direction is None:
+            if not asset.last_price:
+                console.print(f"[red]✗[/red] Brak ceny {asset.symbol} - podaj kierunek (up/down)")
+                return None
+            direction = "up" if level > asset.last_price else "down"
+
+        try:
+            with self.subscriptions_lock:
+                sub = self.subscriptions.add(asset.symbol, level, direction, owner, once, percent, reference)
+        except OSError as e:
+            console.print(f"[red]✗[/red] Nie można nadać id subskrypcji: {e}")
+            return None
+        self.mark_subscriptions_dirty()
+        console.print(f"[green]✓[/green] Subskrypcja #{sub.id}: {asset.symbol} {sub.describe()}")
+        return sub
+
+    def unsubscribe(self, sub_id: int) -> None:
+        """Usuwa subskrypcję poziomu"""
+        with self.subscriptions_lock:
+            sub = self.subscriptions.remove(sub_id)
+        if sub is None:
+            console.print(f"[red]✗[/red] Subskrypcja #{sub_id} nie znaleziona")
+            return
+        self.mark_subscriptions_dirty()
+        console.print(f"[green]✓[/green] Usunięto subskrypcję #{sub_id}: {sub.symbol} {sub.describe()}")
+
+    def create_session(self) -> 'requests.Session':
+        """Tworzy sesję HTTP z pulą połączeń keep-alive"""
+        pool_size = max(1, int(self.config.get('http_pool_size', 10)))
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({'Accept-Encoding': 'gzip, deflate', 'Connection': 'keep-alive'})
+        return session
+
+    def session(self, provider: str) -> 'requests.Session':
+        """Zwraca sesję dostawcy (tworzoną przy pierwszym zapytaniu)"""
+        session = self.sessions.get(provider)
+        if session is None:
+            session = self.sessions[provider] = self.create_session()
+        return session
+
+    def rate_bucket(self, provider: str) -> TokenBucket:
+        """Limit zapytań dostawcy z rate_limits dla silnika sekwencyjnego (silnik async ma własne ProviderGate)"""
+        bucket = self.rate_buckets.get(provider)
+        if bucket is None:
+            limits = self.config.get('rate_limits', {}).get(provider, {})
+            bucket = self.rate_buckets[provider] = TokenBucket(limits.get('requests_per_second', 0), limits.get('burst', 1))
+        return bucket
+
+    def breaker(self, provider: str) -> CircuitBreaker:
+        """Zwraca wyłącznik obwodu dostawcy (tworzony przy pierwszym zapytaniu)"""
+        breaker = self.breakers.get(provider)
+        if breaker is None:
+            settings = self.config.get('circuit_breaker', {})
+            breaker = self.breakers[provider] = CircuitBreaker(settings.get('failure_threshold', 3),
+                                                               settings.get('reset_timeout_seconds', 30),
+                                                               settings.get('max_reset_timeout_seconds', 600))
+        return breaker
+
+    def provider_failed(self, provider: str, url: str, params: Optional[Dict]) -> None:
+        """Rejestruje błąd dostawcy - zapamiętuje zapytanie jako próbę dla rewalidacji w tle"""
+        if provider != 'coins':
+            # Pełna lista kryptowalut to wielomegabajtowe zapytanie - nie nadaje się na próbę rewalidacji
+            self.probe_requests[provider] = (url, params)
+        breaker = self.breaker(provider)
+        if breaker.record_failure():
+            self.metrics.inc('circuit_opened', provider=provider)
+            console.print(f"[red]⚡ Dostawca {provider} niedostępny - wstrzymuję zapytania na "
+                          f"{breaker.timeout:.0f}s, ceny z ostatniego odczytu[/red]")
+
+    def provider_succeeded(self, provider: str) -> None:
+        """Zamyka obwód dostawcy - po powrocie budzi pętlę monitorowania"""
+        if self.breaker(provider).record_success():
+            console.print(f"[green]✓ Dostawca {provider} znów dostępny[/green]")
+            self.recovered.set()
+
+    def http_get_json(self, provider: str, url: str, params: Optional[Dict] = None) -> Dict:
+        """GET przez sesję dostawcy - zapytanie warunkowe (ETag/Last-Modified), 304 zwraca dane z cache"""
+        cache_key = (url, tuple(sorted(params.items())) if params else ())
+        cached = self.http_cache.get(cache_key)
+
+        headers = {}
+        if cached:
+            if cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        breaker = self.breaker(provider)
+        if not breaker.allow():
+            raise CircuitOpenError(provider)
+
+        self.metrics.inc('http_requests', provider=provider)
+        try:
+            response = self.session(provider).get(url, params=params, headers=headers, timeout=5)
+        except requests.exceptions.RequestException:
+            self.metrics.inc('http_errors', provider=provider)
+            self.provider_failed(provider, url, params)
+            raise
+        # 429 i 5xx świadczą o kłopotach dostawcy - pozostałe odpowiedzi zamykają obwód
+        if response.status_code == 429 or response.status_code >= 500:
+            self.provider_failed(provider, url, params)
+        else:
+            self.provider_succeeded(provider)
+        if response.status_code == 304 and cached:
+            self.http_stats[provider]['not_modified'] += 1
+            self.metrics.inc('http_not_modified', provider=provider)
+            return cached['data']
+        if response.status_code == 429:
+            self.metrics.inc('http_rate_limited', provider=provider)
+        elif response.status_code >= 400:
+            self.metrics.inc('http_errors', provider=provider)
+
+        response.raise_for_status()
+        data = response.json()
+
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag or last_modified:
+            self.http_cache[cache_key] = {'etag': etag, 'last_modified': last_modified, 'data': data}
+        return data
+
+    def connection_stats(self) -> Dict[str, Dict[str, int]]:
+        """Zwraca liczbę nowych i ponownie użytych połączeń dla każdego dostawcy"""
+        stats = {}
+        for provider, session in self.sessions.items():
+            adapter = session.get_adapter('https://')
+            pools = adapter.poolmanager.pools
+            sent = created = 0
+            for key in pools.keys():
+                pool = pools[key]
+                sent += pool.num_requests
+                created += pool.num_connections
+
+            stats[provider] = {
+                'requests': sent,
+                'new_connections': created,
+                'reused_connections': max(0, sent - created),
+                'not_modified': self.http_stats[provider]['not_modified']
+            }
+        return stats
+
     def get_crypto_price(self, symbol: str) -> Optional[float]:
         """Pobiera cenę kryptowaluty"""
+        return self.get_crypto_prices([symbol]).get(symbol.upper())
+
+    def chunk_crypto_ids(self, crypto_ids: List[str]) -> List[List[str]]:
+        """Dzieli listę id na paczki mieszczące się w limicie zapytania"""
+        batch_size = max(1, int(self.config.get('crypto_batch_size', 250)))
+        chunks = []
+        chunk = []
+        chunk_chars = 0
+
+        for crypto_id in crypto_ids:
+            extra = len(crypto_id) + (1 if chunk else 0)
+            if chunk and (len(chunk) >= batch_size or chunk_chars + extra > CRYPTO_IDS_MAX_CHARS):
+                chunks.append(chunk)
+                chunk = []
+                chunk_chars = 0
+                extra = len(crypto_id)
+            chunk.append(crypto_id)
+            chunk_chars += extra
+
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def fetch_crypto_chunk(self, crypto_ids: List[str]) -> Dict:
+        """Pobiera notowania jednej paczki kryptowalut (jedno zapytanie ids=)"""
+        params = {'ids': ','.join(crypto_ids), 'vs_currencies': self.crypto_base_currency().lower()}
+
         try:
-            crypto_ids = {
-                'BTC': 'bitcoin', 'ETH': 'ethereum', 'XRP': 'ripple',
-                'ADA': 'cardano', 'SOL': 'solana', 'DOGE': 'dogecoin',
-                'USDT': 'tether', 'USDC': 'usd-coin', 'BNB': 'binancecoin', 'XLM': 'stellar',
-            }
-            
-            crypto_id = crypto_ids.get(symbol.upper())
-            if not crypto_id:
-                return None
-            
-            params = {'ids': crypto_id, 'vs_currencies': 'usd', 'include_market_cap': 'true'}
-            
             for attempt in range(3):
                 try:
-                    response = requests.get(self.api_sources['crypto'], params=params, timeout=5)
-                    response.raise_for_status()
-                    data = response.json()
-                    return data[crypto_id]['usd']
+                    self.rate_bucket('crypto').wait()
+                    return self.http_get_json('crypto', self.api_sources['crypto'], params)
                 except requests.exceptions.HTTPError as e:
-                    if e.response.status_code == 429:
-                        wait = (attempt + 1) * 2
+                    if e.response.status_code == 429 and self.breaker('crypto').state != 'open':
+                        wait = parse_retry_after(e.response.headers.get('Retry-After')) or (attempt + 1) * 2
                         console.print(f"[yellow]⏳ API limit, czekam {wait}s...[/yellow]")
+                        self.metrics.inc('http_retries', provider='crypto')
+                        self.metrics.inc('backoff_seconds', wait, provider='crypto')
                         time.sleep(wait)
-        except Exception as e:
+                    else:
+                        break
+        except Exception:
             pass
-        
-        return None
+
+        return {}
+
+    def resolve_crypto_ids(self, symbols: List[str]) -> Dict[str, str]:
+        """Mapuje symbole kryptowalut na id dostawcy (pomija nieznane)"""
+        ids_by_symbol = {}
+        for symbol in symbols:
+            crypto_id = self.catalog.id_for(symbol.split('/', 1)[0])
+            if crypto_id:
+                ids_by_symbol[symbol.upper()] = crypto_id
+        return ids_by_symbol
+
+    def crypto_base_currency(self) -> str:
+        """Waluta, w której pobierane są wszystkie kryptowaluty (jedno zapytanie niezależnie od walut kwotowania)"""
+        return self.config.get('crypto_base_currency', 'USD').upper()
+
+    def currency(self, symbol: str) -> str:
+        """Waluta kwotowania aktywa (BTC/PLN -> PLN, EUR/USD -> USD, BTC -> waluta bazowa kryptowalut)"""
+        return quote_currency(symbol, self.crypto_base_currency())
+
+    def conversion_pairs(self, symbols: List[str]) -> List[str]:
+        """Pary kursów (waluta bazowa/waluta kwotowania) potrzebne do przeliczenia cen kryptowalut"""
+        base = self.crypto_base_currency()
+        pairs = []
+        for symbol in symbols:
+            pair = f"{base}/{self.currency(symbol)}"
+            if not pair.endswith(f"/{base}") and pair not in pairs:
+                pairs.append(pair)
+        return pairs
+
+    def crypto_quotes_to_prices(self, ids_by_symbol: Dict[str, str], quotes: Dict,
+                                tables: Optional[Dict[str, Dict[str, float]]] = None) -> Dict[str, float]:
+        """Wyciąga ceny z odpowiedzi simple/price - inne waluty kwotowania przeliczane kursem z tabeli forex"""
+        base = self.crypto_base_currency()
+        pairs = self.conversion_pairs(list(ids_by_symbol))
+        # Kursy z cache tabel forex (własny TTL) - dodatkowe waluty nie kosztują zapytań o kryptowaluty
+        rates = self.get_forex_prices(pairs, tables, self.config.get('quote_conversion_ttl_seconds', 3600)) if pairs else {}
+
+        prices = {}
+        key = base.lower()
+        for symbol, crypto_id in ids_by_symbol.items():
+            price = quotes.get(crypto_id, {}).get(key)
+            if price is None:
+                continue
+            quote = self.currency(symbol)
+            if quote == base:
+                prices[symbol] = price
+            elif f"{base}/{quote}" in rates:
+                prices[symbol] = price * rates[f"{base}/{quote}"]
+        return prices
+
+    def fetch_coin_list(self) -> List[Dict]:
+        """Pobiera pełną listę kryptowalut dostawcy (id, symbol, nazwa)"""
+        url = self.api_sources.get('coins') or self.api_sources['crypto'].replace('/simple/price', '/coins/list')
+        self.http_stats.setdefault('coins', {'not_modified': 0})
+        return self.http_get_json('coins', url)
+
+    def get_crypto_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """Pobiera ceny wielu kryptowalut w jak najmniejszej liczbie zapytań"""
+        ids_by_symbol = self.resolve_crypto_ids(symbols)
+
+        quotes = {}
+        chunks = self.chunk_crypto_ids(list(dict.fromkeys(ids_by_symbol.values())))
+        for i, chunk in enumerate(chunks):
+            quotes.update(self.fetch_crypto_chunk(chunk))
+
+            if self.breaker('crypto').state == 'open':
+                # Pozostałe paczki i tak zostałyby odrzucone - bez czekania między nimi
+                break
+            if i < len(chunks) - 1:
+                time.sleep(self.config.get('crypto_chunk_delay_seconds', 1))
+
+        return self.crypto_quotes_to_prices(ids_by_symbol, quotes)
     
     def get_forex_price(self, symbol: str) -> Optional[float]:
         """Pobiera kurs walutowy"""
+        return self.get_forex_prices([symbol]).get(symbol.upper())
+
+    def get_forex_table(self, base: str, ttl: Optional[float] = None) -> Optional[Dict[str, float]]:
+        """Zwraca tabelę kursów dla waluty bazowej (z cache jeśli jest świeża)"""
+        base = base.upper()
+        cached = self.forex_tables.get(base)
+        ttl = self.config.get('forex_cache_ttl_seconds', 3600) if ttl is None else ttl
+        if cached and time.monotonic() - cached[0] < ttl:
+            return cached[1]
+
         try:
-            if '/' not in symbol:
-                return None
-            
-            base, quote = symbol.split('/')
-            response = requests.get(f"{self.api_sources['forex']}{base.upper()}", timeout=5)
-            response.raise_for_status()
-            data = response.json()
-            return data['rates'].get(quote.upper())
+            self.rate_bucket('forex').wait()
+            data = self.http_get_json('forex', f"{self.api_sources['forex']}{base}")
+            return self.store_forex_table(base, data)
         except Exception:
             pass
-        
+
         return None
-    
+
+    def store_forex_table(self, base: str, data: Dict) -> Dict[str, float]:
+        """Zapisuje pobraną tabelę kursów w cache"""
+        rates = dict(data['rates'])
+        rates.setdefault(base, 1.0)
+        self.forex_tables[base] = (time.monotonic(), rates)
+        return rates
+
+    def get_cross_rate(self, base: str, quote: str, ttl: Optional[float] = None) -> Optional[float]:
+        """Kurs z tabeli waluty bazowej, a gdy jej brak - triangulacja z dowolnej świeżej tabeli w cache"""
+        ttl = self.config.get('forex_cache_ttl_seconds', 3600) if ttl is None else ttl
+        now = time.monotonic()
+
+        direct = self.forex_tables.get(base)
+        if direct is not None and now - direct[0] < ttl:
+            return direct[1].get(quote)
+
+        for fetched_at, rates in self.forex_tables.values():
+            if now - fetched_at >= ttl:
+                continue
+            if rates.get(base) and quote in rates:
+                return rates[quote] / rates[base]
+
+        return None
+
+    def forex_bases_to_fetch(self, symbols: List[str], ttl: Optional[float] = None,
+                             bases: Optional[List[str]] = None) -> List[str]:
+        """Zwraca waluty bazowe, których kursów nie da się wyliczyć z cache"""
+        bases = bases if bases is not None else []
+        for symbol in symbols:
+            if '/' not in symbol:
+                continue
+            base, quote = (part.upper() for part in symbol.split('/', 1))
+            if base not in bases and self.get_cross_rate(base, quote, ttl) is None:
+                bases.append(base)
+        return bases
+
+    def get_forex_prices(self, symbols: List[str], tables: Optional[Dict[str, Dict[str, float]]] = None,
+                         ttl: Optional[float] = None) -> Dict[str, float]:
+        """Pobiera kursy wielu par - najwyżej jedna tabela na walutę bazową"""
+        prices = {}
+        tables = tables or {}
+
+        for symbol in symbols:
+            if '/' not in symbol:
+                continue
+
+            base, quote = (part.upper() for part in symbol.split('/', 1))
+            rate = tables[base].get(quote) if base in tables else self.get_cross_rate(base, quote, ttl)
+            if rate is None:
+                rates = self.get_forex_table(base, ttl)
+                rate = rates.get(quote) if rates else None
+
+            if rate is not None:
+                prices[symbol.upper()] = rate
+
+        return prices
+
     def get_price(self, symbol: str, asset_type: str) -> Optional[float]:
         """Pobiera cenę instrumentu"""
         if asset_type.lower() == 'crypto':
@@ -231,41 +3408,70 @@ Czas: {datetime.now().strftime('%H:%M:%S')}
             return self.get_forex_price(symbol)
         return None
     
-    def check_price_change(self, asset: Dict, current_price: float) -> None:
+    def evaluate_alerts(self, symbols: List[str], prices: List[float], now: Optional[float] = None) -> List[Alert]:
+        """Ocenia wiele aktywów naraz (NumPy) i zwraca tylko wyzwolone alerty"""
+        now = time.time() if now is None else now
+        alerts = self.alert_book.evaluate(symbols, prices, now)
+
+        book = self.alert_book
+        subscriptions = self.subscriptions
+        if subscriptions.books:
+            # Przed aktualizacją last_price - przecięcia liczone od poprzedniej ceny
+            with self.subscriptions_lock:
+                count = len(subscriptions)
+                for symbol, price in zip(symbols, prices):
+                    if symbol not in subscriptions.books:
+                        continue
+                    old_price = book.assets[book.index[symbol]].last_price
+                    for sub in subscriptions.crossed(symbol, old_price, price):
+                        change = (price - old_price) / old_price * 100 if old_price else 0.0
+                        alerts.append(Alert(symbol, old_price, price, change, sub.direction, sub.describe(), subscription=sub.id))
+                removed = len(subscriptions) != count
+            if removed:
+                self.mark_subscriptions_dirty()
+
+        for symbol, price in zip(symbols, prices):
+            book.assets[book.index[symbol]].last_price = price
+
+        stamp = epoch_to_timestamp(now)
+        for alert in alerts:
+            # Cooldown progów - przecięcia poziomów subskrypcji go nie ustawiają
+            if alert.rule is not None:
+                continue
+            asset = book.assets[book.index[alert.symbol]]
+            if alert.alert_type == "up":
+                asset.last_alert_up = stamp
+            else:
+                asset.last_alert_down = stamp
+
+        if self.window_rules.windows:
+            for symbol, price in zip(symbols, prices):
+                alerts.extend(self.window_rules.on_tick(symbol, now, price))
+        return alerts
+
+    def alert_dropped(self, alert: Alert) -> None:
+        """Alert odrzucony z pełnej kolejki odbiorców - ostrzeżenie i licznik metryk"""
+        console.print(f"[yellow]⚠ Kolejka alertów pełna - odrzucono alert {alert.symbol} ({alert.alert_type}, "
+                      f"{alert.change_percent:+.2f}%)[/yellow]")
+        self.metrics.inc('alerts_dropped', symbol=alert.symbol)
+
+    def emit_alert(self, alert: Alert) -> None:
+        """Przekazuje alert do kolejki odbiorców (ekran, dźwięk, webhook, plik)"""
+        self.dispatcher.submit(alert)
+
+    def check_price_change(self, asset: AssetRecord, current_price: float) -> None:
         """Sprawdza czy cena zmieniła się i uruchamia alert"""
-        symbol = asset['symbol']
-        
-        if asset['last_price'] is None:
-            asset['last_price'] = current_price
-            return
-        
-        old_price = asset['last_price']
-        change_percent = ((current_price - old_price) / old_price) * 100
-        
-        # Alert wzrostu - sprawdza czy zmiana >= progu I czy nie było alerty w ostatnich 30 sekundach
-        if change_percent >= asset['alert_up']:
-            last_alert = asset.get('last_alert_up')
-            if last_alert is None or (datetime.now() - datetime.strptime(last_alert, "%Y-%m-%d %H:%M:%S")).total_seconds() > 30:
-                self.show_alert_popup(symbol, old_price, current_price, change_percent, "up")
-                self.play_alert_sound("up")
-                asset['last_alert_up'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Alert spadku - sprawdza czy zmiana <= -progu I czy nie było alerty w ostatnich 30 sekundach
-        elif change_percent <= -asset['alert_down']:
-            last_alert = asset.get('last_alert_down')
-            if last_alert is None or (datetime.now() - datetime.strptime(last_alert, "%Y-%m-%d %H:%M:%S")).total_seconds() > 30:
-                self.show_alert_popup(symbol, old_price, current_price, change_percent, "down")
-                self.play_alert_sound("down")
-                asset['last_alert_down'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        asset['last_price'] = current_price
-    
+        for alert in self.evaluate_alerts([asset.symbol], [current_price]):
+            self.emit_alert(alert)
+
     def list_assets(self) -> None:
         """Wyświetla listę aktywów"""
         if not self.monitored_assets:
             console.print("[yellow]Brak monitorowanych aktywów[/yellow]")
             return
         
+        from rich.table import Table
+
         table = Table(title="Monitorowane Instrumenty")
         table.add_column("ID", style="cyan")
         table.add_column("Symbol", style="bold magenta")
@@ -276,16 +3482,16 @@ Czas: {datetime.now().strftime('%H:%M:%S')}
         table.add_column("Status", style="blue")
         
         for asset in self.monitored_assets:
-            price_str = f"${asset['last_price']:.2f}" if asset['last_price'] else "N/A"
-            status = "✓ Aktywny" if asset['enabled'] else "✗ Wyłączony"
+            price_str = format_price(asset.last_price, self.currency(asset.symbol), 2) if asset.last_price else "N/A"
+            status = "✓ Aktywny" if asset.enabled else "✗ Wyłączony"
             
             table.add_row(
-                str(asset['id']),
-                asset['symbol'],
-                asset['type'],
+                str(asset.id),
+                asset.symbol,
+                asset.type,
                 price_str,
-                str(asset['alert_up']),
-                str(asset['alert_down']),
+                str(asset.alert_up),
+                str(asset.alert_down),
                 status
             )
         
@@ -293,82 +3499,573 @@ Czas: {datetime.now().strftime('%H:%M:%S')}
     
     def show_asset_details(self, asset_id: int) -> None:
         """Wyświetla szczegóły aktywu"""
-        for asset in self.monitored_assets:
-            if asset['id'] == asset_id:
-                console.print(f"\n[bold cyan]═══════════════════════════[/bold cyan]")
-                console.print(f"[bold]Symbol:[/bold] {asset['symbol']}")
-                console.print(f"[bold]Typ:[/bold] {asset['type']}")
-                console.print(f"[bold]Próg wzrostu:[/bold] [green]{asset['alert_up']}%[/green]")
-                console.print(f"[bold]Próg spadku:[/bold] [red]{asset['alert_down']}%[/red]")
-                console.print(f"[bold]Aktualna cena:[/bold] [yellow]${asset['last_price']:.4f}[/yellow]" if asset['last_price'] else "[red]Brak danych[/red]")
-                console.print(f"[bold]Ostatni alert wzrostu:[/bold] {asset['last_alert_up'] or 'Brak'}")
-                console.print(f"[bold]Ostatni alert spadku:[/bold] {asset['last_alert_down'] or 'Brak'}")
-                console.print(f"[bold]Data dodania:[/bold] {asset['date_added']}")
-                
-                if asset['symbol'] in self.price_history and self.price_history[asset['symbol']]:
-                    prices = self.price_history[asset['symbol']][-10:]
-                    console.print(f"\n[bold]Historia cen (ostatnie 10):[/bold]")
-                    for i, record in enumerate(prices, 1):
-                        console.print(f"  {i}. ${record['price']:.4f} - {record['timestamp']}")
-                
-                console.print(f"[bold cyan]═══════════════════════════\n[/bold cyan]")
-                return
+        asset = self.monitored_assets.get(asset_id)
+        if asset is None:
+            console.print(f"[red]✗ Aktywo o ID {asset_id} nie znalezione[/red]")
+            return
+
+        console.print(f"\n[bold cyan]═══════════════════════════[/bold cyan]")
+        console.print(f"[bold]Symbol:[/bold] {asset.symbol}")
+        console.print(f"[bold]Typ:[/bold] {asset.type}")
+        console.print(f"[bold]Próg wzrostu:[/bold] [green]{asset.alert_up}%[/green]")
+        console.print(f"[bold]Próg spadku:[/bold] [red]{asset.alert_down}%[/red]")
+        console.print(f"[bold]Aktualna cena:[/bold] [yellow]{format_price(asset.last_price, self.currency(asset.symbol))}[/yellow]" if asset.last_price else "[red]Brak danych[/red]")
+        console.print(f"[bold]Ostatni alert wzrostu:[/bold] {asset.last_alert_up or 'Brak'}")
+        console.print(f"[bold]Ostatni alert spadku:[/bold] {asset.last_alert_down or 'Brak'}")
+        console.print(f"[bold]Data dodania:[/bold] {asset.date_added}")
+        console.print(f"[bold]Interwał sprawdzania:[/bold] {self.poll_interval(asset):g} s")
+        for rule in asset.window_rules:
+            console.print(f"[bold]Reguła okna:[/bold] {describe_window_rule(rule)}")
+        subscriptions = self.subscriptions.for_symbol(asset.symbol)
+        if subscriptions:
+            console.print(f"[bold]Subskrypcje poziomów:[/bold] {len(subscriptions)}")
+            for sub in sorted(subscriptions, key=lambda sub: sub.level)[:10]:
+                console.print(f"  #{sub.id} {sub.describe()}" + (" (jednorazowa)" if sub.once else ""))
         
-        console.print(f"[red]✗ Aktywo o ID {asset_id} nie znalezione[/red]")
-    
-    def fetch_all_prices(self) -> None:
-        """Pobiera ceny wszystkich aktywów"""
-        console.print("\n[bold cyan]🔄 Sprawdzam ceny wszystkich instrumentów...[/bold cyan]\n")
+        prices = self.history.last(asset.symbol, 10)
+        if prices:
+            currency = self.currency(asset.symbol)
+            console.print(f"\n[bold]Historia cen (ostatnie 10):[/bold]")
+            for i, (epoch, price) in enumerate(prices, 1):
+                console.print(f"  {i}. {format_price(price, currency)} - {epoch_to_timestamp(epoch)}")
         
-        for i, asset in enumerate(self.monitored_assets):
-            if not asset['enabled']:
-                console.print(f"[yellow]⊘[/yellow] {asset['symbol']}: Wyłączony")
+        console.print(f"[bold cyan]═══════════════════════════\n[/bold cyan]")
+    
+    def query_history(self, symbol: str, start: Optional[float] = None,
+                      end: Optional[float] = None) -> Tuple['np.ndarray', 'np.ndarray']:
+        """Punkty historii (tablice epoch, cena) między dwiema chwilami - wyszukiwanie binarne po epoch"""
+        epochs, _, _, _, closes = self.history.series(symbol.upper(), start, end)
+        return epochs, closes
+
+    def history_last_minutes(self, symbol: str, minutes: float) -> Tuple['np.ndarray', 'np.ndarray']:
+        """Punkty historii z ostatnich N minut"""
+        return self.query_history(symbol, time.time() - minutes * 60)
+
+    def history_candles(self, symbol: str, resolution: float, start: Optional[float] = None,
+                        end: Optional[float] = None) -> Dict[str, 'np.ndarray']:
+        """Świece OHLC (ze średnią i liczbą punktów) o dowolnym przedziale, liczone na bieżąco z historii"""
+        return aggregate_ohlc(self.history.series(symbol.upper(), start, end), resolution)
+
+    def show_history_candles(self, symbol: str, resolution: float, start: Optional[float] = None,
+                             end: Optional[float] = None, limit: int = 30) -> None:
+        """Wyświetla tabelę świec z zakresu historii (ostatnie limit świec)"""
+        started = time.perf_counter()
+        candles = self.history_candles(symbol, resolution, start, end)
+        elapsed = (time.perf_counter() - started) * 1000
+        total = len(candles['epoch'])
+        if not total:
+            console.print(f"[yellow]Brak historii {symbol.upper()} w podanym zakresie[/yellow]")
+            return
+
+        from rich.table import Table
+
+        table = Table(title=f"{symbol.upper()} - świece {format_age(resolution)}",
+                      caption=f"{min(total, limit)} z {total} świec, {int(candles['count'].sum())} punktów, {elapsed:.1f} ms")
+        table.add_column("Początek", style="cyan")
+        for name in ("Open", "High", "Low", "Close", "Średnia"):
+            table.add_column(name, style="yellow", justify="right")
+        table.add_column("Punkty", justify="right")
+        for i in range(max(0, total - limit), total):
+            table.add_row(epoch_to_timestamp(candles['epoch'][i]),
+                          *(f"{candles[name][i]:.4f}" for name in ('open', 'high', 'low', 'close', 'average')),
+                          str(candles['count'][i]))
+        console.print(table)
+
+    def fetch_prices(self, assets: List[AssetRecord]) -> Dict[str, float]:
+        """Pobiera ceny podanych aktywów - zbiorczo dla każdego dostawcy"""
+        if self.config.get('fetch_engine') == 'async':
+            if self.async_engine is None:
+                self.async_engine = AsyncFetchEngine(self)
+            return self.async_engine.fetch_prices(assets)
+
+        crypto_symbols = [asset.symbol for asset in assets if asset.type.lower() == 'crypto']
+        forex_symbols = [asset.symbol for asset in assets if asset.type.lower() == 'forex']
+
+        prices = self.get_crypto_prices(crypto_symbols) if crypto_symbols else {}
+        if forex_symbols:
+            prices.update(self.get_forex_prices(forex_symbols))
+
+        return prices
+
+    def fetch_all_prices(self, assets: Optional[List[AssetRecord]] = None) -> None:
+        """Pobiera ceny wszystkich aktywów (lub tylko podanych)"""
+        dashboard = self.dashboard
+        # W trybie dashboard wynik trafia do tabeli na żywo zamiast linii na każde aktywo
+        say = console.print if dashboard is None else lambda *args, **kwargs: None
+        if assets is None:
+            say("\n[bold cyan]🔄 Sprawdzam ceny wszystkich instrumentów...[/bold cyan]\n")
+            assets = list(self.monitored_assets)
+        else:
+            say(f"\n[bold cyan]🔄 Sprawdzam ceny instrumentów: {len(assets)}...[/bold cyan]\n")
+
+        prices = self.fetch_prices([asset for asset in assets if asset.enabled])
+        prices = {symbol: price for symbol, price in prices.items() if price and symbol in self.alert_book.index}
+
+        # Alerty tylko dla świeżych cen - nieaktualne z cache nie są oceniane
+        for alert in self.evaluate_alerts(list(prices), list(prices.values())):
+            self.emit_alert(alert)
+            if dashboard is not None:
+                dashboard.mark_alert(alert)
+
+        now = time.time()
+        max_age = self.config.get('stale_price_max_age_seconds', 3600)
+        for asset in assets:
+            if not asset.enabled:
+                say(f"[yellow]⊘[/yellow] {asset.symbol}: Wyłączony")
                 continue
-            
-            price = self.get_price(asset['symbol'], asset['type'])
+
+            price = prices.get(asset.symbol)
             if price:
-                self.check_price_change(asset, price)
-                console.print(f"[green]✓[/green] {asset['symbol']}: [bold yellow]${price:.4f}[/bold yellow]")
-                
-                if asset['symbol'] not in self.price_history:
-                    self.price_history[asset['symbol']] = []
-                
-                self.price_history[asset['symbol']].append({
-                    'price': price,
-                    'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                })
+                say(f"[green]✓[/green] {asset.symbol}: [bold yellow]{format_price(price, self.currency(asset.symbol))}[/bold yellow]")
+                self.history.append(asset.symbol, now, price)
+                self.price_cache[asset.symbol] = (price, now)
+                self.stale_symbols.discard(asset.symbol)
+                if dashboard is not None:
+                    dashboard.update(asset.symbol, asset.type, price)
+                continue
+
+            cached = self.last_known_price(asset.symbol)
+            if cached and now - cached[1] <= max_age:
+                say(f"[yellow]⌛[/yellow] {asset.symbol}: [yellow]{format_price(cached[0], self.currency(asset.symbol))}[/yellow] "
+                    f"[dim](nieaktualna, sprzed {format_age(now - cached[1])})[/dim]")
+                self.stale_symbols.add(asset.symbol)
+                self.metrics.inc('stale_prices_served', provider=asset.type.lower())
+                if dashboard is not None:
+                    dashboard.update(asset.symbol, asset.type, cached[0], stale=True)
             else:
-                console.print(f"[red]✗[/red] {asset['symbol']}: Błąd pobierania")
-            
-            if i < len(self.monitored_assets) - 1:
-                time.sleep(1)
-        
-        self.save_data()
-        
-        self.save_data()
-        console.print("\n[green]✓ Dane zaktualizowane[/green]\n")
+                say(f"[red]✗[/red] {asset.symbol}: Błąd pobierania")
+
+        self.mark_dirty()
+        say("\n[green]✓ Dane zaktualizowane[/green]\n")
+        if dashboard is not None:
+            dashboard.set_status(f"Ostatnie sprawdzenie: {datetime.now().strftime('%H:%M:%S')} "
+                                 f"({len(prices)} z {len(assets)} aktywów) - CTRL+C aby zatrzymać")
     
-    def monitor_prices(self, iterations: Optional[int] = None) -> None:
-        """Monitoruje ceny w pętli"""
+    def last_known_price(self, symbol: str) -> Optional[Tuple[float, float]]:
+        """Ostatnia poprawna cena (cena, epoch) - z pamięci, a po restarcie z historii"""
+        cached = self.price_cache.get(symbol)
+        if cached is None:
+            points = self.history.last(symbol, 1)
+            if points:
+                epoch, price = points[-1]
+                cached = self.price_cache[symbol] = (price, epoch)
+        return cached
+
+    def compact_history(self, now: Optional[float] = None) -> None:
+        """Przenosi stare punkty do rzadszych poziomów retencji (świece OHLC)"""
+        now = now or time.time()
+        tiers = sorted(self.config.get('history_retention', []), key=lambda tier: tier.get('resolution_seconds') or 0)
+
+        for symbol in self.history.symbols():
+            for tier, next_tier in zip(tiers, tiers[1:] + [None]):
+                max_age = tier.get('max_age_seconds')
+                if max_age is None:
+                    break
+
+                resolution = tier.get('resolution_seconds') or 0
+                cutoff = now - max_age
+                if next_tier is None:
+                    self.history.drop_before(symbol, resolution, cutoff)
+                    break
+
+                # Tylko pełne przedziały docelowego poziomu - bez podwójnych świec na granicy
+                next_resolution = next_tier['resolution_seconds']
+                cutoff -= cutoff % next_resolution
+
+                if resolution == 0:
+                    old = [(t, p, p, p, p) for t, p in self.history.raw(symbol, end=cutoff) if t < cutoff]
+                else:
+                    old = [c for c in self.history.candles(symbol, resolution, end=cutoff) if c[0] < cutoff]
+                if not old:
+                    continue
+
+                self.history.append_candles(symbol, next_resolution, aggregate_candles(old, next_resolution))
+                self.history.drop_before(symbol, resolution, cutoff)
+
+    def start_compaction(self) -> threading.Event:
+        """Uruchamia kompakcję historii w wątku w tle - zwraca Event zatrzymujący"""
+        stop = threading.Event()
+
+        def run() -> None:
+            while True:
+                try:
+                    self.compact_history()
+                except Exception as e:
+                    console.print(f"[red]Błąd kompakcji historii: {str(e)}[/red]")
+                if stop.wait(self.config.get('compaction_interval_seconds', 600)):
+                    break
+
+        threading.Thread(target=run, name="history-compaction", daemon=True).start()
+        return stop
+
+    def create_dashboard(self, sort: Optional[str] = None, min_change: Optional[float] = None,
+                         max_rows: Optional[int] = None) -> Dashboard:
+        """Tworzy tabelę na żywo (argumenty nadpisują ustawienia z konfiguracji)"""
+        return Dashboard(sort or self.config.get('dashboard_sort', 'abs_change'),
+                         self.config.get('dashboard_min_change_percent', 0) if min_change is None else min_change,
+                         max_rows or self.config.get('dashboard_max_rows', 40),
+                         self.config.get('dashboard_fps', 4),
+                         self.crypto_base_currency())
+
+    def start_dashboard(self, dashboard: Optional[Dashboard]) -> None:
+        """Włącza tabelę na żywo - wiersze ze znanymi cenami od razu, alerty tylko w tabeli"""
+        if dashboard is None:
+            return
+        for asset in self.monitored_assets:
+            if asset.enabled and asset.last_price:
+                dashboard.update(asset.symbol, asset.type, asset.last_price)
+        self.dashboard = dashboard
+        dashboard.start()
+
+    def stop_dashboard(self) -> None:
+        if self.dashboard is not None:
+            self.dashboard.stop()
+            self.dashboard = None
+
+    def start_revalidation(self) -> threading.Event:
+        """Uruchamia rewalidację w tle - próbne zapytanie do dostawcy z otwartym obwodem po upływie przerwy"""
+        stop = threading.Event()
+
+        def run() -> None:
+            while True:
+                waits = []
+                for provider, breaker in list(self.breakers.items()):
+                    if breaker.state == 'closed' or provider not in self.probe_requests:
+                        # Bez zapamiętanej próby obwód sprawdzi kolejne zwykłe zapytanie
+                        continue
+                    if breaker.retry_in() > 0:
+                        waits.append(breaker.retry_in())
+                        continue
+                    probe = self.probe_requests.get(provider)
+                    if probe:
+                        try:
+                            self.http_get_json(provider, *probe)
+                        except Exception:
+                            pass
+                    if breaker.state == 'open':
+                        waits.append(breaker.retry_in())
+                if stop.wait(min(waits, default=1.0) or 0.05):
+                    break
+
+        threading.Thread(target=run, name="provider-revalidation", daemon=True).start()
+        return stop
+
+    def poll_interval(self, asset: AssetRecord) -> float:
+        """Interwał sprawdzania aktywa (własny lub domyślny z konfiguracji)"""
+        return asset.poll_interval or self.config['check_interval_seconds']
+
+    def monitor_prices(self, iterations: Optional[int] = None, dashboard: Optional[Dashboard] = None) -> None:
+        """Monitoruje ceny w pętli - każde aktywo wg własnego interwału, aktywa o bliskich terminach w jednej partii"""
         iteration = 0
+        scheduler = PollScheduler(self.config.get('schedule_merge_window_seconds', 1))
+        stop_compaction = self.start_compaction()
+        stop_revalidation = self.start_revalidation()
+        self.start_dashboard(dashboard)
         
         try:
             while True:
-                if iterations and iteration >= iterations:
-                    break
-                
-                console.print(f"\n[cyan]⏱️  Sprawdzanie cen... ({datetime.now().strftime('%H:%M:%S')})[/cyan]")
-                self.fetch_all_prices()
-                
-                if iterations and iteration >= iterations - 1:
+                if iterations is not None and iteration >= iterations:
                     break
+
+                scheduler.sync({asset.id: self.poll_interval(asset) for asset in self.monitored_assets if asset.enabled})
+                due = scheduler.next_due()
+                if due is None:
+                    due = time.monotonic() + self.config['check_interval_seconds']
+                wait = due - time.monotonic()
+                if wait > 0:
+                    if iteration and self.dashboard is None:
+                        console.print(f"[dim]Następne sprawdzenie za {wait:.0f} sekund... (CTRL+C aby zatrzymać)[/dim]")
+                    # Krótkie odcinki - CTRL+C działa też tam, gdzie Event.wait nie jest przerywalny
+                    while wait > 0 and not self.recovered.wait(min(wait, 1)):
+                        wait = due - time.monotonic()
                 
+                batch = [self.monitored_assets.get(asset_id) for asset_id in scheduler.pop_due(time.monotonic())]
+                batch = [asset for asset in batch if asset is not None]
+                if self.recovered.is_set():
+                    # Dostawca wrócił - od razu odświeżamy aktywa podawane z cache i wznawiamy alerty
+                    self.recovered.clear()
+                    ids = {asset.id for asset in batch}
+                    batch += [asset for asset in self.monitored_assets
+                              if asset.enabled and asset.symbol in self.stale_symbols and asset.id not in ids]
+                if batch:
+                    if self.dashboard is None:
+                        console.print(f"\n[cyan]⏱️  Sprawdzanie cen... ({datetime.now().strftime('%H:%M:%S')})[/cyan]")
+                    self.fetch_all_prices(batch)
                 iteration += 1
-                console.print(f"[dim]Następne sprawdzenie za {self.config['check_interval_seconds']} sekund... (CTRL+C aby zatrzymać)[/dim]")
-                time.sleep(self.config['check_interval_seconds'])
         
         except KeyboardInterrupt:
             console.print("\n[green]✓ Monitoring zatrzymany[/green]")
+        finally:
+            stop_compaction.set()
+            stop_revalidation.set()
+            self.stop_dashboard()
+
+    def shard_assets(self, workers: int) -> List[List[AssetRecord]]:
+        """Dzieli aktywa na części wg dostawcy i skrótu symbolu (forex - jedna część, tabele i tak są wspólne)"""
+        by_provider = {}
+        for asset in self.monitored_assets:
+            if asset.enabled:
+                by_provider.setdefault(asset.type.lower(), []).append(asset)
+
+        shares = {provider: 1 for provider in by_provider}
+        if workers > len(by_provider) and 'crypto' in by_provider:
+            shares['crypto'] += workers - len(by_provider)
+
+        shards = []
+        for provider, assets in sorted(by_provider.items()):
+            count = shares[provider]
+            parts = [[] for _ in range(count)]
+            for asset in assets:
+                parts[zlib.crc32(asset.symbol.encode()) % count].append(asset)
+            shards.extend(part for part in parts if part)
+        return shards
+
+    def monitor_sharded(self, workers: int, iterations: Optional[int] = None, dashboard: Optional[Dashboard] = None) -> None:
+        """Monitoring w wielu procesach - koordynator czyta tablicę cen, wyświetla, zapisuje i restartuje procesy"""
+        assets = [asset for asset in self.monitored_assets if asset.enabled]
+        slot_by_id = {asset.id: slot for slot, asset in enumerate(assets)}
+        shards = self.shard_assets(workers)
+        if not shards:
+            console.print("[yellow]Brak monitorowanych aktywów[/yellow]")
+            return
+
+        # Limit zapytań dostawcy dzielony między procesy, które go odpytują
+        limits = self.config.get('rate_limits', {})
+        provider_shards = {}
+        for shard in shards:
+            provider = shard[0].type.lower()
+            provider_shards[provider] = provider_shards.get(provider, 0) + 1
+        rate_limits = {
+            provider: {**limit, 'requests_per_second': limit.get('requests_per_second', 0) / provider_shards.get(provider, 1)}
+            for provider, limit in limits.items()
+        }
+        # Procesy robocze dostają bieżącą konfigurację (z nadpisaniami z wiersza poleceń)
+        config = {**self.config, 'rate_limits': rate_limits, 'metrics_enabled': False, 'alert_sinks': []}
+
+        # Procesy robocze nie ładują katalogu - id kryptowalut rozwiązuje koordynator (raz, przed startem procesów)
+        crypto_symbols = [asset.symbol.split('/', 1)[0] for asset in assets if asset.type.lower() == 'crypto']
+        if any(not self.catalog.pinned(symbol) for symbol in crypto_symbols):
+            self.catalog.ensure()
+
+        board = PriceBoard(len(assets))
+        context = multiprocessing.get_context('spawn')
+
+        def spawn(shard: List[AssetRecord]):
+            # Bieżący stan części: ceny, subskrypcje i punkty okien reguł z historii koordynatora
+            now = time.time()
+            with self.subscriptions_lock:
+                subscriptions = [sub.to_dict() for asset in shard for sub in self.subscriptions.for_symbol(asset.symbol)]
+            window_points = {
+                asset.symbol: self.history.points(asset.symbol, start=now - max(rule['window_seconds'] for rule in asset.window_rules))
+                for asset in shard if asset.window_rules
+            }
+            crypto_ids = {}
+            for asset in shard:
+                symbol = asset.symbol.split('/', 1)[0]
+                if asset.type.lower() == 'crypto' and self.catalog.id_for(symbol):
+                    crypto_ids[symbol] = self.catalog.id_for(symbol)
+            process = context.Process(
+                target=shard_worker, name=f"price-shard-{shard[0].symbol}", daemon=True,
+                args=(board.name, len(assets), [asset.to_dict() for asset in shard], [slot_by_id[asset.id] for asset in shard],
+                      subscriptions, window_points, crypto_ids, config, self.api_sources)
+            )
+            process.start()
+            return process
+
+        processes = [spawn(shard) for shard in shards]
+        console.print(f"[green]✓[/green] Monitoring w {len(processes)} procesach ({len(assets)} aktywów)")
+
+        seen_version = np.zeros(len(assets), dtype=np.uint64)
+        seen_alert = np.zeros(len(assets), dtype=np.uint64)
+        stop_compaction = self.start_compaction()
+        self.start_dashboard(dashboard)
+        # W trybie dashboard ceny trafiają do tabeli na żywo zamiast linii na każde aktywo
+        say = console.print if self.dashboard is None else lambda *args, **kwargs: None
+        iteration = 0
+        try:
+            while not (iterations is not None and iteration >= iterations):
+                time.sleep(self.config.get('shard_render_interval_seconds', 1))
+                iteration += 1
+
+                for i, process in enumerate(processes):
+                    if not process.is_alive():
+                        console.print(f"[yellow]⚠ Proces {process.name} zakończył się ({process.exitcode}) - restart[/yellow]")
+                        # Restart z najnowszym stanem części (ceny i alerty z tablicy)
+                        processes[i] = spawn(shards[i])
+
+                slots = board.snapshot()
+                changed = np.flatnonzero((slots['version'] != seen_version) & (slots['version'] % 2 == 0))
+                if not len(changed):
+                    continue
+
+                for slot in changed:
+                    asset = assets[slot]
+                    record = slots[slot]
+                    price = float(record['price'])
+                    asset.last_price = price
+                    self.history.append(asset.symbol, float(record['updated']), price)
+
+                    first = int(seen_alert[slot])
+                    last = int(record['alert_seq'])
+                    if last - first > ALERT_RING_SIZE:
+                        console.print(f"[yellow]⚠ {asset.symbol}: pominięto alerty ({last - first - ALERT_RING_SIZE})[/yellow]")
+                        first = last - ALERT_RING_SIZE
+                    if self.dashboard is not None:
+                        self.dashboard.update(asset.symbol, asset.type, price)
+                    for seq in range(first, last):
+                        self.emit_board_alert(asset, record['alerts'][seq % ALERT_RING_SIZE])
+
+                    if len(changed) <= 20:
+                        say(f"[green]✓[/green] {asset.symbol}: [bold yellow]{format_price(price, self.currency(asset.symbol))}[/bold yellow]")
+
+                seen_version[changed] = slots['version'][changed]
+                seen_alert[changed] = slots['alert_seq'][changed]
+                if len(changed) > 20:
+                    say(f"[green]✓[/green] Zaktualizowano ceny: {len(changed)} ({datetime.now().strftime('%H:%M:%S')})")
+                if self.dashboard is not None:
+                    self.dashboard.set_status(f"Procesy: {len(processes)}, zaktualizowano: {len(changed)} "
+                                              f"({datetime.now().strftime('%H:%M:%S')})")
+                self.mark_dirty()
+
+        except KeyboardInterrupt:
+            console.print("\n[green]✓ Monitoring zatrzymany[/green]")
+        finally:
+            board.stop()
+            for process in processes:
+                process.join(10)
+                if process.is_alive():
+                    process.terminate()
+            stop_compaction.set()
+            self.stop_dashboard()
+            board.close()
+
+    def emit_board_alert(self, asset: AssetRecord, entry) -> None:
+        """Alert procesu roboczego z tablicy cen - cooldown progów i jednorazowe subskrypcje utrwala koordynator"""
+        alert_type = "up" if entry['alert_type'] > 0 else "down"
+        kind = int(entry['kind'])
+        rule = int(entry['rule'])
+        description = None
+        subscription = None
+        if kind == ALERT_KIND_SUBSCRIPTION:
+            with self.subscriptions_lock:
+                sub = self.subscriptions.by_id.get(rule)
+                if sub is not None and sub.once:
+                    self.subscriptions.remove(rule)
+            if sub is None:
+                # Usunięta w międzyczasie (np. unsubscribe) - bez alertu
+                return
+            if sub.once:
+                self.mark_subscriptions_dirty()
+            description = sub.describe()
+            subscription = sub.id
+        elif kind == ALERT_KIND_WINDOW:
+            description = describe_window_rule(asset.window_rules[rule]) if 0 <= rule < len(asset.window_rules) else None
+        else:
+            stamp = epoch_to_timestamp(float(entry['updated']))
+            if alert_type == "up":
+                asset.last_alert_up = stamp
+            else:
+                asset.last_alert_down = stamp
+        alert = Alert(asset.symbol, float(entry['old_price']), float(entry['price']), float(entry['change_percent']),
+                      alert_type, description, subscription=subscription)
+        self.emit_alert(alert)
+        if self.dashboard is not None:
+            self.dashboard.mark_alert(alert)
+
+    def ingest_ticks(self, ticks: List[Tick]) -> List[Alert]:
+        """Przekazuje partię ticków do silnika alertów i historii"""
+        ticks = [tick for tick in ticks if tick.symbol in self.alert_book.index
+                 and self.alert_book.assets[self.alert_book.index[tick.symbol]].enabled]
+        if not ticks:
+            return []
+
+        alerts = self.evaluate_alerts([tick.symbol for tick in ticks], [tick.price for tick in ticks])
+        received = {tick.symbol: tick.received for tick in ticks}
+        for alert in alerts:
+            self.emit_alert(alert)
+            latency = time.perf_counter() - received[alert.symbol]
+            self.stream_stats['alerts'] += 1
+            self.stream_stats['latency_sum'] += latency
+            self.stream_stats['latency_max'] = max(self.stream_stats['latency_max'], latency)
+            self.metrics.observe('tick_to_alert', latency)
+
+        dashboard = self.dashboard
+        epochs = self.tick_epochs
+        for tick in ticks:
+            # Historia segmentów musi rosnąć w czasie (wyszukiwanie binarne) - tick starszy niż ostatni punkt dostaje jego czas
+            last = epochs.get(tick.symbol)
+            if last is None:
+                points = self.history.last(tick.symbol, 1)
+                last = points[-1][0] if points else 0.0
+            epochs[tick.symbol] = epoch = max(tick.epoch, last)
+            self.history.append(tick.symbol, epoch, tick.price)
+            if dashboard is not None:
+                dashboard.update(tick.symbol, self.alert_book.assets[self.alert_book.index[tick.symbol]].type, tick.price)
+        if dashboard is not None:
+            for alert in alerts:
+                dashboard.mark_alert(alert)
+        self.stream_stats['applied'] += len(ticks)
+        self.mark_dirty()
+        return alerts
+
+    def monitor_stream(self, address: str, dashboard: Optional[Dashboard] = None) -> None:
+        """Monitoring zasilany strumieniem ticków NDJSON (TCP, gniazdo Unix lub stdin) zamiast odpytywania API"""
+        buffer = TickBuffer(self.config.get('stream_max_pending', 10000))
+        server = start_tick_listener(address, buffer)
+        console.print(f"[green]✓[/green] Odbieram ticki: {address}")
+
+        def report() -> None:
+            stats = self.stream_stats
+            latency = stats['latency_sum'] / stats['alerts'] * 1000 if stats['alerts'] else 0
+            report_line = (self.dashboard.set_status if self.dashboard is not None
+                           else lambda text: console.print(f"[dim]{text}[/dim]"))
+            report_line(f"Ticki: {buffer.received} odebrane, {stats['applied']} przetworzone, "
+                        f"{buffer.coalesced} połączone; alerty: {stats['alerts']} "
+                        f"(opóźnienie śr. {latency:.2f} ms, maks. {stats['latency_max'] * 1000:.2f} ms)")
+
+        stop_compaction = self.start_compaction()
+        self.start_dashboard(dashboard)
+        interval = self.config.get('stream_stats_interval_seconds', 10)
+        next_report = time.monotonic() + interval
+        try:
+            for batch in buffer.batches():
+                self.ingest_ticks(batch)
+                if time.monotonic() >= next_report:
+                    report()
+                    next_report = time.monotonic() + interval
+        except KeyboardInterrupt:
+            console.print("\n[green]✓ Monitoring zatrzymany[/green]")
+        finally:
+            buffer.close()
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+            stop_compaction.set()
+            report()
+            self.stop_dashboard()
+
+    def backtest(self, symbols: Optional[List[str]], up_grid: List[float], down_grid: List[float],
+                 csv_path: Optional[str] = None) -> Dict[str, Dict]:
+        """Odtwarza historię (lub CSV) przez logikę alertów dla siatki progów - wynik per symbol
+
+        Tylko surowe ticki - zamknięcia świec poziomów retencji to inny szereg niż ceny widziane na żywo.
+        """
+        if csv_path:
+            series = load_price_csv(csv_path)
+        else:
+            series = {}
+            for asset in self.monitored_assets:
+                points = self.history.raw(asset.symbol)
+                series[asset.symbol] = ([epoch for epoch, _ in points], [price for _, price in points])
+
+        results = {}
+        for symbol, (epochs, prices) in series.items():
+            if (symbols and symbol not in symbols) or not len(epochs):
+                continue
+            order = np.argsort(np.asarray(epochs, dtype=float), kind='stable')
+            results[symbol] = backtest_thresholds(np.asarray(epochs, dtype=float)[order],
+                                                  np.asarray(prices, dtype=float)[order], up_grid, down_grid)
+        return results
 
 def display_main_menu():
     """Wyświetla menu główne"""
@@ -396,7 +4093,12 @@ def settings_menu(monitor: PriceMonitorPro):
         console.print(f"[bold]Interwał sprawdzania:[/bold] {monitor.config['check_interval_seconds']}s")
         console.print(f"[bold]Domyślny próg alertu:[/bold] {monitor.config['alert_threshold_percent']}%")
         console.print(f"[bold]Częstotliwość wzrostu:[/bold] {monitor.config.get('frequency_up', 1500)} Hz")
-        console.print(f"[bold]Częstotliwość spadku:[/bold] {monitor.config.get('frequency_down', 800)} Hz\n")
+        console.print(f"[bold]Częstotliwość spadku:[/bold] {monitor.config.get('frequency_down', 800)} Hz")
+        for provider, stats in monitor.connection_stats().items():
+            console.print(f"[bold]HTTP {provider}:[/bold] {stats['requests']} zapytań, "
+                          f"{stats['reused_connections']} ponownie użytych połączeń, "
+                          f"{stats['new_connections']} nowych, {stats['not_modified']} × 304")
+        console.print()
         
         console.print("[bold green]1.[/bold green] Włącz/Wyłącz dźwięk")
         console.print("[bold green]2.[/bold green] Zmień interwał sprawdzania")
@@ -438,7 +4140,7 @@ def settings_menu(monitor: PriceMonitorPro):
                 if 100 <= freq <= 10000:
                     monitor.config['frequency_up'] = freq
                     console.print(f"[green]✓ Testowanie nowego dźwięku...[/green]")
-                    winsound.Beep(freq, 500)
+                    beep(freq, 500)
                     console.print(f"[green]✓ Dźwięk wzrostu zmieniony na {freq} Hz[/green]")
                     monitor.save_config(monitor.config)
                 else:
@@ -452,7 +4154,7 @@ def settings_menu(monitor: PriceMonitorPro):
                 if 100 <= freq <= 10000:
                     monitor.config['frequency_down'] = freq
                     console.print(f"[green]✓ Testowanie nowego dźwięku...[/green]")
-                    winsound.Beep(freq, 500)
+                    beep(freq, 500)
                     console.print(f"[green]✓ Dźwięk spadku zmieniony na {freq} Hz[/green]")
                     monitor.save_config(monitor.config)
                 else:
@@ -483,11 +4185,11 @@ def settings_menu(monitor: PriceMonitorPro):
                 console.print(f"\n[yellow]🧪 Testowanie szablonu: {templates[template]['name']}...[/yellow]\n")
                 
                 console.print("[green]Dźwięk wzrostu:[/green]")
-                winsound.Beep(templates[template]['up'], 500)
+                beep(templates[template]['up'], 500)
                 time.sleep(0.2)
                 
                 console.print("[red]Dźwięk spadku:[/red]")
-                winsound.Beep(templates[template]['down'], 500)
+                beep(templates[template]['down'], 500)
                 
                 confirm = console.input("\n[bold cyan]Zastosować ten szablon? (t/n):[/bold cyan] ").strip().lower()
                 if confirm == 't':
@@ -539,8 +4241,40 @@ def test_alert(monitor: PriceMonitorPro):
         
         console.input("\n[dim]Naciśnij Enter aby kontynuować...[/dim]")
 
-def main():
-    monitor = PriceMonitorPro()
+def check_crypto_symbol(monitor: PriceMonitorPro, symbol: str) -> bool:
+    """Sprawdza symbol w katalogu kryptowalut - podpowiedzi i informacja o kolizjach"""
+    catalog = monitor.catalog
+    # BTC/PLN - w katalogu sprawdzana sama kryptowaluta, waluta kwotowania przeliczana kursem forex
+    symbol = symbol.split('/', 1)[0]
+    catalog.ensure()
+    if catalog.id_for(symbol):
+        alternatives = catalog.alternatives(symbol)
+        if len(alternatives) > 1:
+            console.print(f"[yellow]Symbol {symbol.upper()} ma {len(alternatives)} kryptowaluty - używam: "
+                          f"{alternatives[0]}[/yellow]")
+            console.print(f"[dim]Inne: {', '.join(alternatives[1:6])} (zmiana: crypto_symbol_overrides w konfiguracji)[/dim]")
+        return True
+
+    if not catalog.symbols or len(catalog.symbols) <= len(CRYPTO_IDS):
+        # Katalog niedostępny (brak sieci) - nie blokujemy dodawania
+        return True
+
+    console.print(f"[red]✗ Nieznany symbol kryptowaluty: {symbol.upper()}[/red]")
+    matches = catalog.search(symbol)
+    if matches:
+        console.print("[dim]Podobne:[/dim]")
+        for match_symbol, coin_id, name in matches:
+            console.print(f"  [bold]{match_symbol}[/bold] - {name} ({coin_id})")
+    return False
+
+def interactive_menu(config_file: str, data_file: str):
+    """Interaktywne menu programu"""
+    from colorama import init
+    init(autoreset=True)
+
+    monitor = PriceMonitorPro(config_file, data_file)
+    # Zapis zaległych zmian także przy przerwaniu menu (Ctrl+C)
+    atexit.register(monitor.close)
     
     while True:
         display_main_menu()
@@ -549,17 +4283,28 @@ def main():
         if choice == "1":
             console.print("\n[bold cyan]--- Dodaj instrument ---[/bold cyan]")
             console.print("[dim]Crypto: BTC, ETH, XRP, ADA, SOL, DOGE, USDT, USDC, BNB, XLM[/dim]")
+            console.print("[dim]Crypto w innej walucie: BTC/PLN, ETH/EUR (przeliczane kursem forex)[/dim]")
             console.print("[dim]Forex: EUR/USD, GBP/USD, JPY/USD, itp.[/dim]\n")
             
             symbol = console.input("[bold]Symbol:[/bold] ").strip()
             asset_type = console.input("[bold]Typ (crypto/forex):[/bold] ").strip()
+            if symbol and asset_type.lower() == 'crypto' and not check_crypto_symbol(monitor, symbol):
+                console.input("\n[dim]Naciśnij Enter aby kontynuować...[/dim]")
+                continue
             alert_up = console.input("[bold]Próg wzrostu % [5]:[/bold] ").strip()
             alert_down = console.input("[bold]Próg spadku % [5]:[/bold] ").strip()
+            window_rules = console.input("[bold]Reguły okna (np. change:900:5,drawdown:3600:4,rally:3600:4) [brak]:[/bold] ").strip()
+            poll_interval = console.input(f"[bold]Interwał sprawdzania s [{monitor.config['check_interval_seconds']}]:[/bold] ").strip()
             
             if symbol and asset_type:
                 alert_up_val = float(alert_up) if alert_up else None
                 alert_down_val = float(alert_down) if alert_down else None
-                monitor.add_asset(symbol, asset_type, alert_up_val, alert_down_val)
+                poll_interval_val = float(poll_interval) if poll_interval else None
+                try:
+                    monitor.add_asset(symbol, asset_type, alert_up_val, alert_down_val, parse_window_rules(window_rules),
+                                      poll_interval_val)
+                except ValueError:
+                    console.print("[red]✗ Błędny format reguł okna (rodzaj:sekundy:próg)[/red]")
             else:
                 console.print("[red]✗ Symbol i typ są wymagane![/red]")
             console.input("\n[dim]Naciśnij Enter aby kontynuować...[/dim]")
@@ -587,6 +4332,15 @@ def main():
                 monitor.show_asset_details(asset_id)
             except ValueError:
                 console.print("[red]✗ Błędny ID[/red]")
+            else:
+                asset = monitor.monitored_assets.get(asset_id)
+                span = console.input("[bold]Świece - zakres i przedział (np. 24h 1h, 30d 1d) [pomiń]:[/bold] ").strip()
+                if asset is not None and span:
+                    try:
+                        last, resolution = (parse_duration(part) for part in span.split())
+                        monitor.show_history_candles(asset.symbol, resolution, time.time() - last)
+                    except ValueError:
+                        console.print("[red]✗ Błędny format (zakres przedział, np. 7d 4h)[/red]")
             console.input("\n[dim]Naciśnij Enter aby kontynuować...[/dim]")
         
         elif choice == "5":
@@ -600,9 +4354,10 @@ def main():
             console.input("\n[dim]Naciśnij Enter aby kontynuować...[/dim]")
         
         elif choice == "7":
+            live = console.input("[bold]Tabela na żywo? (t/N):[/bold] ").strip().lower() == 't'
             console.print("\n[bold green]🚀 Monitoring uruchomiony (CTRL+C aby zatrzymać)[/bold green]")
             try:
-                monitor.monitor_prices()
+                monitor.monitor_prices(dashboard=monitor.create_dashboard() if live else None)
             except KeyboardInterrupt:
                 console.print("\n[yellow]Monitoring wstrzymany[/yellow]")
             console.input("\n[dim]Naciśnij Enter aby kontynuować...[/dim]")
@@ -615,6 +4370,7 @@ def main():
             settings_menu(monitor)
         
         elif choice == "0":
+            monitor.close()
             console.print("[bold yellow]Do widzenia![/bold yellow]")
             break
         
@@ -622,5 +4378,288 @@ def main():
             console.print("[red]✗ Nieznana opcja[/red]")
             console.input("\n[dim]Naciśnij Enter aby kontynuować...[/dim]")
 
+def create_headless_monitor(args: argparse.Namespace) -> PriceMonitorPro:
+    """Monitor dla trybów bez interfejsu - nadpisania z flag tylko w pamięci, pomiar czasu startu"""
+    # Tabela na żywo potrzebuje rich - bez niej zwykły tekst (np. logi usługi)
+    console.plain = not getattr(args, 'dashboard', False)
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+
+    monitor = PriceMonitorPro(args.config, args.data)
+    # Długo działający monitor - zapis zaległych zmian także przy nieobsłużonym wyjściu
+    atexit.register(monitor.close)
+    if getattr(args, 'interval', None) is not None:
+        monitor.config['check_interval_seconds'] = args.interval
+    if getattr(args, 'engine', None) is not None:
+        monitor.config['fetch_engine'] = args.engine
+    if args.no_sound:
+        monitor.config['sound_enabled'] = False
+    if args.metrics:
+        monitor.start_metrics()
+
+    startup_ms = (time.perf_counter() - STARTUP_T0) * 1000
+    budget_ms = monitor.config.get('startup_budget_ms', 250)
+    status = "OK" if startup_ms <= budget_ms else "PRZEKROCZONY"
+    console.print(f"Start: {startup_ms:.0f} ms (budżet {budget_ms} ms - {status})")
+    return monitor
+
+def cli_dashboard(monitor: PriceMonitorPro, args: argparse.Namespace) -> Optional[Dashboard]:
+    """Tabela na żywo z flag --dashboard/--sort/--min-change/--rows"""
+    if not args.dashboard:
+        return None
+    return monitor.create_dashboard(args.sort, args.min_change, args.rows)
+
+def add_dashboard_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--dashboard', action='store_true', help="tabela na żywo zamiast linii na każde aktywo")
+    parser.add_argument('--sort', choices=DASHBOARD_SORTS, default=None, help="sortowanie tabeli na żywo")
+    parser.add_argument('--min-change', type=float, default=None, help="pokazuj tylko aktywa ze zmianą co najmniej %%")
+    parser.add_argument('--rows', type=int, default=None, help="maksymalna liczba wierszy tabeli na żywo")
+
+def run_daemon(args: argparse.Namespace) -> None:
+    """Tryb bez interfejsu - monitoring uruchamiany z flag lub konfiguracji"""
+    monitor = create_headless_monitor(args)
+    try:
+        if args.workers > 1:
+            monitor.monitor_sharded(args.workers, args.iterations, cli_dashboard(monitor, args))
+        else:
+            monitor.monitor_prices(args.iterations, cli_dashboard(monitor, args))
+    finally:
+        monitor.close()
+
+def run_stream(args: argparse.Namespace) -> None:
+    """Tryb strumieniowy - ticki wypychane przez źródło zamiast odpytywania API"""
+    monitor = create_headless_monitor(args)
+    if args.max_pending is not None:
+        monitor.config['stream_max_pending'] = args.max_pending
+    try:
+        monitor.monitor_stream(args.listen, cli_dashboard(monitor, args))
+    finally:
+        monitor.close()
+
+def run_replay_ticks(args: argparse.Namespace) -> None:
+    """Producent testowy ticków - z pliku NDJSON albo z zapisanej historii cen"""
+    if args.file:
+        with open(args.file, 'r', encoding='utf-8') as f:
+            ticks = [(tick.symbol, tick.price) for tick in read_ndjson_ticks(f)]
+    else:
+        monitor = PriceMonitorPro(args.config, args.data)
+        points = [(epoch, asset.symbol, price) for asset in monitor.monitored_assets
+                  for epoch, price in monitor.history.points(asset.symbol)]
+        monitor.close()
+        ticks = [(symbol, price) for _, symbol, price in sorted(points)]
+
+    sent = replay_ticks(args.to, ticks, args.rate)
+    if args.to != '-':
+        print(f"✓ Wysłano ticki: {sent}")
+
+def run_subscribe(args: argparse.Namespace) -> None:
+    """Dodaje subskrypcję poziomu ceny"""
+    monitor = PriceMonitorPro(args.config, args.data)
+    try:
+        monitor.subscribe(args.symbol, args.level, args.percent, args.direction, args.owner, args.once)
+    finally:
+        monitor.close()
+
+def run_unsubscribe(args: argparse.Namespace) -> None:
+    """Usuwa subskrypcje poziomów o podanych id"""
+    monitor = PriceMonitorPro(args.config, args.data)
+    try:
+        for sub_id in args.ids:
+            monitor.unsubscribe(sub_id)
+    finally:
+        monitor.close()
+
+def run_list_subscriptions(args: argparse.Namespace) -> None:
+    """Wyświetla subskrypcje poziomów (wszystkie albo jednego symbolu lub właściciela)"""
+    monitor = PriceMonitorPro(args.config, args.data)
+    subscriptions = sorted(monitor.subscriptions.by_id.values(), key=lambda sub: (sub.symbol, sub.level))
+    if args.symbol:
+        subscriptions = [sub for sub in subscriptions if sub.symbol == args.symbol.upper()]
+    if args.owner:
+        subscriptions = [sub for sub in subscriptions if sub.owner == args.owner]
+    monitor.close()
+
+    if not subscriptions:
+        console.print("[yellow]Brak subskrypcji[/yellow]")
+        return
+
+    from rich.table import Table
+
+    table = Table(title=f"Subskrypcje poziomów ({len(subscriptions)})")
+    table.add_column("ID", style="cyan")
+    table.add_column("Symbol", style="bold magenta")
+    table.add_column("Poziom", style="yellow")
+    table.add_column("Kierunek")
+    table.add_column("Właściciel", style="green")
+    table.add_column("Reguła", style="dim")
+    for sub in subscriptions:
+        rule = f"{sub.percent:+g}% od {sub.reference:g}" if sub.percent is not None else ""
+        if sub.once:
+            rule = (rule + ", " if rule else "") + "jednorazowa"
+        table.add_row(str(sub.id), sub.symbol, f"{sub.level:g}", "↑" if sub.direction == "up" else "↓", sub.owner, rule)
+    console.print(table)
+
+def run_history(args: argparse.Namespace) -> None:
+    """Zapytanie o historię: punkty z zakresu albo świece o podanym przedziale"""
+    monitor = PriceMonitorPro(args.config, args.data)
+    try:
+        start = parse_time(args.start) if args.start else None
+        end = parse_time(args.end) if args.end else None
+        if args.last:
+            start = time.time() - parse_duration(args.last)
+
+        if args.candles:
+            monitor.show_history_candles(args.symbol, parse_duration(args.candles), start, end, args.limit)
+        else:
+            epochs, prices = monitor.query_history(args.symbol, start, end)
+            currency = monitor.currency(args.symbol)
+            console.print(f"[bold]{args.symbol.upper()}[/bold] - punkty: {len(epochs)}")
+            for i in range(max(0, len(epochs) - args.limit), len(epochs)):
+                console.print(f"  {epoch_to_timestamp(epochs[i])}  {format_price(prices[i], currency)}")
+    finally:
+        monitor.close()
+
+def parse_grid(text: str) -> List[float]:
+    """Siatka progów: lista (1,2,5) lub zakres start:stop:krok (0.5:10:0.5) - ValueError przy błędnym zapisie"""
+    try:
+        if ':' in text:
+            start, stop, step = (float(part) for part in text.split(':'))
+            if step <= 0:
+                raise ValueError
+            count = int(round((stop - start) / step)) + 1
+            grid = [round(start + i * step, 6) for i in range(max(0, count))]
+        else:
+            grid = [float(part) for part in text.split(',') if part.strip()]
+    except ValueError:
+        raise ValueError(f"błędna siatka progów '{text}' (lista 1,2,5 lub start:stop:krok z krokiem > 0)") from None
+    if not grid:
+        raise ValueError(f"pusta siatka progów '{text}'")
+    return grid
+
+def run_backtest(args: argparse.Namespace) -> None:
+    """Test progów alertów na zapisanej historii lub CSV"""
+    monitor = PriceMonitorPro(args.config, args.data)
+    symbols = [symbol.strip().upper() for symbol in args.symbols.split(',')] if args.symbols else None
+    try:
+        up_grid, down_grid = parse_grid(args.up), parse_grid(args.down)
+        started = time.perf_counter()
+        results = monitor.backtest(symbols, up_grid, down_grid, args.csv)
+        elapsed = time.perf_counter() - started
+    except (OSError, ValueError) as e:
+        console.print(f"[red]✗ Backtest: {str(e)}[/red]")
+        monitor.close()
+        sys.exit(2)
+    points = sum(result['points'] for result in results.values())
+    console.print(f"[green]✓[/green] Odtworzono {points} punktów ({len(results)} symboli, "
+                  f"{len(up_grid) + len(down_grid)} progów) w {elapsed:.2f} s")
+
+    from rich.table import Table
+
+    for symbol, result in results.items():
+        asset = monitor.monitored_assets.find(symbol)
+        table = Table(title=f"{symbol} - {result['points']} punktów, {result['days']:g} dni")
+        table.add_column("Próg %", style="cyan")
+        table.add_column("Alerty ↑", style="green")
+        table.add_column("↑ / dzień", style="green")
+        table.add_column("Alerty ↓", style="red")
+        table.add_column("↓ / dzień", style="red")
+        for i in range(max(len(result['up']), len(result['down']))):
+            up = result['up'][i] if i < len(result['up']) else None
+            down = result['down'][i] if i < len(result['down']) else None
+            threshold = (up or down)['threshold']
+            current = asset is not None and threshold in (asset.alert_up, asset.alert_down)
+            table.add_row(
+                f"{threshold:g}" + (" ◀" if current else ""),
+                str(up['alerts']) if up else "", f"{up['per_day']:g}" if up else "",
+                str(down['alerts']) if down else "", f"{down['per_day']:g}" if down else ""
+            )
+        console.print(table)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'elapsed_seconds': round(elapsed, 3), 'results': results}, f, ensure_ascii=False, indent=2)
+        console.print(f"[green]✓[/green] Wyniki zapisane: {args.output}")
+    monitor.close()
+
+def build_parser() -> argparse.ArgumentParser:
+    """Buduje parser argumentów wiersza poleceń"""
+    parser = argparse.ArgumentParser(description="Price Monitor Pro - monitor kursów z alertami")
+    parser.add_argument('--config', default="monitor_config.json", help="plik konfiguracji")
+    parser.add_argument('--data', default="price_data.json", help="plik danych")
+    commands = parser.add_subparsers(dest='command')
+
+    run = commands.add_parser('run', aliases=['daemon'], help="monitoring bez interfejsu (np. usługa systemowa)")
+    run.add_argument('--iterations', type=int, default=None, help="liczba cykli (domyślnie bez końca)")
+    run.add_argument('--interval', type=int, default=None, help="interwał sprawdzania w sekundach")
+    run.add_argument('--engine', choices=['sequential', 'async'], default=None, help="silnik pobierania cen")
+    run.add_argument('--no-sound', action='store_true', help="wyłącza dźwięk alertów")
+    run.add_argument('--metrics', action='store_true', help="włącza metryki (endpoint Prometheus i zrzut JSON)")
+    run.add_argument('--workers', type=int, default=1, help="liczba procesów pobierających (podział wg dostawcy i symbolu)")
+    add_dashboard_arguments(run)
+    run.set_defaults(handler=run_daemon)
+
+    stream = commands.add_parser('stream', help="monitoring zasilany strumieniem ticków NDJSON")
+    stream.add_argument('--listen', default='-', help="tcp://host:port, unix:///ścieżka lub - (stdin)")
+    stream.add_argument('--max-pending', type=int, default=None, help="limit zaległych symboli (backpressure)")
+    stream.add_argument('--no-sound', action='store_true', help="wyłącza dźwięk alertów")
+    stream.add_argument('--metrics', action='store_true', help="włącza metryki (endpoint Prometheus i zrzut JSON)")
+    add_dashboard_arguments(stream)
+    stream.set_defaults(handler=run_stream)
+
+    replay = commands.add_parser('replay-ticks', help="wysyła ticki testowe do trybu stream")
+    replay.add_argument('--to', default='-', help="tcp://host:port, unix:///ścieżka lub - (stdout)")
+    replay.add_argument('--file', default=None, help="plik NDJSON z tickami (domyślnie zapisana historia cen)")
+    replay.add_argument('--rate', type=float, default=0, help="ticków na sekundę (0 - bez limitu)")
+    replay.set_defaults(handler=run_replay_ticks)
+
+    subscribe = commands.add_parser('subscribe', help="subskrypcja poziomu ceny (alert przy przecięciu)")
+    subscribe.add_argument('symbol', help="monitorowany symbol")
+    level = subscribe.add_mutually_exclusive_group(required=True)
+    level.add_argument('--level', type=float, help="poziom ceny")
+    level.add_argument('--percent', type=float, help="poziom jako %% od bieżącej ceny (np. 5 lub -3)")
+    subscribe.add_argument('--direction', choices=['up', 'down'], default=None,
+                           help="kierunek przecięcia (domyślnie wg położenia względem bieżącej ceny)")
+    subscribe.add_argument('--owner', default="", help="właściciel subskrypcji (trafia do alertu)")
+    subscribe.add_argument('--once', action='store_true', help="usuń po pierwszym alercie")
+    subscribe.set_defaults(handler=run_subscribe)
+
+    unsubscribe = commands.add_parser('unsubscribe', help="usuwa subskrypcje poziomów")
+    unsubscribe.add_argument('ids', type=int, nargs='+', help="id subskrypcji")
+    unsubscribe.set_defaults(handler=run_unsubscribe)
+
+    subscriptions = commands.add_parser('subscriptions', help="lista subskrypcji poziomów")
+    subscriptions.add_argument('--symbol', default=None, help="tylko dla symbolu")
+    subscriptions.add_argument('--owner', default=None, help="tylko dla właściciela")
+    subscriptions.set_defaults(handler=run_list_subscriptions)
+
+    history = commands.add_parser('history', help="zapytanie o historię cen (zakres czasu, świece OHLC)")
+    history.add_argument('symbol', help="symbol")
+    history.add_argument('--from', dest='start', default=None, help="początek: RRRR-MM-DD, 'RRRR-MM-DD GG:MM:SS' lub epoch")
+    history.add_argument('--to', dest='end', default=None, help="koniec (format jak --from)")
+    history.add_argument('--last', default=None, help="ostatni okres zamiast --from, np. 90m, 24h, 30d")
+    history.add_argument('--candles', default=None, help="przedział świec, np. 5m, 1h, 1d (bez - surowe punkty)")
+    history.add_argument('--limit', type=int, default=30, help="liczba wyświetlanych wierszy (od końca)")
+    history.set_defaults(handler=run_history)
+
+    backtest = commands.add_parser('backtest', help="test progów alertów na historii lub CSV (bez czekania i dźwięku)")
+    backtest.add_argument('--csv', default=None, help="plik CSV (symbol,timestamp,price) zamiast zapisanej historii")
+    backtest.add_argument('--symbols', default=None, help="symbole rozdzielone przecinkami (domyślnie wszystkie)")
+    backtest.add_argument('--up', default="0.5:10:0.5", help="progi wzrostu %% - lista lub start:stop:krok")
+    backtest.add_argument('--down', default="0.5:10:0.5", help="progi spadku %% - lista lub start:stop:krok")
+    backtest.add_argument('--output', default=None, help="plik wyników JSON")
+    backtest.set_defaults(handler=run_backtest)
+
+    return parser
+
+def main(argv: Optional[List[str]] = None):
+    args = build_parser().parse_args(argv)
+    if getattr(args, 'handler', None):
+        args.handler(args)
+    else:
+        interactive_menu(args.config, args.data)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,256 @@
+import json
+import os
+import threading
+
+import numpy as np
+import pytest
+
+import price_monitor as pm
+from price_monitor import (ALERT_RING_SIZE, Alert, DataFile, IdCounter, JsonHistoryBackend, PriceBoard,
+                           PriceMonitorPro, SubscriptionIndex)
+
+DATA = {
+    'schema_version': 1,
+    'monitored_assets': [
+        {'id': 1, 'symbol': 'EUR/USD', 'type': 'forex', 'alert_up': 2.0, 'alert_down': 3.0,
+         'date_added': '2024-01-01 00:00:00'},
+        {'id': 2, 'symbol': 'GBP/USD', 'type': 'forex', 'alert_up': 5.0, 'alert_down': 5.0,
+         'date_added': '2024-01-01 00:00:00'}
+    ],
+    'next_asset_id': 3,
+    'subscriptions': [{'id': 4, 'symbol': 'EUR/USD', 'level': 1.2, 'direction': 'up', 'owner': 'ala', 'once': True,
+                       'percent': None, 'reference': None}],
+    'next_subscription_id': 5,
+    'price_history': {
+        'EUR/USD': [{'price': 1.1, 'timestamp': '2024-01-01 00:00:00'}, {'price': 1.2, 'timestamp': '2024-01-01 00:01:00'}],
+        'GBP/USD': []
+    },
+    'price_history_tiers': {'EUR/USD': {'60': [[1704067200.0, 1.1, 1.2, 1.0, 1.15]]}}
+}
+
+
+def write(path, text):
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def sections(data_file):
+    """Wszystkie sekcje pliku z pełnym dekodowaniem wpisów historii"""
+    return {name: dict(data_file.get(name).items()) if name in DataFile.KEYED else data_file.get(name)
+            for name in DATA if name in data_file}
+
+
+@pytest.fixture
+def monitor_factory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pm.console.plain = True
+    monitors = []
+
+    def create(**overrides):
+        monitor = PriceMonitorPro(str(tmp_path / 'monitor_config.json'), str(tmp_path / 'price_data.json'),
+                                  {'history_backend': 'json', **overrides})
+        monitors.append(monitor)
+        return monitor
+
+    yield create
+    for monitor in monitors:
+        monitor.close()
+
+
+@pytest.mark.parametrize('dump', [
+    lambda data: json.dumps(data, indent=2),
+    lambda data: json.dumps(data, indent=1),
+    lambda data: json.dumps(data, indent=4),
+    lambda data: json.dumps(data),
+    lambda data: json.dumps(data, indent='\t'),
+    lambda data: '\n\n' + json.dumps(data, indent=2).replace('": ', '":  ') + '\n\n',
+], ids=['indent2', 'indent1', 'indent4', 'compact', 'tabs', 'spacing'])
+def test_data_file_reads_any_layout(tmp_path, dump):
+    data_file = DataFile(write(tmp_path / 'price_data.json', dump(DATA)))
+    assert sections(data_file) == DATA
+
+
+def test_data_file_sample():
+    """Przykładowy plik z repozytorium (zapis json.dump) - sekcje zgodne z pełnym parsowaniem"""
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'price_data.json')
+    with open(path, encoding='utf-8') as f:
+        expected = json.load(f)
+    data_file = DataFile(path)
+    assert {name: dict(data_file.get(name).items()) if name in DataFile.KEYED else data_file.get(name)
+            for name in expected} == expected
+
+
+def test_data_file_hand_edited_sections(tmp_path):
+    """Ręcznie wklejona sekcja z innym wcięciem (klucz zagnieżdżony na poziomie sekcji) - bez błędnego podziału"""
+    text = json.dumps(DATA, indent=2)
+    text = text.replace('"next_asset_id": 3', '"next_asset_id": 3,\n  "alert_sinks": {\n  "webhook": {"url": "x"}\n}')
+    text = text.replace('"GBP/USD": []', '"GBP/USD": [\n  {"price": 1.3, "timestamp": "2024-01-01 00:00:00"}\n]')
+    expected = json.loads(text)
+    data_file = DataFile(write(tmp_path / 'price_data.json', text))
+    assert sections(data_file) == {name: expected[name] for name in DATA}
+    assert data_file.get('alert_sinks') == {'webhook': {'url': 'x'}}
+
+
+def test_data_file_lazy_history(tmp_path):
+    data_file = DataFile(write(tmp_path / 'price_data.json', json.dumps(DATA, indent=2)))
+    history = data_file.get('price_history')
+    assert history.pending.keys() == {'EUR/USD', 'GBP/USD'}
+    assert json.loads(history.source('EUR/USD')) == DATA['price_history']['EUR/USD']
+    assert history['GBP/USD'] == []
+
+
+@pytest.mark.parametrize('text', [
+    '{\n  "monitored_assets": [\n    {"id": 1}\n',
+    '{\n  "monitored_assets": [],\n}',
+    '{\n  "monitored_assets": [] []\n}',
+])
+def test_data_file_malformed(tmp_path, text):
+    with pytest.raises(ValueError):
+        DataFile(write(tmp_path / 'price_data.json', text))
+
+
+@pytest.mark.parametrize('indent', [None, 1, 4])
+def test_hand_edited_file_round_trip(tmp_path, monitor_factory, indent):
+    """Plik przeformatowany ręcznie - wczytany w całości i zapisany ponownie bez utraty danych"""
+    write(tmp_path / 'price_data.json', json.dumps(DATA, indent=indent))
+    monitor = monitor_factory()
+    assert [asset.symbol for asset in monitor.monitored_assets] == ['EUR/USD', 'GBP/USD']
+    assert monitor.monitored_assets.find('EUR/USD').alert_down == 3.0
+    assert monitor.subscriptions.by_id[4].owner == 'ala'
+    assert monitor.history.raw('EUR/USD')[-1][1] == 1.2
+
+    monitor.mark_dirty()
+    monitor.mark_subscriptions_dirty()
+    monitor.save_data()
+    saved = json.loads((tmp_path / 'price_data.json').read_text(encoding='utf-8'))
+    for name in ('monitored_assets', 'subscriptions', 'price_history', 'price_history_tiers'):
+        assert len(saved[name]) == len(DATA[name])
+    assert saved['price_history'] == DATA['price_history']
+    assert saved['next_subscription_id'] == 5
+    assert sections(DataFile(str(tmp_path / 'price_data.json')))['price_history'] == DATA['price_history']
+
+
+def test_corrupt_file_starts_empty(tmp_path, monitor_factory):
+    write(tmp_path / 'price_data.json', '{\n  "monitored_assets": [\n    {"id": 1, "symbol": "EUR/USD"')
+    monitor = monitor_factory()
+    assert len(monitor.monitored_assets) == 0
+
+
+def test_price_board_snapshot_and_alert_ring():
+    board = PriceBoard(2)
+    try:
+        alerts = [(Alert('EUR/USD', 1.0, 1.0 + i, 10.0 * i, 'up'), pm.ALERT_KIND_SUBSCRIPTION, i)
+                  for i in range(ALERT_RING_SIZE + 3)]
+        board.publish(1, 1.5, 100.0, alerts)
+        snapshot = board.snapshot()
+        assert snapshot['version'][1] == 2 and snapshot['version'][0] == 0
+        assert snapshot['price'][1] == 1.5 and np.isnan(snapshot['price'][0])
+        assert snapshot['alert_seq'][1] == ALERT_RING_SIZE + 3
+        # Bufor cykliczny - zostaje ALERT_RING_SIZE ostatnich alertów
+        assert sorted(snapshot['alerts'][1]['rule']) == list(range(3, ALERT_RING_SIZE + 3))
+    finally:
+        board.close()
+
+
+def test_price_board_snapshot_skips_slot_being_written():
+    board = PriceBoard(1)
+    try:
+        board.slots['version'][0] = 3
+        assert board.snapshot(retries=2)['version'][0] % 2 == 1
+        board.recover([0])
+        board.publish(0, 2.0, 1.0)
+        snapshot = board.snapshot()
+        assert snapshot['version'][0] == 6 and snapshot['price'][0] == 2.0
+    finally:
+        board.close()
+
+
+def test_price_board_snapshot_is_consistent():
+    """Odczyt równoległy z zapisem - cena i czas zawsze z tej samej publikacji"""
+    board = PriceBoard(1)
+    stop = threading.Event()
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            i += 1
+            board.publish(0, float(i), float(i))
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        for _ in range(2000):
+            snapshot = board.snapshot()
+            if snapshot['version'][0] % 2 == 0 and snapshot['version'][0]:
+                assert snapshot['price'][0] == snapshot['updated'][0]
+    finally:
+        stop.set()
+        thread.join()
+        board.close()
+
+
+def subscription(sub_id, level, owner=''):
+    return {'id': sub_id, 'symbol': 'EUR/USD', 'level': level, 'direction': 'up', 'owner': owner, 'once': False,
+            'percent': None, 'reference': None}
+
+
+def test_subscription_merge_adds_and_removes():
+    index = SubscriptionIndex([subscription(1, 1.1), subscription(2, 1.2)])
+    known = set(index.by_id)
+    index.add('EUR/USD', 1.3, 'up')
+    # Inny proces usunął #1 i dodał #4
+    stored = [subscription(2, 1.2), subscription(4, 1.4, 'ola')]
+    assert index.merge(stored, 5, known)
+    assert sorted(index.by_id) == [2, 3, 4]
+    assert index.by_id[4].owner == 'ola'
+    assert index.next_id == 5
+    assert [sub.id for sub in index.crossed('EUR/USD', 1.0, 1.5)] == [2, 3, 4]
+    assert not index.merge(stored, 5, {2, 4})
+
+
+def test_subscription_merge_never_renumbers():
+    index = SubscriptionIndex([subscription(1, 1.1)])
+    index.add('EUR/USD', 1.3, 'up', 'ala')
+    index.merge([subscription(1, 1.1), subscription(2, 1.5, 'ola')], 3, {1})
+    assert index.by_id[2].owner == 'ala' and len(index) == 2
+
+
+def test_subscription_ids_shared_between_processes(tmp_path):
+    counter_path = str(tmp_path / 'price_data.json.subscription-ids')
+    daemon = SubscriptionIndex([subscription(1, 1.1)], 2, IdCounter(counter_path))
+    cli = SubscriptionIndex([subscription(1, 1.1)], 2, IdCounter(counter_path))
+    ids = [daemon.add('EUR/USD', 1.2, 'up').id, cli.add('EUR/USD', 1.3, 'up').id, daemon.add('EUR/USD', 1.4, 'up').id]
+    assert ids == [2, 3, 4]
+    assert cli.merge(daemon.to_json(), daemon.next_id, {1})
+    assert sorted(cli.by_id) == [1, 2, 3, 4]
+
+
+def test_compact_history(monitor_factory):
+    monitor = monitor_factory(history_retention=[
+        {'resolution_seconds': 0, 'max_age_seconds': 120},
+        {'resolution_seconds': 60, 'max_age_seconds': 600},
+        {'resolution_seconds': 300, 'max_age_seconds': None}
+    ])
+    now = 10000.0
+    for t, price in [(9500, 1.0), (9510, 3.0), (9570, 2.0), (9950, 5.0)]:
+        monitor.history.append('EUR/USD', float(t), price)
+
+    monitor.compact_history(now)
+    assert monitor.history.raw('EUR/USD') == [(9950.0, 5.0)]
+    assert monitor.history.candles('EUR/USD', 60) == [(9480.0, 1.0, 3.0, 1.0, 3.0), (9540.0, 2.0, 2.0, 2.0, 2.0)]
+
+    # Kolejne poziomy w jednym przebiegu, bez podwójnych świec przy powtórzeniu
+    for _ in range(2):
+        monitor.compact_history(now + 1200)
+        assert monitor.history.raw('EUR/USD') == []
+        assert monitor.history.candles('EUR/USD', 60) == []
+        assert monitor.history.candles('EUR/USD', 300) == [(9300.0, 1.0, 3.0, 1.0, 2.0), (9900.0, 5.0, 5.0, 5.0, 5.0)]
+
+
+def test_drop_before_missing_tier():
+    history = JsonHistoryBackend({}, [60])
+    history.drop_before('EUR/USD', 60, 100.0)
+    history.append('EUR/USD', 50.0, 1.0)
+    history.append('EUR/USD', 150.0, 2.0)
+    history.drop_before('EUR/USD', 0, 100.0)
+    assert history.raw('EUR/USD') == [(150.0, 2.0)]